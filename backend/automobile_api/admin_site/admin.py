@@ -1,4 +1,5 @@
 from cars.models import Car, Comment
+from cars.search import search_cars
 from django.contrib.admin import ModelAdmin, StackedInline, register, site
 from django.contrib.auth.models import Group
 
@@ -42,14 +43,25 @@ class CarAdmin(ModelAdmin):
     Custom admin panel configuration for the Car model.
 
     Attributes:
-        search_fields (tuple): Fields that can be searched in the admin panel.
+        search_fields (tuple): Fields that can be searched in the admin panel,
+        the search itself is served by the full-text index.
         list_filter (tuple): Fields by which admin users can filter results.
         list_display (tuple): Fields to display
         in the list view of the Car model.
         inlines (tuple): Inline model(s) to display alongside
         the Car model (in this case, comments).
     """
-    search_fields = ("make", "model", "year", "owner")
+    search_fields = ("make", "model", "description")
     list_filter = ("make", "model", "year", "owner")
     list_display = ("make", "model", "year", "owner")
     inlines = (CommentInlineModel, )
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Narrows the queryset to cars found by the full-text index
+        instead of `icontains` scans over search_fields.
+        """
+        if not search_term.strip():
+            return queryset, False
+        found = search_cars(search_term).order_by().values("pk")
+        return queryset.filter(pk__in=found), False
@@ -0,0 +1,139 @@
+'''
+Native async read path of the car and comment endpoints.
+
+DRF has no async support, so its views run in a worker thread under ASGI.
+The views here serve the most frequent requests on the event loop with
+the async ORM and cache API instead: anonymous JSON GET requests for
+a page of cars, for a car and for a page of its comments. Pages are
+computed by the methods of the DRF view sets in a worker thread, so
+filters and pagination stay the same, and stored under the keys of the
+DRF views. Any other request, and requests DRF answers with an error,
+such as invalid filters or out of range pages, are handed over to the
+DRF view, which produces the response.
+'''
+from functools import update_wrapper
+
+from api.renderers import FastJSONRenderer
+from api.serializers import car_rows
+from api.views import CarViewSet, CommentViewSet
+from asgiref.sync import sync_to_async
+from cars.cache import (MISSING, acached_detail, alist_key, alookup,
+                        astore)
+from cars.conditions import (acar_etag, acar_last_modified, aget_state,
+                             async_condition)
+from cars.models import Car
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException
+
+renderer = FastJSONRenderer()
+
+
+class JSONResponse(HttpResponse):
+    """Response rendered by the JSON renderer of the API, keeps the `data`."""
+
+    def __init__(self, data):
+        super().__init__(renderer.render(data),
+                         content_type=renderer.media_type)
+        self.data = data
+
+
+def is_async_readable(request):
+    """
+    Whether the request can be served without DRF: an anonymous GET,
+    which negotiates the JSON renderer.
+    """
+    return (
+        request.method == 'GET'
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and 'format' not in request.GET
+        and 'text/html' not in request.headers.get('Accept', '')
+    )
+
+
+def read_view(read, fallback):
+    """
+    Combine an async `read` function with a DRF view.
+
+    `read` gets readable requests and returns a response, or None to
+    hand the request over to `fallback`. Responses get the `Allow` and
+    `Vary` headers DRF would add. The result keeps attributes of the DRF
+    view, such as `csrf_exempt` and those used by schema generators.
+    """
+    allow = ', '.join(
+        method.upper() for method in fallback.cls.http_method_names
+        if method in fallback.actions
+    )
+    fallback_async = sync_to_async(fallback)
+
+    async def view(request, *args, **kwargs):
+        if is_async_readable(request):
+            response = await read(request, *args, **kwargs)
+            if response is not None:
+                response.headers['Allow'] = allow
+                patch_vary_headers(response, ('Accept',))
+                return response
+        return await fallback_async(request, *args, **kwargs)
+
+    return update_wrapper(view, fallback)
+
+
+def drf_data(viewset, action, method):
+    """
+    Async function computing the data of a request with `method` of
+    a DRF view set, i.e. with its filter backends and paginator, in
+    a worker thread. Returns None where DRF responds with an error, the
+    DRF view gives that response.
+    """
+    def compute(request, **kwargs):
+        view = viewset(action_map={'get': action})
+        view.args, view.kwargs = (), kwargs
+        view.format_kwarg = None
+        view.request = view.initialize_request(request, **kwargs)
+        try:
+            return getattr(view, method)(view.request)
+        except APIException:
+            return None
+
+    return sync_to_async(compute)
+
+
+car_list_rows = drf_data(CarViewSet, 'list', 'list_rows')
+comment_list_rows = drf_data(CommentViewSet, 'list', 'list_rows')
+
+
+async def car_list(request):
+    """
+    A page of cars of `CarViewSet.list`, from the cache of the list.
+    Misses are computed by the view set, errors are left to DRF.
+    """
+    # Same key as `CarViewSet.list`.
+    params = (request.scheme, request.get_host(),
+              sorted(request.GET.lists()))
+    key = await alist_key('api', params)
+    data = await alookup(key, 'api-list')
+    if data is MISSING:
+        data = await car_list_rows(request)
+        if data is None:
+            return None
+        await astore(key, 'api-list', data)
+    return JSONResponse(data)
+
+
+@async_condition(etag_func=acar_etag, last_modified_func=acar_last_modified)
+async def car_detail(request, pk):
+    # The state of the car is already read for the conditions.
+    if await aget_state(request, pk) is None:
+        return None
+
+    async def compute():
+        row = await Car.objects.values(*car_rows.columns).aget(pk=pk)
+        return car_rows.to_representation(row)
+
+    return JSONResponse(await acached_detail('api', int(pk), compute))
+
+
+async def comment_list(request, car_id):
+    """A page of comments of `CommentViewSet.list`, errors are left to DRF."""
+    data = await comment_list_rows(request, car_id=car_id)
+    return None if data is None else JSONResponse(data)
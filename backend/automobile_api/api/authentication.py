@@ -0,0 +1,382 @@
+'''
+Token authentication with the token and its user cached between requests.
+
+`TokenAuthentication` of DRF joins the token with its user on every
+request. `CachedTokenAuthentication` keeps both in a bounded in-process
+LRU with expiry and, optionally, in a shared Django cache, so the steady
+state of an authenticated client costs no queries. Entries are dropped
+by `api.signals` when a token is deleted or its user changes, e.g. is
+deactivated; the expiry bounds staleness of the in-process caches of
+other processes.
+
+Configured with the `TOKEN_AUTH_CACHE` setting:
+    MAX_SIZE (int): Tokens kept per process, 0 disables the cache.
+    TIMEOUT (int): Seconds a token is trusted without a query.
+    CACHE_ALIAS (str): Shared cache used after the in-process one, or
+        None.
+
+`StatelessJWTAuthentication` trusts the signed claims of JSON web
+tokens, see `CLAIMS`, and returns a `ClaimsUser`, which loads the user
+row only when a view needs more than the claims. Since tokens of
+deactivated users or of users with changed claims are accepted this way,
+they are revoked in `RevocationList`: one by one on logout, along with
+the refresh token blacklisted by `token_blacklist`, and all tokens
+issued to a user before its claims changed, see `api.signals`. The list
+is kept in memory and shared by processes through the database.
+
+Configured with the `STATELESS_JWT` setting:
+    ENABLED (bool): Trust the claims and check the revocations,
+        otherwise load the user as `JWTAuthentication` does.
+    REFRESH_INTERVAL (int): Seconds other processes may accept a token
+        revoked by one of them.
+'''
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from api.models import Revocation
+from cars.cache import counters
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'CACHE_ALIAS': None,
+}
+COUNTER_NAMESPACE = 'auth-token'
+# Never cached, the field is loaded on access.
+SECRET_FIELDS = ('password',)
+DEFAULT_STATELESS_JWT = {
+    'ENABLED': False,
+    'REFRESH_INTERVAL': 5,
+}
+# User fields signed into JSON web tokens, see `ClaimsUser`.
+CLAIMS = ('is_staff', 'is_active')
+
+
+class TokenCache:
+    """Thread-safe LRU of token entries, each expiring after `timeout`."""
+
+    def __init__(self, max_size, timeout, cache_alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def shared_key(key):
+        # Token keys are credentials, the shared cache sees digests only.
+        return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the entry of the token key or None."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires, entry = item
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+        if self.cache_alias:
+            entry = caches[self.cache_alias].get(self.shared_key(key))
+            if entry is not None:
+                self._store(key, entry)
+            return entry
+        return None
+
+    def set(self, key, entry):
+        self._store(key, entry)
+        if self.cache_alias:
+            caches[self.cache_alias].set(self.shared_key(key), entry,
+                                         self.timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_alias:
+            caches[self.cache_alias].delete(self.shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the token cache of the process, None when it is disabled."""
+    global _token_cache
+    if _token_cache is None:
+        config = {**DEFAULT_TOKEN_AUTH_CACHE,
+                  **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+        _token_cache = TokenCache(config['MAX_SIZE'], config['TIMEOUT'],
+                                  config['CACHE_ALIAS'])
+    return _token_cache if _token_cache.max_size else None
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == 'TOKEN_AUTH_CACHE':
+        _token_cache = None
+
+
+def to_entry(token):
+    """Picklable copy of the token and of its user, without secrets."""
+    user = token.user
+    return {
+        'key': token.key,
+        'created': token.created,
+        'user': {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.name not in SECRET_FIELDS
+        },
+    }
+
+
+def from_entry(entry):
+    """Rebuild the (user, token) pair of `to_entry` without queries."""
+    user_model = get_user_model()
+    fields = entry['user']
+    user = user_model.from_db(DEFAULT_DB_ALIAS, list(fields),
+                              list(fields.values()))
+    token = Token(key=entry['key'], user=user, created=entry['created'])
+    token._state.adding = False
+    token._state.db = DEFAULT_DB_ALIAS
+    return user, token
+
+
+def invalidate_tokens(keys):
+    cache = get_token_cache()
+    if cache is not None:
+        for key in keys:
+            cache.delete(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """`TokenAuthentication` served from `TokenCache` when possible."""
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+        entry = cache.get(key)
+        if entry is not None:
+            counters.hit(COUNTER_NAMESPACE)
+            return from_entry(entry)
+        counters.miss(COUNTER_NAMESPACE)
+        # Unknown keys and inactive users fail here and are not cached.
+        user, token = super().authenticate_credentials(key)
+        cache.set(key, to_entry(token))
+        return user, token
+
+
+def add_claims(token, user):
+    """Sign `CLAIMS` of the user into the token."""
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class RevocationList:
+    """
+    Thread-safe set of revoked tokens, kept until they expire: token ids
+    and users, whose tokens are revoked when issued before a moment.
+
+    Lookups are served from memory. Revocations are stored with the
+    `Revocation` model, which is read again every REFRESH_INTERVAL
+    seconds to learn the ones of other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._users = {}
+        self.refreshed_at = None
+
+    def revoke(self, token):
+        self._add(Revocation(jti=str(token[jwt_settings.JTI_CLAIM]),
+                             expires_at=token['exp']))
+
+    def revoke_user(self, user_id):
+        """Revoke every token issued to the user so far."""
+        now = time.time()
+        # Access tokens copy "iat" of their refresh token.
+        lifetime = max(jwt_settings.ACCESS_TOKEN_LIFETIME,
+                       jwt_settings.REFRESH_TOKEN_LIFETIME)
+        self._add(Revocation(user_id=str(user_id), issued_before=now,
+                             expires_at=now + lifetime.total_seconds()))
+
+    def is_revoked(self, token):
+        self.maybe_refresh()
+        revoked = self._users.get(str(token.get(jwt_settings.USER_ID_CLAIM)))
+        # "iat" is rounded down, so tokens issued within the second that
+        # follows a revocation are revoked as well.
+        if revoked is not None and token.get('iat', 0) < revoked:
+            return True
+        return str(token.get(jwt_settings.JTI_CLAIM)) in self._tokens
+
+    def maybe_refresh(self):
+        interval = get_stateless_config()['REFRESH_INTERVAL']
+        if (self.refreshed_at is None
+                or time.monotonic() - self.refreshed_at >= interval):
+            self.refresh()
+
+    def refresh(self):
+        """Replace the revocations in memory with the stored ones."""
+        with self._lock:
+            tokens, users = {}, {}
+            for revocation in Revocation.objects.filter(
+                    expires_at__gt=time.time()):
+                self._remember(revocation, tokens, users)
+            self._tokens, self._users = tokens, users
+            self.refreshed_at = time.monotonic()
+
+    def clear(self):
+        Revocation.objects.all().delete()
+        with self._lock:
+            self._tokens, self._users = {}, {}
+            self.refreshed_at = None
+
+    def _add(self, revocation):
+        if revocation.expires_at <= time.time():
+            return
+        Revocation.objects.filter(expires_at__lte=time.time()).delete()
+        revocation.save()
+        with self._lock:
+            self._remember(revocation, self._tokens, self._users)
+
+    @staticmethod
+    def _remember(revocation, tokens, users):
+        if revocation.jti is not None:
+            tokens[revocation.jti] = revocation.expires_at
+        if revocation.user_id is not None:
+            users[revocation.user_id] = max(
+                revocation.issued_before,
+                users.get(revocation.user_id, revocation.issued_before))
+
+
+revocations = RevocationList()
+
+
+def get_stateless_config():
+    return {**DEFAULT_STATELESS_JWT,
+            **getattr(settings, 'STATELESS_JWT', {})}
+
+
+def is_stateless():
+    return get_stateless_config()['ENABLED']
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    User of a validated token. The id and `CLAIMS` are read from the
+    token, other attributes load the user from the database once.
+    """
+
+    def __init__(self, token):
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+
+        def load():
+            user_model = get_user_model()
+            try:
+                return user_model._default_manager.get(
+                    **{jwt_settings.USER_ID_FIELD: user_id})
+            except user_model.DoesNotExist:
+                raise AuthenticationFailed('User not found',
+                                           code='user_not_found')
+
+        super().__init__(load)
+        # Set on the proxy itself, setattr() would load the user.
+        self.__dict__['claims'] = {
+            'pk': user_id,
+            **{claim: token[claim] for claim in CLAIMS},
+        }
+
+    @property
+    def pk(self):
+        return self.claims['pk']
+
+    id = pk
+
+    @property
+    def is_staff(self):
+        return self.claims['is_staff']
+
+    @property
+    def is_active(self):
+        return self.claims['is_active']
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, ClaimsUser):
+            return self.pk == other.pk
+        return isinstance(other, get_user_model()) and self.pk == other.pk
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self):
+        return f'<ClaimsUser: {self.pk}>'
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that, if enabled, trusts the claims of tokens
+    instead of loading their users and checks the revocation list.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_stateless() and revocations.is_revoked(token):
+            raise InvalidToken('Token is revoked', code='token_revoked')
+        return token
+
+    def get_user(self, validated_token):
+        if not is_stateless() or any(claim not in validated_token
+                                     for claim in CLAIMS):
+            # Tokens issued before the claims were added are looked up.
+            return super().get_user(validated_token)
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user '
+                               'identification')
+        if not validated_token['is_active']:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return ClaimsUser(validated_token)
@@ -0,0 +1,91 @@
+import csv
+import json
+
+from rest_framework import serializers
+
+# Pairs of (output name, model column) written by the export.
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('make', 'make'),
+    ('model', 'model'),
+    ('year', 'year'),
+    ('description', 'description'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('comments_count', 'comments_count'),
+    ('last_commented_at', 'last_commented_at'),
+    ('owner', 'owner_id'),
+)
+
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+class Echo:
+    """File-like object that returns what is written instead of storing."""
+
+    def write(self, value):
+        return value
+
+
+def export_values(queryset):
+    return queryset.values_list(*(column for _, column in EXPORT_FIELDS))
+
+
+def format_row(row):
+    """Plain values of a row with datetimes formatted as in the API."""
+    to_representation = DATETIME_FIELD.to_representation
+    return [
+        to_representation(value) if hasattr(value, 'isoformat') else value
+        for value in row
+    ]
+
+
+def export_rows(queryset, chunk_size):
+    """Yield formatted rows read in chunks."""
+    for row in export_values(queryset).iterator(chunk_size=chunk_size):
+        yield format_row(row)
+
+
+async def aexport_chunks(queryset, chunk_size):
+    """Yield lists of up to `chunk_size` formatted rows, for ASGI."""
+    chunk = []
+    # values_list() would run its query before aiterator() reaches
+    # a thread, values() rows are read lazily.
+    rows = queryset.values(*(column for _, column in EXPORT_FIELDS))
+    async for row in rows.aiterator(chunk_size=chunk_size):
+        chunk.append(format_row(row.values()))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def alines(to_lines, chunks):
+    """Text of every chunk of rows written with `to_lines`."""
+    header = True
+    async for rows in chunks:
+        yield ''.join(to_lines(rows, header=header))
+        header = False
+    if header:
+        yield ''.join(to_lines([], header=header))
+
+
+def ndjson_lines(rows, header=True):
+    names = [name for name, _ in EXPORT_FIELDS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows, header=True):
+    writer = csv.writer(Echo())
+    if header:
+        yield writer.writerow([name for name, _ in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
@@ -0,0 +1,36 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class CarFilterBackend(BaseFilterBackend):
+    """
+    Filters cars by `make`, `model` and `owner` (repeat a parameter to
+    match any of its values) and by `year_min` and `year_max`.
+    """
+    choice_params = {'make': 'make', 'model': 'model', 'owner': 'owner_id'}
+    range_params = {'year_min': 'year__gte', 'year_max': 'year__lte'}
+    integer_params = ('owner', 'year_min', 'year_max')
+
+    def get_lookups(self, params):
+        """Return ORM lookups of the filter parameters of a request."""
+        lookups, errors = {}, {}
+        for param in (*self.choice_params, *self.range_params):
+            values = [value for value in params.getlist(param) if value]
+            if not values:
+                continue
+            if param in self.integer_params and not all(
+                    value.isdigit() for value in values):
+                errors[param] = ['Expected an integer.']
+                continue
+            if param in self.range_params:
+                lookups[self.range_params[param]] = int(values[-1])
+            elif len(values) == 1:
+                lookups[self.choice_params[param]] = values[0]
+            else:
+                lookups[f'{self.choice_params[param]}__in'] = values
+        if errors:
+            raise ValidationError(errors)
+        return lookups
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.filter(**self.get_lookups(request.query_params))
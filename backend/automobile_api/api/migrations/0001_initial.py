@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(blank=True, max_length=255, null=True, verbose_name='Идентификатор токена')),
+                ('user_id', models.CharField(blank=True, max_length=255, null=True, verbose_name='Идентификатор пользователя')),
+                ('issued_before', models.FloatField(blank=True, null=True, verbose_name='Время отзыва токенов пользователя')),
+                ('expires_at', models.FloatField(db_index=True, verbose_name='Время истечения отзыва')),
+            ],
+            options={
+                'verbose_name': 'Отзыв токена',
+                'verbose_name_plural': 'Отзывы токенов',
+            },
+        ),
+    ]
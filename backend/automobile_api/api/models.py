@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class Revocation(models.Model):
+    '''
+    Revoked JSON web tokens shared by server processes, which keep them
+    in memory, see `api.authentication.RevocationList`.
+    '''
+    jti = models.CharField(
+        verbose_name='Идентификатор токена',
+        max_length=255,
+        null=True,
+        blank=True
+    )
+    user_id = models.CharField(
+        verbose_name='Идентификатор пользователя',
+        max_length=255,
+        null=True,
+        blank=True
+    )
+    # Tokens of the user issued before this moment are revoked.
+    issued_before = models.FloatField(
+        verbose_name='Время отзыва токенов пользователя',
+        null=True,
+        blank=True
+    )
+    expires_at = models.FloatField(
+        verbose_name='Время истечения отзыва',
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Отзыв токена'
+        verbose_name_plural = 'Отзывы токенов'
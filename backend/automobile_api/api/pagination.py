@@ -0,0 +1,132 @@
+from core.keyset import (encode_cursor, invert, page_queryset, parse_cursor,
+                         position_of)
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Clients keep the regular `?page=N` behaviour unless they pass
+    `?pagination=cursor` or an already issued `?cursor=` token. In cursor
+    mode the page is selected with a `WHERE (created_at, id) < (...)`
+    condition over the `ordering` columns instead of `OFFSET`, so the cost
+    of a page does not depend on its depth. No `COUNT(*)` is issued unless
+    the client asks for it with `?with_count=true`.
+
+    Attributes:
+        ordering (tuple): Keyset columns. The last one must be unique.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.use_cursor = self.is_cursor_requested(request)
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.display_page_controls = False
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.count = None
+        if self.is_count_requested(request):
+            self.count = queryset.count()
+
+        position, self.reverse = self.get_cursor(request, queryset)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(invert(field) for field in ordering)
+        queryset = page_queryset(queryset, ordering, position)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page_results = results
+        return results
+
+    def is_cursor_requested(self, request):
+        return bool(
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or request.query_params.get(self.cursor_query_param)
+        )
+
+    def is_count_requested(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_cursor(self, request, queryset):
+        """Return the decoded (position, reverse) pair from the request."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            return parse_cursor(token, queryset.model, self.ordering)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        return self._cursor_url(self.page_results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        return self._cursor_url(self.page_results[0], reverse=True)
+
+    def _cursor_url(self, instance, reverse):
+        position = position_of(instance, self.ordering)
+        url = remove_query_param(self.base_url, self.mode_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(position, reverse)
+        )
+
+
+class CarPagination(KeysetPagination):
+    """Keyset follows `Car.Meta.ordering` with `id` as a tie-breaker."""
+    ordering = ('-created_at', '-id')
+
+
+class CommentPagination(KeysetPagination):
+    """Keyset follows the oldest-first order of the comments endpoint."""
+    ordering = ('created_at', 'id')
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page number pagination of search results. Results are ordered by
+    relevance rather than by a unique column, so there is no cursor mode.
+    """
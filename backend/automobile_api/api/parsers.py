@@ -0,0 +1,38 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON into a list of objects.
+
+    A body with more items than `bulk_max_items` of the view is rejected
+    as soon as the extra item is reached, the rest is not read.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        max_items = getattr(parser_context.get('view'), 'bulk_max_items',
+                            None)
+        if stream is None:
+            return []
+        items = []
+        decoded_stream = codecs.getreader(encoding)(stream)
+        for number, line in enumerate(decoded_stream, 1):
+            if not line.strip():
+                continue
+            if max_items is not None and len(items) >= max_items:
+                raise ParseError(
+                    f'Ensure there are no more than {max_items} items.')
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(
+                    f'NDJSON parse error on line {number} - {exc}')
+        return items
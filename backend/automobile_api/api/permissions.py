@@ -28,11 +28,12 @@ class IsOwnerOrIsStaffOrReadOnly(BaseOwnerOrAuthorOrStaffPermission):
     """Only owner of the object or staff can edit it."""
 
     def is_owner_or_author_or_staff(self, request, obj):
-        return request.user == obj.owner or request.user.is_staff
+        # Compared by id, the users of stateless tokens are not loaded.
+        return obj.owner_id == request.user.pk or request.user.is_staff
 
 
 class IsAuthorOrIsStaffOrReadOnly(BaseOwnerOrAuthorOrStaffPermission):
     """Only author of the object or staff can edit it."""
 
     def is_owner_or_author_or_staff(self, request, obj):
-        return request.user == obj.author or request.user.is_staff
+        return obj.author_id == request.user.pk or request.user.is_staff
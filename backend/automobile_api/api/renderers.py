@@ -0,0 +1,50 @@
+'''
+JSON renderer using orjson, if it is installed.
+
+The output is the same as the one of DRF's `JSONRenderer`: compact,
+not ASCII-escaped, with U+2028 and U+2029 escaped. Datetimes and any
+other values orjson does not serialize the same way are passed to DRF's
+encoder. Whatever orjson can not handle at all, e.g. keys other than
+strings, as well as indented output, is rendered by `JSONRenderer`
+itself. Floats may differ in the notation of exponents only.
+'''
+from core.metrics import timed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` backed by orjson when available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('serialization'):
+            if (orjson is None or data is None
+                    or not api_settings.UNICODE_JSON
+                    or not api_settings.COMPACT_JSON
+                    or self.get_indent(accepted_media_type or '',
+                                       renderer_context or {})):
+                return super().render(data, accepted_media_type,
+                                      renderer_context)
+            try:
+                ret = orjson.dumps(
+                    data,
+                    default=self.encoder_class().default,
+                    option=(orjson.OPT_PASSTHROUGH_DATETIME
+                            | orjson.OPT_PASSTHROUGH_DATACLASS),
+                )
+            except orjson.JSONEncodeError:
+                return super().render(data, accepted_media_type,
+                                      renderer_context)
+            for char, escaped in LINE_SEPARATORS:
+                ret = ret.replace(char, escaped)
+            return ret
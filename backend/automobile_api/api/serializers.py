@@ -1,16 +1,154 @@
+from api.authentication import add_claims
+from api.rows import RowSerializer
+from cars.cache import invalidate_cars
+from cars.facets import apply_deltas, car_row, facet_deltas
 from cars.models import Car, Comment
+from cars.search import index_cars
+from cars.validators import FastRegexValidator, ValidationEngine
+from core.metrics import timed
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
-class CarSerializer(serializers.ModelSerializer):
+class TimedDataMixin:
+    """Adds the time of `data` to the serialization of the request."""
+
+    @property
+    def data(self):
+        with timed('serialization'):
+            return super().data
+
+
+class CarListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """
+    Creates or updates many cars with a single query.
+
+    Regex validators of the items run over whole columns of values with
+    `ValidationEngine` instead of once per item.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        columns = {}
+        for name, field in self.child.fields.items():
+            validators = field.validators
+            columns[name] = [validator for validator in validators
+                             if isinstance(validator, FastRegexValidator)]
+            if columns[name]:
+                field.validators = [
+                    validator for validator in validators
+                    if not isinstance(validator, FastRegexValidator)
+                ]
+        self.engine = ValidationEngine.from_validators(
+            {name: found for name, found in columns.items() if found})
+
+    def run_child_validation(self, data):
+        # Errors are reported by `to_internal_value` with column errors.
+        try:
+            return super().run_child_validation(data)
+        except serializers.ValidationError as error:
+            return error
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        errors = [
+            item.detail if isinstance(item, serializers.ValidationError)
+            else {}
+            for item in items
+        ]
+        for name in self.engine.validators:
+            indexes, values = self.column(name, items, data)
+            vector = self.engine.validate_column(name, values)
+            for i, messages in zip(indexes, vector):
+                if messages:
+                    errors[i][name] = messages
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def column(self, name, items, data):
+        """Values of a field that passed item validation, with indexes."""
+        field = self.child.fields[name]
+        indexes, values = [], []
+        for i, (item, initial) in enumerate(zip(items, data)):
+            if not isinstance(item, serializers.ValidationError):
+                if name in item:
+                    indexes.append(i)
+                    values.append(item[name])
+                continue
+            # Other fields of the item are invalid, this one may be too.
+            if (not isinstance(initial, dict) or name in item.detail
+                    or name not in initial):
+                continue
+            try:
+                value = field.run_validation(initial[name])
+            except serializers.ValidationError:
+                continue
+            indexes.append(i)
+            values.append(value)
+        return indexes, values
+
+    def create(self, validated_data):
+        cars = Car.objects.bulk_create(
+            Car(**attrs) for attrs in validated_data
+        )
+        # bulk_create() does not send post_save signals.
+        ids = [car.pk for car in cars]
+        invalidate_cars(ids)
+        index_cars(ids)
+        apply_deltas(facet_deltas(map(car_row, cars), 1))
+        return cars
+
+    def update(self, instance, validated_data):
+        """
+        Update cars of `instance` list with items of `validated_data`
+        that follow in the same order.
+        """
+        fields = {'updated_at'}
+        now = timezone.now()
+        deltas = facet_deltas(map(car_row, instance), -1)
+        for car, attrs in zip(instance, validated_data):
+            for field, value in attrs.items():
+                setattr(car, field, value)
+            # auto_now fields are not touched by bulk_update().
+            car.updated_at = now
+            fields.update(attrs)
+        Car.objects.bulk_update(instance, fields=sorted(fields))
+        ids = [car.pk for car in instance]
+        invalidate_cars(ids)
+        index_cars(ids)
+        deltas.update(facet_deltas(map(car_row, instance), 1))
+        apply_deltas(deltas)
+        return instance
+
+
+class CarSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for Car model instances."""
     class Meta:
         model = Car
         fields = '__all__'
-        read_only_fields = ['owner', ]
+        read_only_fields = ['owner', 'comments_count', 'last_commented_at']
+        list_serializer_class = CarListSerializer
+
+
+class CarSummarySerializer(CarSerializer):
+    """Lightweight representation of cars in lists, without description."""
+    class Meta(CarSerializer.Meta):
+        fields = [
+            'id',
+            'make',
+            'model',
+            'year',
+            'created_at',
+            'updated_at',
+            'owner',
+            'comments_count',
+            'last_commented_at',
+        ]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for Comment model instances."""
 
     author = serializers.StringRelatedField()
@@ -24,3 +162,19 @@ class CommentSerializer(serializers.ModelSerializer):
             'created_at',
         ]
         read_only_fields = ['id', 'author', 'created_at']
+
+
+# Same output for `values()` rows of list endpoints, see `api.rows`.
+car_rows = RowSerializer(CarSerializer)
+car_summary_rows = RowSerializer(CarSummarySerializer)
+comment_rows = RowSerializer(CommentSerializer,
+                             sources={'author': 'author__username'})
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token pair carrying the claims of `StatelessJWTAuthentication`."""
+
+    @classmethod
+    def get_token(cls, user):
+        # Access tokens copy the claims of their refresh token.
+        return add_claims(super().get_token(user), user)
@@ -0,0 +1,46 @@
+from api.authentication import (CLAIMS, get_token_cache, invalidate_tokens,
+                                is_stateless, revocations)
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+UserModel = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=UserModel)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Drop cached tokens of a changed user, e.g. deactivated one."""
+    if get_token_cache() is None:
+        return
+    # Logging in updates last_login only, which permissions do not use.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_tokens(
+        Token.objects.filter(user_id=instance.pk).values_list(
+            'key', flat=True))
+
+
+@receiver(pre_save, sender=UserModel)
+def revoke_changed_claims(sender, instance, update_fields=None, **kwargs):
+    """Revoke JSON web tokens signed with the old claims of the user."""
+    if not is_stateless() or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(CLAIMS):
+        return
+    stored = UserModel._default_manager.filter(pk=instance.pk).values(
+        *CLAIMS).first()
+    if stored is not None and any(
+            stored[claim] != getattr(instance, claim) for claim in CLAIMS):
+        revocations.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=UserModel)
+def revoke_deleted_user(sender, instance, **kwargs):
+    if is_stateless():
+        revocations.revoke_user(instance.pk)
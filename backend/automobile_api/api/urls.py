@@ -1,5 +1,7 @@
-from api.views import CarViewSet, CommentViewSet
-from django.urls import include, path
+from api import async_views
+from api.views import (CacheStatsView, CarViewSet, CommentViewSet,
+                       TokenRevokeView)
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 app_name = 'api'
@@ -10,7 +12,26 @@ api_v1.register(
     CommentViewSet,
     basename='comments')
 
+# Async read path in front of the router, see `api.async_views`.
+drf_views = {url.name: url.callback for url in api_v1.urls}
+async_read_urls = [
+    path('cars/',
+         async_views.read_view(async_views.car_list, drf_views['cars-list']),
+         name='cars-list'),
+    re_path(r'^cars/(?P<pk>\d+)/$',
+            async_views.read_view(async_views.car_detail,
+                                  drf_views['cars-detail']),
+            name='cars-detail'),
+    re_path(r'^cars/(?P<car_id>\d+)/comments/$',
+            async_views.read_view(async_views.comment_list,
+                                  drf_views['comments-list']),
+            name='comments-list'),
+]
+
 urlpatterns = [
+    *async_read_urls,
     path('', include(api_v1.urls)),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('auth/jwt/revoke/', TokenRevokeView.as_view(), name='jwt-revoke'),
     path('auth/', include('djoser.urls.jwt')),
 ]
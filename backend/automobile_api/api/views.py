@@ -1,11 +1,46 @@
+from collections import Counter
+
+from api.authentication import (StatelessJWTAuthentication, is_stateless,
+                                revocations)
+from api.exports import (EXPORT_FORMATS, aexport_chunks, alines,
+                         export_rows)
+from api.filters import CarFilterBackend
+from api.pagination import (CarPagination, CommentPagination,
+                            SearchPagination)
+from api.parsers import NDJSONParser
 from api.permissions import (IsAuthorOrIsStaffOrReadOnly,
                              IsOwnerOrIsStaffOrReadOnly)
-from api.serializers import CarSerializer, CommentSerializer
-from cars.models import Car
+from api.serializers import (CarSerializer, CarSummarySerializer,
+                             CommentSerializer, car_summary_rows,
+                             comment_rows)
+from cars.cache import cached_detail, cached_list, counters
+from cars.conditions import car_etag, car_last_modified
+from cars.facets import get_counts
+from cars.models import Car, Comment
+from cars.search import search_cars
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import mixins, viewsets
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+UserModel = get_user_model()
 
 
 class CarViewSet(mixins.ListModelMixin,
@@ -20,13 +55,201 @@ class CarViewSet(mixins.ListModelMixin,
 
     queryset = Car.objects.all()
     serializer_class = CarSerializer
+    pagination_class = CarPagination
     permission_classes = (IsOwnerOrIsStaffOrReadOnly, )
+    filter_backends = (CarFilterBackend, )
     http_method_names = ['get', 'post', 'put', 'delete']
+    bulk_max_items = 1000
+    export_chunk_size = 2000
+    facet_limit = 100
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Lists skip the description, which may be large.
+            queryset = queryset.only(*CarSummarySerializer.Meta.fields)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'search'):
+            return CarSummarySerializer
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        # Links of a page are absolute, so the host is a part of the key.
+        params = (request.scheme, request.get_host(),
+                  sorted(request.query_params.lists()))
+        return Response(cached_list(
+            'api', params, lambda: self.list_rows(request)))
+
+    def list_rows(self, request):
+        """Data of `ListModelMixin.list` serialized from `values()`."""
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *car_summary_rows.columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return car_summary_rows.many(queryset)
+        return self.get_paginated_response(car_summary_rows.many(page)).data
+
+    @method_decorator(condition(etag_func=car_etag,
+                                last_modified_func=car_last_modified))
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return Response(cached_detail(
+            'api', int(pk),
+            lambda: super(CarViewSet, self).retrieve(
+                request, *args, **kwargs).data
+        ))
 
     def perform_create(self, serializer):
         # Set the author to the request user when creating a car
         serializer.save(owner=self.request.user)
 
+    @action(detail=False, methods=['post', 'put'],
+            parser_classes=(JSONParser, NDJSONParser))
+    def bulk(self, request):
+        """
+        Create (POST) or update (PUT) up to `bulk_max_items` cars at once.
+
+        Accepts a JSON array or an NDJSON body. Every item is validated,
+        then all of them are written in one transaction. On failure
+        nothing is saved and errors are returned per item, in the order
+        of the request.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError('Expected a list of cars.')
+        if len(request.data) > self.bulk_max_items:
+            raise ValidationError(
+                f'Ensure there are no more than {self.bulk_max_items} cars.')
+        if request.method == 'PUT':
+            return self.bulk_update(request)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(owner=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Count cars per make, model, year and owner, most common first.
+
+        Accepts the filters of the list. Counts of all cars come from the
+        maintained facet table, counts of a filtered list are aggregated
+        on request.
+        """
+        filters = CarFilterBackend().get_lookups(request.query_params)
+        params = sorted(request.query_params.lists())
+        return Response(cached_list(
+            'facets', params,
+            lambda: self.get_facets(
+                Car.objects.filter(**filters) if filters else None)
+        ))
+
+    def get_facets(self, queryset):
+        counts = get_counts(queryset, limit=self.facet_limit)
+        usernames = dict(UserModel.objects.filter(
+            pk__in=[item['value'] for item in counts['owner']]
+        ).values_list('pk', 'username'))
+        for item in counts['owner']:
+            item['label'] = usernames.get(item['value'])
+        return counts
+
+    @action(detail=False, methods=['get'],
+            pagination_class=SearchPagination)
+    def search(self, request):
+        """
+        Find cars by words of `?q=` in their make, model, description
+        and comments, best matches first. Every word must match the start
+        of a word of the car, e.g. `?q=седан toyo`. Accepts the filters
+        of the list.
+        """
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            raise ValidationError({'q': ['This parameter is required.']})
+        queryset = self.filter_queryset(search_cars(query)).only(
+            *CarSummarySerializer.Meta.fields)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every car as NDJSON (default) or CSV (`?output=csv`).
+
+        Rows are read with `values_list()` in chunks, so memory use does
+        not depend on the amount of cars. Under ASGI the content is an
+        async iterator over `aiterator()`. Supports `?owner=<id>`,
+        `?make=<make>` and `?updated_since=<ISO 8601 datetime>` filters,
+        rows are ordered by `updated_at` to allow incremental exports.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'output': [f'Choose one of: {", ".join(EXPORT_FORMATS)}.']})
+        queryset = Car.objects.order_by('updated_at', 'id')
+        params = request.query_params
+        if 'owner' in params:
+            if not params['owner'].isdigit():
+                raise ValidationError({'owner': ['Expected a user id.']})
+            queryset = queryset.filter(owner_id=params['owner'])
+        if 'make' in params:
+            queryset = queryset.filter(make=params['make'])
+        if 'updated_since' in params:
+            try:
+                updated_since = parse_datetime(params['updated_since'])
+            except ValueError:
+                updated_since = None
+            if updated_since is None:
+                raise ValidationError(
+                    {'updated_since': ['Expected an ISO 8601 datetime.']})
+            if timezone.is_naive(updated_since):
+                updated_since = timezone.make_aware(updated_since)
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        to_lines, content_type = EXPORT_FORMATS[output]
+        if isinstance(request._request, ASGIRequest):
+            # ASGI reads sync iterators to the end before sending them.
+            content = alines(to_lines, aexport_chunks(
+                queryset, self.export_chunk_size))
+        else:
+            content = to_lines(export_rows(queryset,
+                                           self.export_chunk_size))
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="cars.{output}"')
+        return response
+
+    def bulk_update(self, request):
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in request.data]
+        counts = Counter(ids)
+        # JSON true and false are parsed into bool, a subclass of int.
+        errors = [
+            {} if isinstance(car_id, int) and not isinstance(car_id, bool)
+            and counts[car_id] == 1
+            else {'id': ['A unique car id is required.']}
+            for car_id in ids
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        cars = Car.objects.select_related('owner').in_bulk(ids)
+        missing = [car_id for car_id in ids if car_id not in cars]
+        if missing:
+            raise NotFound(f'Cars not found: {missing}.')
+        instances = [cars[car_id] for car_id in ids]
+        for car in instances:
+            self.check_object_permissions(request, car)
+        serializer = self.get_serializer(
+            instances, data=request.data, many=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
 
 class CommentViewSet(mixins.CreateModelMixin,
                      mixins.RetrieveModelMixin,
@@ -37,6 +260,7 @@ class CommentViewSet(mixins.CreateModelMixin,
     """
 
     serializer_class = CommentSerializer
+    pagination_class = CommentPagination
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorOrIsStaffOrReadOnly,
@@ -47,15 +271,81 @@ class CommentViewSet(mixins.CreateModelMixin,
 
     def get_car(self):
         car = get_object_or_404(
-            Car, id=self.kwargs['car_id']
+            Car.objects.only('id'), id=self.kwargs['car_id']
         )
         return car
 
+    @staticmethod
+    def comments_queryset(car_id):
+        # The car itself is not loaded: a missing car gives 404 on
+        # retrieve anyway and is checked by `list` only for empty pages.
+        return (
+            Comment.objects.filter(car_id=car_id)
+            .select_related('author')
+            .only('id', 'content', 'created_at', 'car_id',
+                  'author__username')
+        )
+
     def get_queryset(self):
-        return self.get_car().comments.all()
+        return self.comments_queryset(self.kwargs['car_id'])
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.list_rows(request))
+
+    def list_rows(self, request):
+        """Data of `ListModelMixin.list` serialized from `values()`."""
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *comment_rows.columns)
+        page = self.paginate_queryset(queryset)
+        comments = page if page is not None else list(queryset)
+        if not comments and not Car.objects.filter(
+                id=self.kwargs['car_id']).exists():
+            raise NotFound()
+        data = comment_rows.many(comments)
+        if page is None:
+            return data
+        return self.get_paginated_response(data).data
 
     def perform_create(self, serializer):
-        serializer.save(
-            author=self.request.user,
-            car=self.get_car()
-        )
+        # The comment and the activity of its car are saved together.
+        with transaction.atomic():
+            serializer.save(
+                author=self.request.user,
+                car=self.get_car()
+            )
+
+
+class CacheStatsView(APIView):
+    """Hit and miss counters of the car cache of this process."""
+
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        return Response(counters.snapshot())
+
+
+class TokenRevokeView(APIView):
+    """
+    Revoke the JSON web token of the request and blacklist the refresh
+    token of the same user given in the body, i.e. log out.
+    """
+
+    authentication_classes = (StatelessJWTAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def post(self, request):
+        try:
+            refresh = RefreshToken(request.data['refresh'])
+        except (KeyError, TypeError):
+            raise ValidationError({'refresh': 'This field is required.'})
+        except TokenError as error:
+            raise ValidationError({'refresh': str(error)})
+        claim = jwt_settings.USER_ID_CLAIM
+        if refresh.get(claim) != request.auth.get(claim):
+            raise ValidationError(
+                {'refresh': 'Token belongs to another user.'})
+        refresh.blacklist()
+        if is_stateless():
+            # Otherwise the user is loaded and the token expires soon.
+            revocations.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,146 @@
+'''
+Database settings built from environment variables.
+
+* DB_ENGINE: 'sqlite' (default) or 'postgresql'.
+* DB_PROFILE: 'development' (default) or 'production'. The production
+  profile keeps connections open between requests and, for SQLite, turns
+  on the write-ahead log and the pragmas of `SQLITE_PRODUCTION_PRAGMAS`,
+  so writers wait for each other instead of failing with "database is
+  locked".
+* DB_NAME: Database name, a file path for SQLite.
+* DB_USER, DB_PASSWORD, DB_HOST, DB_PORT: PostgreSQL connection.
+* DB_CONN_MAX_AGE: Seconds to keep a connection, overrides the profile.
+* DB_POOL_MAX_SIZE: Size of the PostgreSQL connection pool of every
+  process in the production profile (requires psycopg[pool]), 0 uses
+  persistent connections instead.
+* DB_REPLICAS: Comma separated read replicas of the database: SQLite
+  files or PostgreSQL hosts (host or host:port). They are configured as
+  aliases 'replica_1', 'replica_2' and so on, see `core.replicas`.
+
+Pragmas of a database are listed in the PRAGMAS key of its settings and
+applied to every new connection by `apply_pragmas`.
+'''
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('development', 'production')
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+SQLITE_PRODUCTION_PRAGMAS = {
+    # Readers do not block the writer and the writer does not block them.
+    'journal_mode': 'WAL',
+    # With WAL the database stays consistent, only the last transactions
+    # may be lost on a power failure.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative value is in KiB: 64 MiB of page cache per connection.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRODUCTION_OPTIONS = {
+    # Seconds a connection waits for the write lock.
+    'timeout': 20,
+    # Take the write lock when a transaction starts. A deferred
+    # transaction that reads first fails at once when it needs to write
+    # while another connection writes, regardless of the timeout.
+    'transaction_mode': 'IMMEDIATE',
+}
+PRODUCTION_CONN_MAX_AGE = 600
+DEFAULT_POOL_MAX_SIZE = 10
+
+
+def get_choice(environ, name, choices, default):
+    value = environ.get(name, default)
+    if value not in choices:
+        raise ImproperlyConfigured(
+            f'{name} must be one of: {", ".join(choices)}.')
+    return value
+
+
+def get_int(environ, name, default):
+    try:
+        return int(environ.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} must be an integer.')
+
+
+def sqlite_settings(name, production):
+    """Settings of a SQLite database, tuned for concurrent writers."""
+    if not production:
+        return {'ENGINE': ENGINES['sqlite'], 'NAME': name}
+    return {
+        'ENGINE': ENGINES['sqlite'],
+        'NAME': name,
+        'OPTIONS': dict(SQLITE_PRODUCTION_OPTIONS),
+        'PRAGMAS': dict(SQLITE_PRODUCTION_PRAGMAS),
+    }
+
+
+def database_settings(environ, base_dir):
+    """
+    Return settings of the default database described by the environment.
+
+    Args:
+        environ (Mapping): Environment variables, see the module docstring.
+        base_dir (Path): Directory of the default SQLite file.
+    """
+    engine = get_choice(environ, 'DB_ENGINE', ENGINES, 'sqlite')
+    production = get_choice(environ, 'DB_PROFILE', PROFILES,
+                            'development') == 'production'
+    conn_max_age = get_int(environ, 'DB_CONN_MAX_AGE',
+                           PRODUCTION_CONN_MAX_AGE if production else 0)
+    if engine == 'sqlite':
+        database = sqlite_settings(
+            environ.get('DB_NAME', str(base_dir / 'db.sqlite3')), production)
+        database['CONN_MAX_AGE'] = conn_max_age
+        database['CONN_HEALTH_CHECKS'] = production
+        return database
+
+    database = {
+        'ENGINE': ENGINES['postgresql'],
+        'NAME': environ.get('DB_NAME', 'automobile_api'),
+        'USER': environ.get('DB_USER', ''),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', ''),
+        'PORT': environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': production,
+    }
+    pool_max_size = get_int(environ, 'DB_POOL_MAX_SIZE',
+                            DEFAULT_POOL_MAX_SIZE if production else 0)
+    if pool_max_size:
+        # The pool reuses connections itself, Django refuses to combine
+        # it with persistent connections.
+        database['OPTIONS'] = {'pool': {'min_size': 1,
+                                        'max_size': pool_max_size}}
+        database['CONN_MAX_AGE'] = 0
+    return database
+
+
+def replica_settings(environ, primary):
+    """
+    Return settings of the read replicas by alias. A replica is
+    connected like the primary, except for the file or the host.
+    """
+    replicas = {}
+    names = [name.strip() for name in environ.get('DB_REPLICAS', '')
+             .split(',') if name.strip()]
+    for number, name in enumerate(names, start=1):
+        replica = {**primary, 'TEST': {'MIRROR': 'default'}}
+        if primary['ENGINE'] == ENGINES['sqlite']:
+            replica['NAME'] = name
+        else:
+            replica['HOST'], _, replica['PORT'] = name.partition(':')
+        replicas[f'replica_{number}'] = replica
+    return replicas
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """`connection_created` receiver that runs PRAGMAS of the database."""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -9,9 +9,13 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import os
 import sys
 from pathlib import Path
 
+from automobile_api.database import database_settings, replica_settings
+from automobile_api.templating import template_loaders
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,9 +27,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-z9^qnkol4c@+%=s!)bbpn(c$txrl^vk#tf%$)70o(&zd@16zfw'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in
+                 os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+                 if host]
 
 
 # Application definition
@@ -39,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'djoser',
     'admin_site.apps.AdminSiteConfig',
     'api.apps.ApiConfig',
@@ -50,23 +57,33 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Go first to time and to see queries of every other middleware.
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Needs the user of the session to keep it on the primary after writes.
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'automobile_api.urls'
 
+# Templates of DIRS and of the apps, compiled templates are cached
+# outside of development, see `automobile_api.templating`.
+TEMPLATE_LOADERS = template_loaders(os.environ, DEBUG)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -90,12 +107,136 @@ if 'test' in sys.argv:  # Check if tests was triggered with 'manage.py test' com
         }
     }
 else:
+    # DB_ENGINE, DB_PROFILE and other variables, see automobile_api/database.py.
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        'default': database_settings(os.environ, BASE_DIR),
     }
+    DATABASES.update(replica_settings(os.environ, DATABASES['default']))
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Read replicas, used by ReplicaMiddleware for safe requests to the
+# listed views (URL names). A client that wrote reads from the primary
+# for STICKY_SECONDS afterwards. CACHE_ALIAS must be shared by all server
+# processes (core.W001), LocMemCache keeps clients within one process.
+DATABASE_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'VIEWS': [
+        'cars:index',
+        'cars:car-rows',
+        'cars:car-detail',
+        'cars:car-comments',
+        'api:cars-list',
+        'api:cars-detail',
+        'api:cars-search',
+        'api:cars-facets',
+        'api:cars-export',
+        'api:comments-list',
+        'api:comments-detail',
+    ],
+    'STICKY_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'cars': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cars',
+        # Rows of car pages are cached one by one, the default of 300
+        # entries would evict them before they are shown again.
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+if 'test' in sys.argv:
+    # Cached payloads must not leak between test cases.
+    CACHES['cars']['BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+
+# Cache alias and timeout (seconds) of car lists and car payloads.
+CARS_CACHE_ALIAS = 'cars'
+CARS_CACHE_TIMEOUT = 300
+
+# Full-text search index of cars: 'fts5' (SQLite only), 'python' or 'auto'
+# to use FTS5 whenever the database supports it.
+CARS_SEARCH_BACKEND = 'auto'
+
+# Facet counts of all cars are read from the table maintained on writes,
+# 'live' aggregates them from the cars table on every request instead.
+CARS_FACET_COUNTS = 'table'
+
+
+# SQL queries allowed per request, checked by QueryBudgetMiddleware.
+# Views are looked up by URL name; MODE is 'log' or 'raise'.
+QUERY_BUDGET = {
+    'ENABLED': DEBUG and 'test' not in sys.argv,
+    'MODE': 'log',
+    'DEFAULT': 20,
+    'REPEATED': 3,  # Executions of the same query shape per request.
+    'VIEWS': {
+        'cars:index': 3,
+        'cars:car-rows': 3,
+        'cars:car-detail': 5,
+        'cars:car-comments': 3,
+        'api:cars-list': 5,
+        'api:cars-detail': 5,
+        'api:comments-list': 5,
+    },
+}
+
+
+# Request metrics served at /metrics to ALLOWED_IPS, see core/metrics.py.
+# Processes of a pre-fork server share their values through files in
+# DIRECTORY.
+METRICS = {
+    'ENABLED': True,
+    'DIRECTORY': os.environ.get('METRICS_DIRECTORY'),
+    'FLUSH_INTERVAL': 5,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# Opt-in cProfile of sampled requests and of requests with the signed
+# X-Profile header (manage.py profile_header), see core/profiling.py.
+# Files of DIRECTORY are merged by manage.py aggregate_profiles.
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING', '') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0)),
+    'HEADER': 'X-Profile',
+    'HEADER_MAX_AGE': 3600,
+    'DIRECTORY': BASE_DIR / 'profiles',
+}
+
+
+# Authenticated API tokens and their users kept between requests, see
+# api/authentication.py. CACHE_ALIAS adds a cache shared by processes.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'CACHE_ALIAS': None,
+}
+if 'test' in sys.argv:
+    # Rolled back test data sends no signals to invalidate the tokens.
+    TOKEN_AUTH_CACHE['MAX_SIZE'] = 0
+
+# Opt-in check of permissions of JSON web tokens by their signed claims
+# without loading the user, see api/authentication.py. Revocations are
+# kept in memory and read from the database every REFRESH_INTERVAL
+# seconds to learn the ones of other processes.
+STATELESS_JWT = {
+    'ENABLED': os.environ.get('STATELESS_JWT', '') == '1',
+    'REFRESH_INTERVAL': 5,
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': (
+        'api.serializers.ClaimsTokenObtainPairSerializer'),
+}
 
 
 # Password validation
@@ -142,7 +283,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
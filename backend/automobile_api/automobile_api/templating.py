@@ -0,0 +1,24 @@
+'''
+Template settings built from environment variables.
+
+* TEMPLATE_CACHE: '1' keeps compiled templates for the life of the
+  process, '0' reads them from disk on every render. Defaults to caching
+  when DEBUG is turned off (DJANGO_DEBUG=0).
+'''
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def template_loaders(environ, debug):
+    """
+    Return the template loaders described by the environment.
+
+    Django would cache templates in DEBUG as well when no loaders are
+    given, so the loaders are always listed explicitly.
+    """
+    cached = environ.get('TEMPLATE_CACHE', '0' if debug else '1') == '1'
+    if not cached:
+        return list(LOADERS)
+    return [('django.template.loaders.cached.Loader', list(LOADERS))]
@@ -1,3 +1,4 @@
+from core.views import metrics_view
 from django.contrib import admin
 from django.urls import include, path, reverse_lazy
 from django.views.generic.edit import CreateView
@@ -39,5 +40,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls'), name='api'),
     path('docs/', include(docs_urlpatterns), name='docs'),
-    path('auth/', include(auth_urlpatterns), name='auth')
+    path('auth/', include(auth_urlpatterns), name='auth'),
+    path('metrics', metrics_view, name='metrics'),
 ]
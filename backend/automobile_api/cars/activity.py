@@ -0,0 +1,90 @@
+'''
+Denormalized comment activity of cars: `Car.comments_count` and
+`Car.last_commented_at`.
+
+A new comment is accounted by a `post_save` receiver with a single
+UPDATE built from F() expressions, so concurrent comments never lose an
+increment, wherever the comment is created. Comments written in bulk or
+deleted are reconciled from the comments table with
+`refresh_comment_activity`, `find_inconsistent_cars` reports any drift.
+'''
+from cars.cache import invalidate_cars
+from cars.models import Car, Comment
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import (Count, DateTimeField, F, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Greatest
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def record_comment(comment, using=DEFAULT_DB_ALIAS):
+    """Account a saved comment in the activity fields of its car."""
+    created_at = Value(comment.created_at, output_field=DateTimeField())
+    Car.objects.using(using).filter(pk=comment.car_id).update(
+        comments_count=F('comments_count') + 1,
+        # Greatest() of a NULL is NULL on SQLite, hence the Coalesce().
+        last_commented_at=Greatest(
+            Coalesce('last_commented_at', created_at), created_at
+        ),
+    )
+    # update() sends no signals, lists show the counter as well.
+    invalidate_cars([comment.car_id])
+
+
+def actual_activity():
+    """
+    Annotations of a Car queryset with the activity computed from the
+    comments table. Both subqueries are served by the car comments index.
+    """
+    comments = Comment.objects.filter(car=OuterRef('pk')).order_by()
+    return {
+        'actual_count': Coalesce(
+            Subquery(comments.values('car')
+                     .annotate(count=Count('pk')).values('count')),
+            0,
+        ),
+        'actual_last': Subquery(comments.order_by('-created_at')
+                                .values('created_at')[:1]),
+    }
+
+
+def refresh_comment_activity(car_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute activity fields of the cars (or of every car) from the
+    comments table, `batch_size` cars per UPDATE.
+
+    Returns:
+        int: Amount of updated cars.
+    """
+    queryset = Car.objects.order_by('pk')
+    if car_ids is not None:
+        queryset = queryset.filter(pk__in=car_ids)
+    activity = actual_activity()
+    updated, last_pk = 0, None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk)
+        batch = list(page.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return updated
+        updated += Car.objects.filter(pk__in=batch).update(
+            comments_count=activity['actual_count'],
+            last_commented_at=activity['actual_last'],
+        )
+        invalidate_cars(batch)
+        last_pk = batch[-1]
+
+
+def find_inconsistent_cars(chunk_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield (car id, stored activity, actual activity) of every car whose
+    activity fields differ from the comments table.
+    """
+    rows = (Car.objects.order_by('pk').annotate(**actual_activity())
+            .values_list('pk', 'comments_count', 'last_commented_at',
+                         'actual_count', 'actual_last')
+            .iterator(chunk_size=chunk_size))
+    for pk, count, last, actual_count, actual_last in rows:
+        if (count, last) != (actual_count, actual_last):
+            yield pk, (count, last), (actual_count, actual_last)
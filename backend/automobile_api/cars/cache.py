@@ -0,0 +1,209 @@
+'''
+Cache of car lists and car payloads with write-through invalidation.
+
+List entries include a version number in their keys. Any change of a car
+bumps the version, which makes every cached list unreachable at once
+without scanning the cache. Per-car entries are deleted explicitly when
+the car or one of its comments changes, see `cars.signals`.
+
+Functions prefixed with `a` are counterparts for async views, they use
+the async cache API and share keys and counters with the sync ones.
+
+HTML pages cache rendered fragments with the `{% cache %}` tag in the
+same cache, see `fragment_context`. Their keys carry what they show: the
+car table the list version, a car row the time the car was updated, the
+comments of a car the time of the last one and their number, so they
+need no invalidation. A renamed owner is shown in rows until they
+expire.
+'''
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from core.metrics import CACHE_REQUESTS, timed
+from django.conf import settings
+from django.core.cache import caches
+
+LIST_VERSION_KEY = 'cars:list:version'
+DETAIL_NAMESPACES = ('api', 'html')
+MISSING = object()
+
+
+class CacheCounters:
+    """Thread-safe hit and miss counters per namespace."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+
+    def hit(self, namespace):
+        with self._lock:
+            self._hits[namespace] += 1
+        CACHE_REQUESTS.inc((namespace, 'hit'))
+
+    def miss(self, namespace):
+        with self._lock:
+            self._misses[namespace] += 1
+        CACHE_REQUESTS.inc((namespace, 'miss'))
+
+    def snapshot(self):
+        """Return counters and hit rate of every namespace."""
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            result = {}
+            for namespace in namespaces:
+                hits = self._hits[namespace]
+                misses = self._misses[namespace]
+                result[namespace] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 4),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+
+
+counters = CacheCounters()
+
+
+def get_cache():
+    return caches[settings.CARS_CACHE_ALIAS]
+
+
+def get_list_version(cache):
+    # A missing version starts from the current time, so it can never
+    # reuse a number of keys that may still be in the cache.
+    with timed('cache'):
+        return cache.get_or_set(LIST_VERSION_KEY, time.time_ns(), None)
+
+
+async def aget_list_version(cache):
+    with timed('cache'):
+        return await cache.aget_or_set(LIST_VERSION_KEY, time.time_ns(),
+                                       None)
+
+
+def list_key(namespace, version, params):
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+    return f'cars:list:{namespace}:{version}:{digest}'
+
+
+def get_or_compute(key, namespace, compute):
+    """Return a cached value or store the result of `compute()`."""
+    cache = get_cache()
+    with timed('cache'):
+        value = cache.get(key, MISSING)
+    if value is not MISSING:
+        counters.hit(namespace)
+        return value
+    counters.miss(namespace)
+    value = compute()
+    with timed('cache'):
+        cache.set(key, value, settings.CARS_CACHE_TIMEOUT)
+    return value
+
+
+def cached_list(namespace, params, compute):
+    """
+    Cache a list payload under the given request parameters.
+
+    Args:
+        namespace (str): Kind of payload, e.g. 'api' or 'html'.
+        params (iterable): Hashable description of the request, such as
+            sorted query parameters.
+        compute (callable): Builds the payload on a cache miss.
+    """
+    key = list_key(namespace, get_list_version(get_cache()), params)
+    return get_or_compute(key, f'{namespace}-list', compute)
+
+
+def detail_key(namespace, car_id):
+    return f'cars:detail:{namespace}:{car_id}'
+
+
+def cached_detail(namespace, car_id, compute):
+    """Cache a payload of a single car."""
+    return get_or_compute(detail_key(namespace, car_id),
+                          f'{namespace}-detail', compute)
+
+
+async def alookup(key, namespace):
+    """
+    Return a cached value or MISSING. Only a hit is counted, a miss is
+    counted by whoever computes the value afterwards.
+    """
+    with timed('cache'):
+        value = await get_cache().aget(key, MISSING)
+    if value is not MISSING:
+        counters.hit(namespace)
+    return value
+
+
+async def astore(key, namespace, value):
+    """Store a value computed after a miss of `alookup`."""
+    counters.miss(namespace)
+    with timed('cache'):
+        await get_cache().aset(key, value, settings.CARS_CACHE_TIMEOUT)
+
+
+async def aget_or_compute(key, namespace, compute):
+    """Async `get_or_compute`, `compute` is a coroutine function."""
+    value = await alookup(key, namespace)
+    if value is not MISSING:
+        return value
+    value = await compute()
+    await astore(key, namespace, value)
+    return value
+
+
+def fragment_context():
+    """Context of the `{% cache %}` tags of car templates."""
+    return {
+        'fragment_cache': settings.CARS_CACHE_ALIAS,
+        'fragment_timeout': settings.CARS_CACHE_TIMEOUT,
+    }
+
+
+async def alist_key(namespace, params):
+    return list_key(namespace, await aget_list_version(get_cache()), params)
+
+
+async def acached_list(namespace, params, compute):
+    return await aget_or_compute(await alist_key(namespace, params),
+                                 f'{namespace}-list', compute)
+
+
+async def acached_detail(namespace, car_id, compute):
+    return await aget_or_compute(detail_key(namespace, car_id),
+                                 f'{namespace}-detail', compute)
+
+
+def invalidate_lists():
+    cache = get_cache()
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        # A missing version is recreated from the current time on the
+        # next read, which invalidates the lists as well.
+        pass
+
+
+def invalidate_car_details(car_ids):
+    """Drop cached payloads of the cars, but keep the lists."""
+    get_cache().delete_many([
+        detail_key(namespace, car_id)
+        for car_id in car_ids
+        for namespace in DETAIL_NAMESPACES
+    ])
+
+
+def invalidate_cars(car_ids):
+    """Drop cached payloads of the cars and every cached list."""
+    invalidate_car_details(car_ids)
+    invalidate_lists()
@@ -0,0 +1,148 @@
+'''
+ETag and Last-Modified values of car pages for `django.views.decorators.
+http.condition`. They are computed from the car row fetched with a single
+primary key lookup, without rendering or serializing the car.
+
+`condition` calls these functions synchronously, async views use
+`async_condition` with the coroutine counterparts prefixed with `a`.
+The HTML detail page is async only, so its ETag has no sync version.
+'''
+import datetime
+import hashlib
+from functools import wraps
+
+from cars.models import Car
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+MISSING = object()
+
+
+def get_state(request, pk):
+    """
+    Return (updated_at, comments_count, last_commented_at) of the car
+    or None.
+
+    The result is stored on the request, because `condition` asks for the
+    ETag and for the Last-Modified value separately.
+    """
+    state = getattr(request, '_car_state', MISSING)
+    if state is not MISSING:
+        return state
+    state = None
+    if str(pk).isdigit():
+        state = Car.objects.filter(pk=pk).values_list(
+            'updated_at', 'comments_count', 'last_commented_at'
+        ).first()
+    request._car_state = state
+    return state
+
+
+async def aget_state(request, pk):
+    """Async `get_state`, both store the result on the request."""
+    state = getattr(request, '_car_state', MISSING)
+    if state is not MISSING:
+        return state
+    state = None
+    if str(pk).isdigit():
+        state = await Car.objects.filter(pk=pk).values_list(
+            'updated_at', 'comments_count', 'last_commented_at'
+        ).afirst()
+    request._car_state = state
+    return state
+
+
+def make_etag(*parts):
+    return hashlib.md5(
+        '|'.join(str(part) for part in parts).encode('utf-8')
+    ).hexdigest()
+
+
+def car_etag(request, pk, **kwargs):
+    """ETag of the API representation of a car."""
+    state = get_state(request, pk)
+    if state is None:
+        return None
+    return make_etag('api', pk, *state)
+
+
+def car_last_modified(request, pk, **kwargs):
+    state = get_state(request, pk)
+    if state is None:
+        return None
+    updated_at, _, last_commented_at = state
+    return max(updated_at, last_commented_at or updated_at)
+
+
+async def acar_etag(request, pk, **kwargs):
+    state = await aget_state(request, pk)
+    if state is None:
+        return None
+    return make_etag('api', pk, *state)
+
+
+async def acar_last_modified(request, pk, **kwargs):
+    state = await aget_state(request, pk)
+    if state is None:
+        return None
+    updated_at, _, last_commented_at = state
+    return max(updated_at, last_commented_at or updated_at)
+
+
+async def acar_page_etag(request, pk, **kwargs):
+    """
+    ETag of the car detail page. The page shows comments and differs
+    for every user and page of comments, so those are a part of the tag
+    as well.
+
+    There is no Last-Modified counterpart: a date alone cannot tell
+    that the page was rendered for another user.
+    """
+    state = await aget_state(request, pk)
+    if state is None:
+        return None
+    user = await request.auser()
+    return make_etag('html', pk, *state, user.pk,
+                     request.GET.get('cursor', ''))
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """
+    `condition` for async views, `etag_func` and `last_modified_func`
+    are coroutine functions.
+
+    The view may return None to hand the request over to someone else,
+    no validators are added to it then.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            last_modified = None
+            if last_modified_func:
+                value = await last_modified_func(request, *args, **kwargs)
+                if value:
+                    if not timezone.is_aware(value):
+                        value = timezone.make_aware(
+                            value, datetime.timezone.utc)
+                    last_modified = int(value.timestamp())
+            etag = None
+            if etag_func:
+                etag = await etag_func(request, *args, **kwargs)
+                etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await func(request, *args, **kwargs)
+
+            if response is not None and request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header(
+                        'Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(
+                        last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
@@ -2,3 +2,8 @@
 
 MAX_CHARFIELD = 128
 MAX_DESCRIPTION = 1024
+MAX_SEARCH_TERM = 64
+# Cars of a homepage page and comments of a car page, further ones are
+# loaded by "load more" links.
+CARS_PAGE_SIZE = 50
+COMMENTS_PAGE_SIZE = 20
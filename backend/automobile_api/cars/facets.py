@@ -0,0 +1,158 @@
+'''
+Facet counts of cars: how many cars have each make, model, year and owner.
+
+Counts are kept in the `CarFacet` table and updated incrementally by
+`cars.signals` and by the bulk write paths, so reading them is a single
+indexed query instead of a GROUP BY over all cars. Counts of a filtered
+set of cars, or all counts when `CARS_FACET_COUNTS` is 'live', are
+aggregated from the cars table on request.
+'''
+from collections import Counter, defaultdict
+
+from cars.models import Car, CarFacet
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+# Facet names and the Car columns they count.
+FACETS = {
+    'make': 'make',
+    'model': 'model',
+    'year': 'year',
+    'owner': 'owner_id',
+}
+COLUMNS = tuple(FACETS.values())
+
+
+def to_value(column_value):
+    """Table representation of a column value, NULL becomes ''."""
+    return '' if column_value is None else str(column_value)
+
+
+def from_value(facet, value):
+    if value == '':
+        return None
+    return int(value) if facet in ('year', 'owner') else value
+
+
+def facet_deltas(rows, delta):
+    """
+    Return a Counter of {(facet, value): delta} for rows of facet columns,
+    such as those of `Car.objects.values_list(*COLUMNS)`.
+    """
+    deltas = Counter()
+    for row in rows:
+        for facet, column_value in zip(FACETS, row):
+            deltas[facet, to_value(column_value)] += delta
+    return deltas
+
+
+def car_row(car):
+    return tuple(getattr(car, column) for column in COLUMNS)
+
+
+def apply_deltas(deltas):
+    """Add the deltas to the stored counts with F() expressions."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Rows seen for the first time are created with a zero count and
+        # then incremented like all the others.
+        CarFacet.objects.bulk_create(
+            (CarFacet(facet=facet, value=value)
+             for facet, value in deltas),
+            ignore_conflicts=True,
+        )
+        # One UPDATE per distinct delta, bulk writes mostly add 1.
+        keys = defaultdict(lambda: defaultdict(list))
+        for (facet, value), delta in deltas.items():
+            keys[delta][facet].append(value)
+        for delta, values in keys.items():
+            condition = Q()
+            for facet, facet_values in values.items():
+                condition |= Q(facet=facet, value__in=facet_values)
+            CarFacet.objects.filter(condition).update(
+                count=F('count') + delta)
+
+
+def live_counts(queryset, limit):
+    """Aggregate facet counts of the queryset, one GROUP BY per facet."""
+    counts = {}
+    for facet, column in FACETS.items():
+        rows = (queryset.order_by().values(column)
+                .annotate(count=Count('pk'))
+                .order_by('-count', column)[:limit])
+        counts[facet] = [
+            {'value': row[column], 'count': row['count']} for row in rows
+        ]
+    return counts
+
+
+def table_counts(limit):
+    """Read facet counts of all cars from the CarFacet table."""
+    counts = {}
+    for facet in FACETS:
+        rows = (CarFacet.objects.filter(facet=facet, count__gt=0)
+                .order_by('-count', 'value')
+                .values_list('value', 'count')[:limit])
+        counts[facet] = [
+            {'value': from_value(facet, value), 'count': count}
+            for value, count in rows
+        ]
+    return counts
+
+
+def get_counts(queryset=None, limit=100):
+    """
+    Return {facet: [{'value': ..., 'count': ...}]}, most common first.
+
+    Args:
+        queryset: Filtered cars. Counts of all cars are read from the
+            table unless `CARS_FACET_COUNTS` is 'live'.
+        limit (int): Maximum amount of values per facet.
+    """
+    if queryset is None and settings.CARS_FACET_COUNTS == 'table':
+        return table_counts(limit)
+    return live_counts(
+        Car.objects.all() if queryset is None else queryset, limit)
+
+
+def actual_counts():
+    """Counter of {(facet, value): count} aggregated from the cars."""
+    counts = Counter()
+    for facet, column in FACETS.items():
+        rows = (Car.objects.order_by().values_list(column)
+                .annotate(count=Count('pk')))
+        for column_value, count in rows:
+            counts[facet, to_value(column_value)] = count
+    return counts
+
+
+def rebuild_facets():
+    """
+    Replace stored counts with ones aggregated from the cars table.
+
+    Returns:
+        int: Amount of stored facet values.
+    """
+    counts = actual_counts()
+    with transaction.atomic():
+        CarFacet.objects.all().delete()
+        CarFacet.objects.bulk_create(
+            CarFacet(facet=facet, value=value, count=count)
+            for (facet, value), count in counts.items()
+        )
+    return len(counts)
+
+
+def find_inconsistent_facets():
+    """Yield (facet, value, stored count, actual count) that differ."""
+    actual = actual_counts()
+    stored = Counter({
+        (facet, value): count for facet, value, count in
+        CarFacet.objects.values_list('facet', 'value', 'count')
+    })
+    for key in sorted(set(actual) | set(stored)):
+        if actual[key] != stored[key]:
+            yield (*key, stored[key], actual[key])
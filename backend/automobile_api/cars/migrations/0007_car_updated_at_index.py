@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_car_comment_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['updated_at', 'id'], name='car_updated_at_id_idx'),
+        ),
+    ]
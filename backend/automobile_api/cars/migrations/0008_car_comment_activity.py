@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_activity(apps, schema_editor):
+    Car = apps.get_model('cars', 'Car')
+    Comment = apps.get_model('cars', 'Comment')
+    comments = Comment.objects.filter(car=OuterRef('pk')).order_by()
+    Car.objects.using(schema_editor.connection.alias).update(
+        comments_count=Coalesce(
+            Subquery(comments.values('car')
+                     .annotate(count=Count('pk')).values('count')),
+            0,
+        ),
+        last_commented_at=Subquery(comments.order_by('-created_at')
+                                   .values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_car_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='last_commented_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата и время последнего комментария.'),
+        ),
+        migrations.RunPython(fill_comment_activity,
+                             migrations.RunPython.noop),
+    ]
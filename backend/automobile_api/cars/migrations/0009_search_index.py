@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+# Contains a copy of the searchable text of every car, rowid is car id.
+CREATE_FTS_TABLE = '''
+CREATE VIRTUAL TABLE cars_car_fts USING fts5(
+    make, model, description, comments,
+    tokenize = 'unicode61 remove_diacritics 0'
+)
+'''
+FILL_FTS_TABLE = '''
+INSERT INTO cars_car_fts (rowid, make, model, description, comments)
+SELECT car.id, car.make, car.model, car.description,
+       (SELECT group_concat(comment.content, ' ')
+        FROM cars_comment comment WHERE comment.car_id = car.id)
+FROM cars_car car
+'''
+
+
+def create_fts_table(apps, schema_editor):
+    # Other databases and SQLite builds without FTS5 use SearchTerm.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_FTS_TABLE)
+    except OperationalError:
+        return
+    schema_editor.execute(FILL_FTS_TABLE)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS cars_car_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_car_comment_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес слова в записи об автомобиле')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='cars.car', verbose_name='Автомобиль')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'car'], name='search_term_car_idx')],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+FACETS = {
+    'make': 'make',
+    'model': 'model',
+    'year': 'year',
+    'owner': 'owner_id',
+}
+
+
+def fill_car_facets(apps, schema_editor):
+    Car = apps.get_model('cars', 'Car')
+    CarFacet = apps.get_model('cars', 'CarFacet')
+    db = schema_editor.connection.alias
+    facets = []
+    for facet, column in FACETS.items():
+        rows = (Car.objects.using(db).order_by().values_list(column)
+                .annotate(count=Count('pk')))
+        facets.extend(
+            CarFacet(facet=facet, value='' if value is None else str(value),
+                     count=count)
+            for value, count in rows
+        )
+    CarFacet.objects.using(db).bulk_create(facets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=16, verbose_name='Поле')),
+                ('value', models.CharField(blank=True, max_length=128, verbose_name='Значение поля')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество автомобилей')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facet', '-count', 'value'], name='car_facet_count_idx')],
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='car_facet_value_unique')],
+            },
+        ),
+        migrations.RunPython(fill_car_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:42
+
+from collections import Counter
+
+import django.db.models.deletion
+from cars.search import FIELD_WEIGHTS, tokenize
+from django.db import migrations, models
+
+# Comments get FTS rows of their own, rowid is comment id.
+CREATE_FTS_TABLES = (
+    """
+    CREATE VIRTUAL TABLE cars_car_fts USING fts5(
+        make, model, description,
+        tokenize = 'unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE cars_comment_fts USING fts5(
+        content, car_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    INSERT INTO cars_car_fts (rowid, make, model, description)
+    SELECT id, make, model, description FROM cars_car
+    """,
+    """
+    INSERT INTO cars_comment_fts (rowid, content, car_id)
+    SELECT id, content, car_id FROM cars_comment
+    """,
+)
+# Layout of 0009_search_index, one document per car.
+CREATE_CAR_DOCUMENTS = (
+    """
+    CREATE VIRTUAL TABLE cars_car_fts USING fts5(
+        make, model, description, comments,
+        tokenize = 'unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    INSERT INTO cars_car_fts (rowid, make, model, description, comments)
+    SELECT car.id, car.make, car.model, car.description,
+           (SELECT group_concat(comment.content, ' ')
+            FROM cars_comment comment WHERE comment.car_id = car.id)
+    FROM cars_car car
+    """,
+)
+
+
+def has_fts_table(schema_editor):
+    connection = schema_editor.connection
+    return (connection.vendor == 'sqlite' and 'cars_car_fts'
+            in connection.introspection.table_names())
+
+
+def split_comment_documents(apps, schema_editor):
+    if has_fts_table(schema_editor):
+        schema_editor.execute('DROP TABLE cars_car_fts')
+        for statement in CREATE_FTS_TABLES:
+            schema_editor.execute(statement)
+    # Postings of comments were merged into those of their cars.
+    SearchTerm = apps.get_model('cars', 'SearchTerm')
+    Comment = apps.get_model('cars', 'Comment')
+    using = schema_editor.connection.alias
+    terms = SearchTerm.objects.using(using)
+    if not terms.exists():
+        return
+    for comment in Comment.objects.using(using).iterator():
+        for word, count in Counter(tokenize(comment.content)).items():
+            terms.filter(car_id=comment.car_id, term=word,
+                         comment=None).update(
+                weight=models.F('weight') - count * FIELD_WEIGHTS[-1])
+    terms.filter(weight__lte=0).delete()
+    terms.bulk_create(
+        SearchTerm(term=word, car_id=comment.car_id, comment_id=comment.pk,
+                   weight=count * FIELD_WEIGHTS[-1])
+        for comment in Comment.objects.using(using).iterator()
+        for word, count in Counter(tokenize(comment.content)).items()
+    )
+
+
+def merge_comment_documents(apps, schema_editor):
+    if has_fts_table(schema_editor):
+        schema_editor.execute('DROP TABLE cars_car_fts')
+        schema_editor.execute('DROP TABLE IF EXISTS cars_comment_fts')
+        for statement in CREATE_CAR_DOCUMENTS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0010_car_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchterm',
+            name='comment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='cars.comment', verbose_name='Комментарий'),
+        ),
+        migrations.RunPython(split_comment_documents,
+                             merge_comment_documents),
+    ]
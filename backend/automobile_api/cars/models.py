@@ -1,4 +1,4 @@
-from cars.constants import MAX_CHARFIELD
+from cars.constants import MAX_CHARFIELD, MAX_SEARCH_TERM
 from cars.validators import CarYearValidator, TextValidator, TitleValidator
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
@@ -55,12 +55,34 @@ class Car(models.Model):
         null=False,
         related_name='cars'
     )
+    # Denormalized from comments, maintained by `cars.activity`.
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+    last_commented_at = models.DateTimeField(
+        verbose_name='Дата и время последнего комментария.',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     def __str__(self) -> str:
         return f'{self.model}'
 
     class Meta:
         ordering = ('-created_at', )
+        indexes = (
+            models.Index(fields=('created_at', 'id'),
+                         name='car_created_at_id_idx'),
+            models.Index(fields=('updated_at', 'id'),
+                         name='car_updated_at_id_idx'),
+            models.Index(fields=('owner', 'created_at'),
+                         name='car_owner_created_at_idx'),
+            models.Index(fields=('make', 'model', 'year'),
+                         name='car_make_model_year_idx'),
+        )
 
 
 class Comment(models.Model):
@@ -92,6 +114,83 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created_at', )
+        indexes = (
+            models.Index(fields=('car', 'created_at'),
+                         name='comment_car_created_at_idx'),
+            models.Index(fields=('author', 'created_at'),
+                         name='comment_author_created_at_idx'),
+        )
 
     def __str__(self) -> str:
         return f'{self.car.model}|{self.author}'
+
+
+class SearchTerm(models.Model):
+    '''
+    Posting of the inverted search index used when SQLite FTS5 is not
+    available, see `cars.search`.
+    '''
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=MAX_SEARCH_TERM
+    )
+    car = models.ForeignKey(
+        to=Car,
+        verbose_name='Автомобиль',
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    # Postings of a comment, or None for those of the car itself.
+    comment = models.ForeignKey(
+        to=Comment,
+        verbose_name='Комментарий',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_terms'
+    )
+    weight = models.PositiveIntegerField(
+        verbose_name='Вес слова в записи об автомобиле'
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('term', 'car'),
+                         name='search_term_car_idx'),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.term}|{self.car_id}'
+
+
+class CarFacet(models.Model):
+    '''
+    Amount of cars with a value of a filterable field, maintained along
+    with the cars, see `cars.facets`.
+    '''
+    facet = models.CharField(
+        verbose_name='Поле',
+        max_length=16
+    )
+    value = models.CharField(
+        verbose_name='Значение поля',
+        max_length=MAX_CHARFIELD,
+        blank=True
+    )
+    count = models.IntegerField(
+        verbose_name='Количество автомобилей',
+        default=0
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('facet', 'value'),
+                                    name='car_facet_value_unique'),
+        )
+        indexes = (
+            models.Index(fields=('facet', '-count', 'value'),
+                         name='car_facet_count_idx'),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.facet}={self.value}|{self.count}'
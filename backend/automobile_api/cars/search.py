@@ -0,0 +1,260 @@
+'''
+Full-text search over cars and their comments.
+
+Every car has a search document made of its make, model and description,
+and every comment one of its own, so a new comment is indexed without
+reading the other comments of its car. Documents are kept in one of two
+indexes:
+
+* SQLite FTS5 virtual tables `cars_car_fts` and `cars_comment_fts`,
+  ranked with BM25;
+* `SearchTerm` postings filled by a tokenizer written in Python, for other
+  databases and SQLite builds without FTS5.
+
+The `CARS_SEARCH_BACKEND` setting picks one ('auto', 'fts5' or 'python').
+Only that index is maintained, by `cars.signals` and by the bulk write
+paths that bypass signals. Every word of a query must match the start of
+a word of the car or of one of its comments.
+'''
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from cars.constants import MAX_SEARCH_TERM
+from cars.models import Car, Comment, SearchTerm
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import (Case, FloatField, IntegerField, Max, Q, Sum,
+                              Value, When)
+from django.db.models.expressions import RawSQL
+
+# Same notion of a word as the unicode61 tokenizer of FTS5.
+WORD = re.compile(r'[^\W_]+')
+# Weights of the document fields: make, model, description, comments.
+FIELD_WEIGHTS = (10, 10, 2, 1)
+BATCH_SIZE = 500
+
+
+def tokenize(text):
+    return [word[:MAX_SEARCH_TERM] for word in WORD.findall(text.casefold())]
+
+
+def batches(ids, size=BATCH_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class FTS5Backend:
+    """
+    Search index in the SQLite FTS5 tables: `cars_car_fts` with rowid of
+    the car and `cars_comment_fts` with rowid of the comment.
+    """
+    table = 'cars_car_fts'
+    comment_table = 'cars_comment_fts'
+    document_sql = 'SELECT id, make, model, description FROM cars_car'
+    comment_sql = 'SELECT id, content, car_id FROM cars_comment'
+
+    def index_cars(self, car_ids, using=DEFAULT_DB_ALIAS):
+        for batch in batches(car_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {self.table} '
+                    f'WHERE rowid IN ({placeholders})', batch)
+                cursor.execute(
+                    f'INSERT INTO {self.table} '
+                    '(rowid, make, model, description) '
+                    f'{self.document_sql} WHERE id IN ({placeholders})',
+                    batch)
+
+    def remove_cars(self, car_ids, using=DEFAULT_DB_ALIAS):
+        # Comments of the cars are removed by their own signals.
+        self.remove_rows(self.table, car_ids, using)
+
+    def index_comments(self, comments, using=DEFAULT_DB_ALIAS):
+        comments = list(comments)
+        self.remove_comments([comment.pk for comment in comments], using)
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.comment_table} (rowid, content, car_id) '
+                'VALUES (%s, %s, %s)',
+                [(comment.pk, comment.content, comment.car_id)
+                 for comment in comments])
+
+    def remove_comments(self, comment_ids, using=DEFAULT_DB_ALIAS):
+        self.remove_rows(self.comment_table, comment_ids, using)
+
+    @staticmethod
+    def remove_rows(table, ids, using):
+        for batch in batches(ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            with connections[using].cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE rowid IN ({placeholders})',
+                    batch)
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} '
+                f'(rowid, make, model, description) {self.document_sql}')
+            cursor.execute(f'DELETE FROM {self.comment_table}')
+            cursor.execute(
+                f'INSERT INTO {self.comment_table} (rowid, content, car_id) '
+                f'{self.comment_sql}')
+
+    def search(self, words):
+        car = f'"{Car._meta.db_table}"."id"'
+        weights = ', '.join(f'{weight:.1f}' for weight in FIELD_WEIGHTS[:-1])
+        queryset = Car.objects.all()
+        ranks, params = [], []
+        for word in words:
+            # Quoted word with a prefix star.
+            match = f'"{word}"*'
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s UNION '
+                f'SELECT car_id FROM {self.comment_table} '
+                f'WHERE {self.comment_table} MATCH %s', [match, match]))
+            # bm25() is only defined within a MATCH query, so the rank is
+            # made of subqueries correlated by the car.
+            ranks.append(
+                f'COALESCE((SELECT bm25({self.table}, {weights}) '
+                f'FROM {self.table} WHERE {self.table} MATCH %s '
+                f'AND rowid = {car}), 0) + '
+                f'COALESCE((SELECT SUM(rank) * {FIELD_WEIGHTS[-1]:.1f} '
+                f'FROM {self.comment_table} '
+                f'WHERE {self.comment_table} MATCH %s AND car_id = {car}), 0)'
+            )
+            params += [match, match]
+        rank = RawSQL(' + '.join(ranks), params, output_field=FloatField())
+        return queryset.annotate(rank=rank).order_by('rank', '-id')
+
+
+class PythonBackend:
+    """
+    Search index in `SearchTerm` postings, works on any database. Words
+    of a car and of each of its comments are separate postings.
+    """
+
+    def index_cars(self, car_ids, using=DEFAULT_DB_ALIAS):
+        terms = SearchTerm.objects.using(using)
+        for batch in batches(car_ids):
+            terms.filter(car_id__in=batch, comment=None).delete()
+            weights = defaultdict(Counter)
+            cars = Car.objects.using(using).filter(pk__in=batch).values_list(
+                'id', 'make', 'model', 'description')
+            for car_id, *fields in cars:
+                for text, weight in zip(fields, FIELD_WEIGHTS):
+                    for word in tokenize(text):
+                        weights[car_id][word] += weight
+            terms.bulk_create(
+                (SearchTerm(term=word, car_id=car_id, weight=weight)
+                 for car_id, words in weights.items()
+                 for word, weight in words.items()),
+                batch_size=BATCH_SIZE,
+            )
+
+    def remove_cars(self, car_ids, using=DEFAULT_DB_ALIAS):
+        for batch in batches(car_ids):
+            SearchTerm.objects.using(using).filter(car_id__in=batch).delete()
+
+    def index_comments(self, comments, using=DEFAULT_DB_ALIAS):
+        comments = list(comments)
+        self.remove_comments([comment.pk for comment in comments], using)
+        SearchTerm.objects.using(using).bulk_create(
+            (SearchTerm(term=word, car_id=comment.car_id,
+                        comment_id=comment.pk,
+                        weight=weight * FIELD_WEIGHTS[-1])
+             for comment in comments
+             for word, weight in Counter(tokenize(comment.content)).items()),
+            batch_size=BATCH_SIZE,
+        )
+
+    def remove_comments(self, comment_ids, using=DEFAULT_DB_ALIAS):
+        for batch in batches(comment_ids):
+            SearchTerm.objects.using(using).filter(
+                comment_id__in=batch).delete()
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        SearchTerm.objects.using(using).all().delete()
+        self.index_cars(Car.objects.using(using).order_by('pk')
+                        .values_list('pk', flat=True), using)
+        self.index_comments(
+            Comment.objects.using(using).only('id', 'content', 'car_id')
+            .iterator(), using)
+
+    @staticmethod
+    def prefix(word):
+        # A range instead of LIKE, so the term index is used everywhere.
+        return (Q(search_terms__term__gte=word)
+                & Q(search_terms__term__lt=word + '\U0010ffff'))
+
+    def search(self, words):
+        matches = {
+            f'match_{i}': Max(Case(When(self.prefix(word), then=Value(1)),
+                                   default=Value(0),
+                                   output_field=IntegerField()))
+            for i, word in enumerate(words)
+        }
+        any_word = Q()
+        for word in words:
+            any_word |= self.prefix(word)
+        return (
+            Car.objects.filter(any_word)
+            .annotate(**matches, rank=Sum('search_terms__weight'))
+            .filter(**{name: 1 for name in matches})
+            .order_by('-rank', '-id')
+        )
+
+
+BACKENDS = {
+    'fts5': FTS5Backend(),
+    'python': PythonBackend(),
+}
+
+
+@lru_cache
+def fts5_available(alias):
+    connection = connections[alias]
+    return (connection.vendor == 'sqlite'
+            and FTS5Backend.table in connection.introspection.table_names())
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    name = settings.CARS_SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if fts5_available(using) else 'python'
+    return BACKENDS[name]
+
+
+def search_cars(query):
+    """Return cars matching every word of the query, best first."""
+    words = list(dict.fromkeys(tokenize(query)))
+    if not words:
+        return Car.objects.none()
+    return get_backend().search(words)
+
+
+def index_cars(car_ids, using=DEFAULT_DB_ALIAS):
+    """Rebuild search documents of the cars after their text changed."""
+    get_backend(using).index_cars(car_ids, using)
+
+
+def remove_cars(car_ids, using=DEFAULT_DB_ALIAS):
+    get_backend(using).remove_cars(car_ids, using)
+
+
+def index_comments(comments, using=DEFAULT_DB_ALIAS):
+    """Index new or changed comments, their cars are left as they are."""
+    get_backend(using).index_comments(comments, using)
+
+
+def remove_comments(comment_ids, using=DEFAULT_DB_ALIAS):
+    get_backend(using).remove_comments(comment_ids, using)
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    get_backend(using).rebuild(using)
@@ -0,0 +1,81 @@
+from cars.activity import record_comment, refresh_comment_activity
+from cars.cache import invalidate_car_details, invalidate_cars
+from cars.facets import COLUMNS, apply_deltas, car_row, facet_deltas
+from cars.models import Car, Comment
+from cars.search import (index_cars, index_comments, remove_cars,
+                         remove_comments)
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+
+def is_car_deletion(origin):
+    """Whether a deletion was started by deleting cars."""
+    return isinstance(origin, Car) or getattr(origin, 'model', None) == Car
+
+
+@receiver((post_save, post_delete), sender=Car)
+def invalidate_car_cache(sender, instance, **kwargs):
+    invalidate_cars([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_car_cache(sender, instance, **kwargs):
+    invalidate_car_details([instance.car_id])
+
+
+@receiver(post_save, sender=Comment)
+def record_car_comment(sender, instance, created, using, raw=False,
+                       **kwargs):
+    # Fixtures carry the activity fields of their cars already.
+    if created and not raw:
+        record_comment(instance, using)
+
+
+@receiver(post_delete, sender=Comment)
+def refresh_car_comment_activity(sender, instance, origin=None, **kwargs):
+    # Comments deleted along with their car need no accounting.
+    if not is_car_deletion(origin):
+        refresh_comment_activity([instance.car_id])
+
+
+@receiver(post_save, sender=Car)
+def index_car(sender, instance, using, **kwargs):
+    index_cars([instance.pk], using)
+
+
+@receiver(post_delete, sender=Car)
+def remove_car_from_index(sender, instance, using, **kwargs):
+    remove_cars([instance.pk], using)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, using, **kwargs):
+    index_comments([instance], using)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_index(sender, instance, using, **kwargs):
+    remove_comments([instance.pk], using)
+
+
+@receiver(pre_save, sender=Car)
+def remember_car_facets(sender, instance, **kwargs):
+    # Stored values are needed to move the car between facet values.
+    instance._facet_row = None
+    if not instance._state.adding:
+        instance._facet_row = Car.objects.filter(
+            pk=instance.pk).values_list(*COLUMNS).first()
+
+
+@receiver(post_save, sender=Car)
+def count_car_facets(sender, instance, **kwargs):
+    deltas = facet_deltas([car_row(instance)], 1)
+    previous = getattr(instance, '_facet_row', None)
+    if previous is not None:
+        deltas.subtract(facet_deltas([previous], 1))
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Car)
+def uncount_car_facets(sender, instance, **kwargs):
+    apply_deltas(facet_deltas([car_row(instance)], -1))
@@ -1,14 +1,80 @@
-from django.core.validators import RegexValidator
+import re
+from functools import lru_cache
 
+from django.core.exceptions import ValidationError
+from django.core.validators import EMPTY_VALUES, RegexValidator
 
-class TitleValidator(RegexValidator):
+# Matches patterns made of a single character class, e.g. "^[A-z0-9]+$".
+CHARSET_PATTERN = re.compile(r'^\^(\[(?:[^\]\\]|\\.)+\])\+\$$')
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(regex, flags=0):
+    """Compile a pattern once per process, whatever validator uses it."""
+    return re.compile(regex, flags)
+
+
+@lru_cache(maxsize=None)
+def ascii_table(regex, flags=0):
+    """
+    Translation table that deletes every ASCII character allowed by
+    a single character class pattern, or None for any other pattern.
+    """
+    match = CHARSET_PATTERN.match(regex)
+    if match is None:
+        return None
+    charset = compile_pattern(match.group(1), flags)
+    return {code: None for code in range(128) if charset.fullmatch(chr(code))}
+
+
+class FastRegexValidator(RegexValidator):
+    """
+    RegexValidator that shares compiled patterns between instances.
+
+    For character class patterns ASCII-only values are checked with
+    `str.translate` against a precomputed table instead of the regex.
+    """
+
+    def __init__(self, regex=None, message=None, code=None,
+                 inverse_match=None, flags=None):
+        super().__init__(regex, message, code, inverse_match, flags)
+        source = type(self).regex if regex is None else regex
+        self.ascii_table = None
+        if isinstance(source, str):
+            self.regex = compile_pattern(source, self.flags)
+            self.ascii_table = ascii_table(source, self.flags)
+
+    def is_valid(self, value):
+        value = str(value)
+        if self.ascii_table is not None and value.isascii():
+            rest = value.translate(self.ascii_table)
+            # "$" also matches right before a trailing newline.
+            matches = bool(value) and (
+                not rest or rest == '\n' == value[-1] and len(value) > 1
+            )
+        else:
+            matches = self.regex.search(value) is not None
+        return matches != self.inverse_match
+
+    def is_valid_many(self, values):
+        """Return a list of flags telling which of the values are valid."""
+        is_valid = self.is_valid
+        return [is_valid(value) for value in values]
+
+    def __call__(self, value):
+        if not self.is_valid(value):
+            raise ValidationError(self.message, code=self.code,
+                                  params={"value": value})
+
+
+class TitleValidator(FastRegexValidator):
     regex = r"^[A-zА-я0-9-\s]+$"
     message = ("В названии допустимы: "
                "кириллица и латинские символы, "
                "арабские цифры, пробел, а также дефис.")
 
 
-class TextValidator(RegexValidator):
+class TextValidator(FastRegexValidator):
     regex = r"^[:;.,?!A-zА-я0-9-\s]+$"
     message = ("В текстовом описании допустимы: "
                "кириллица и латинские символы, "
@@ -16,6 +82,71 @@ class TextValidator(RegexValidator):
                "а также дефис.")
 
 
-class CarYearValidator(RegexValidator):
+class CarYearValidator(FastRegexValidator):
     regex = r"^[0-9]{4}$"
     message = "Год должен состоять из 4 арабских цифр."
+
+
+class ValidationEngine:
+    """
+    Runs validators of model fields over whole columns of values.
+
+    Only the `validators` of the fields are applied, as in
+    `Model.clean_fields()` empty values are not validated.
+
+    Example:
+        engine = ValidationEngine(Car, ('make', 'model'))
+        errors = engine.validate({'make': ['Ford', '&'],
+                                  'model': ['Focus', 'Fiesta']})
+        # {'make': [None, ['В названии допустимы: ...']],
+        #  'model': [None, None]}
+    """
+
+    def __init__(self, model, fields):
+        self.validators = {
+            name: tuple(model._meta.get_field(name).validators)
+            for name in fields
+        }
+
+    @classmethod
+    def from_validators(cls, validators):
+        """Engine for a mapping of field names to their validators."""
+        engine = cls.__new__(cls)
+        engine.validators = {
+            name: tuple(field_validators)
+            for name, field_validators in validators.items()
+        }
+        return engine
+
+    def validate(self, columns):
+        """
+        Return per-field error vectors aligned with the given values,
+        an item is None for a valid value or a list of error messages.
+        """
+        return {
+            name: self.validate_column(name, values)
+            for name, values in columns.items()
+        }
+
+    def validate_column(self, name, values):
+        errors = [None] * len(values)
+        indexes = [i for i, value in enumerate(values)
+                   if value not in EMPTY_VALUES]
+        for validator in self.validators[name]:
+            if isinstance(validator, FastRegexValidator):
+                flags = validator.is_valid_many(values[i] for i in indexes)
+                invalid = (i for i, flag in zip(indexes, flags) if not flag)
+                for i in invalid:
+                    errors[i] = (errors[i] or []) + [str(validator.message)]
+                continue
+            for i in indexes:
+                try:
+                    validator(values[i])
+                except ValidationError as error:
+                    errors[i] = (errors[i] or []) + error.messages
+        return errors
+
+    def is_valid(self, columns):
+        return not any(
+            any(vector) for vector in self.validate(columns).values()
+        )
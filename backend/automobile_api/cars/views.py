@@ -1,24 +1,101 @@
+from cars.cache import (acached_detail, aget_list_version, aget_or_compute,
+                        fragment_context, get_cache, list_key)
+from cars.conditions import acar_page_etag, async_condition
+from cars.constants import CARS_PAGE_SIZE, COMMENTS_PAGE_SIZE
 from cars.forms import CarForm, CommentForm
 from cars.models import Car, Comment
+from core.keyset import (encode_cursor, page_queryset, parse_cursor,
+                         position_of)
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, ListView, UpdateView
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import (aget_object_or_404, get_object_or_404,
+                              redirect, render)
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.http import urlencode
+from django.views import View
+from django.views.generic import CreateView, DeleteView, UpdateView
+
+# Keyset orderings of the pages, the last column is unique.
+CAR_ORDERING = ('-created_at', '-id')
+COMMENT_ORDERING = ('-created_at', '-id')
+
+
+def get_position(request, model, ordering):
+    """
+    Position of the `cursor` query parameter or None for the first page.
+
+    Raises:
+        Http404: The cursor is invalid.
+    """
+    token = request.GET.get('cursor')
+    if not token:
+        return None
+    try:
+        position, reverse = parse_cursor(token, model, ordering)
+    except ValueError:
+        raise Http404('Invalid cursor')
+    if reverse:
+        # Pages are only loaded forwards.
+        raise Http404('Invalid cursor')
+    return position
+
+
+async def aload_page(queryset, ordering, position, size):
+    """
+    Load a keyset page after `position`.
+
+    Returns:
+        tuple: Items of the page and the cursor of the next page or None.
+    """
+    queryset = page_queryset(queryset, ordering, position)
+    items = [item async for item in queryset[:size + 1]]
+    next_cursor = None
+    if len(items) > size:
+        next_cursor = encode_cursor(position_of(items[size - 1], ordering))
+    return items[:size], next_cursor
 
 
-class HomepageListView(ListView):
+def partial_response(request, template_name, context, next_url):
+    """
+    Rendered chunk of a page for "load more" links. HTMX and other
+    clients get the HTML, clients accepting JSON get the HTML and the
+    URL of the next chunk, which is None after the last one.
     """
-    Displays a list of all cars on the homepage.
+    html = render_to_string(template_name, context, request)
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({'html': html, 'next': next_url})
+    return HttpResponse(html)
+
+
+def next_chunk_url(viewname, cursor, **kwargs):
+    if cursor is None:
+        return None
+    query = urlencode({'cursor': cursor})
+    return f'{reverse(viewname, kwargs=kwargs)}?{query}'
+
+
+class HomepageView(View):
+    """
+    Displays a page of `CARS_PAGE_SIZE` cars on the homepage, newest
+    first. Further pages are selected with the `cursor` parameter of
+    "load more" links.
+
+    The view is async: cars are read with the async ORM and the async
+    cache API, so under ASGI the request does not hold a worker thread
+    while waiting for them.
 
     Inherits:
-        ListView: Generic view for displaying a list of objects.
+        View: Base view, every handler of it is async.
 
     Attributes:
         template_name (str): The template used for rendering the homepage.
 
     Methods:
         get_queryset: Returns the queryset of cars with their related owners.
+        get_page_context: Loads the requested page of cars.
     """
     template_name = "cars/index.html"
 
@@ -28,18 +105,82 @@ class HomepageListView(ListView):
         information to optimize queries.
 
         Returns:
-            QuerySet: A queryset of cars with related 'owner' instances.
+            QuerySet: Cars with related 'owner' instances.
         """
-        queryset = (
+        return (
             Car.objects.all()
             .select_related('owner')
         )
-        return queryset
 
+    async def get_page_context(self, request):
+        """
+        Loads the page of cars of the request. Pages and the rendered
+        rows are served from the car cache until any car changes, rows of
+        unchanged cars are not rendered again after that.
+
+        Returns:
+            dict: The context of the page.
+        """
+        position = get_position(request, Car, CAR_ORDERING)
+        cursor = request.GET.get("cursor")
 
-def car_detail(request, pk):
+        async def load():
+            return await aload_page(self.get_queryset(), CAR_ORDERING,
+                                    position, CARS_PAGE_SIZE)
+
+        version = await aget_list_version(get_cache())
+        cars, next_cursor = await aget_or_compute(
+            list_key('html', version, (cursor, )), 'html-list', load)
+        return {"object_list": cars, "car_list": cars, "view": self,
+                "cursor": cursor, "next_cursor": next_cursor,
+                "list_version": version, **fragment_context()}
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Renders a page of the homepage.
+
+        Returns:
+            HttpResponse: The rendered homepage.
+        """
+        # Templates read the user synchronously, load it beforehand.
+        request.user = await request.auser()
+        context = await self.get_page_context(request)
+        return render(request, self.template_name, context)
+
+
+class CarRowsView(HomepageView):
+    """
+    Rows of a page of the homepage for "load more" links, see
+    `partial_response`.
+
+    Inherits:
+        HomepageView: The homepage, whose pages are rendered.
+    """
+    template_name = "includes/car_rows.html"
+
+    async def get(self, request, *args, **kwargs):
+        context = await self.get_page_context(request)
+        return partial_response(
+            request, self.template_name, context,
+            next_chunk_url("cars:car-rows", context["next_cursor"]))
+
+
+async def aload_comments(car_id, position):
+    """Loads a page of comments of a car, see `aload_page`."""
+    comments = Comment.objects.filter(car_id=car_id).select_related("author")
+    return await aload_page(comments, COMMENT_ORDERING, position,
+                            COMMENTS_PAGE_SIZE)
+
+
+@async_condition(etag_func=acar_page_etag)
+async def car_detail(request, pk):
     """
-    Displays the detail page of a specific car, along with its comments.
+    Displays the detail page of a specific car, along with a page of its
+    comments, newest first. Further pages are selected with the `cursor`
+    parameter of "load more" links. The car and its first page of
+    comments are served from the car cache, a request with a matching
+    ETag gets 304 response without rendering. The view is async and uses
+    the async ORM and cache API.
 
     Args:
         request: The HTTP request object.
@@ -49,19 +190,58 @@ def car_detail(request, pk):
         HttpResponse: The rendered detail page for the specified car.
     """
     template_name = "cars/detail.html"
-    car = get_object_or_404(Car.objects.all(), pk__exact=pk)
-    comments = (
-        Comment.objects.all()
-        .filter(car=car)
-        .select_related("author")
-        .order_by("-created_at")
-    )
-    context = {"car": car}
+    position = get_position(request, Comment, COMMENT_ORDERING)
+
+    async def load():
+        car = await aget_object_or_404(Car.objects.select_related("owner"),
+                                       pk__exact=pk)
+        return car, *await aload_comments(pk, None)
+
+    request.user = await request.auser()
+    car, comments, next_cursor = await acached_detail("html", pk, load)
+    if position is not None:
+        comments, next_cursor = await aload_comments(pk, position)
+    context = {"car": car, "car_id": car.id}
     context["form"] = CommentForm()
     context["comments"] = comments
+    context["cursor"] = request.GET.get("cursor")
+    context["next_cursor"] = next_cursor
+    context.update(fragment_context())
     return render(request, template_name, context)
 
 
+async def car_comments(request, pk):
+    """
+    Comments of a page of the car detail page for "load more" links,
+    see `partial_response`.
+
+    Args:
+        request: The HTTP request object.
+        pk: The primary key of the car.
+
+    Returns:
+        HttpResponse: The rendered comments.
+
+    Raises:
+        Http404: The car does not exist.
+    """
+    position = get_position(request, Comment, COMMENT_ORDERING)
+    comments, next_cursor = await aload_comments(pk, position)
+    # Comments of a missing car are an empty page too.
+    if not comments and not await Car.objects.filter(pk=pk).aexists():
+        raise Http404
+    context = {
+        "car_id": pk,
+        "comments": comments,
+        "cursor": request.GET.get("cursor"),
+        "next_cursor": next_cursor,
+        **fragment_context(),
+    }
+    return partial_response(
+        request, "includes/comment_list.html", context,
+        next_chunk_url("cars:car-comments", next_cursor, pk=pk))
+
+
 class CarCreateView(LoginRequiredMixin, CreateView):
     """
     Allows authenticated users to create a new car entry.
@@ -225,7 +405,8 @@ class CarDeleteView(LoginRequiredMixin, DeleteView):
 def add_comment(request, pk):
     """
     Handles adding a comment to a specific car.
-    Only authenticated users can add comments.
+    Only authenticated users can add comments. The comment counter
+    and the last comment time of the car are updated along with it.
 
     Args:
         request: The HTTP request object containing the comment data.
@@ -241,5 +422,7 @@ def add_comment(request, pk):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.car = car
-        comment.save()
+        # The comment and the activity of its car are saved together.
+        with transaction.atomic():
+            comment.save()
     return redirect("cars:car-detail", pk=pk)
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from automobile_api.database import apply_pragmas
+        from core import metrics, replicas
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        checks.register(replicas.check_sticky_cache, checks.Tags.caches)
+        connection_created.connect(apply_pragmas,
+                                   dispatch_uid='core.apply_pragmas')
+        if metrics.get_config()['ENABLED']:
+            connection_created.connect(
+                metrics.install_query_recorder,
+                dispatch_uid='core.install_query_recorder')
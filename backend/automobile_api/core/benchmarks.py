@@ -0,0 +1,590 @@
+'''
+Benchmarks that exercise the project against a throwaway database.
+
+Every benchmark is a function that takes the parsed command options and
+returns a list of result rows (plain dicts), see `run_benchmark` command.
+'''
+import itertools
+import math
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from api import renderers
+from api.pagination import CarPagination, SearchPagination
+from api.serializers import CarSummarySerializer, car_summary_rows
+from api.views import CarViewSet
+from automobile_api.database import PROFILES, sqlite_settings
+from automobile_api.templating import template_loaders
+from cars.activity import refresh_comment_activity
+from cars.cache import fragment_context, get_cache
+from cars.facets import live_counts, rebuild_facets, table_counts
+from cars.forms import CommentForm
+from cars.models import Car, Comment
+from cars.search import rebuild_index, search_cars
+from cars.validators import TextValidator, ValidationEngine
+from core.keyset import encode_cursor
+from core.loadtest import run_asgi, run_wsgi
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.validators import RegexValidator
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Q
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, RequestFactory
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+UserModel = get_user_model()
+
+SEED_PASSWORD = 'Strong_password1'
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """Create a test database for the duration of the block."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def seed(users=10, cars=1000, comments=0, batch_size=1000):
+    """
+    Fill the database with synthetic users, cars and comments.
+
+    Returns:
+        dict: Amount of created rows per model.
+    """
+    password = make_password(SEED_PASSWORD)
+    UserModel.objects.bulk_create(
+        (UserModel(username=f'bench_user_{i}', password=password)
+         for i in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(UserModel.objects.values_list('id', flat=True))
+    Car.objects.bulk_create(
+        (Car(make='Toyota', model=f'Camry {i}', year=2000 + i % 25,
+             description='Компактный седан с отличной экономией топлива.',
+             owner_id=user_ids[i % len(user_ids)])
+         for i in range(cars)),
+        batch_size=batch_size,
+    )
+    car_ids = list(Car.objects.values_list('id', flat=True))
+    if car_ids:
+        Comment.objects.bulk_create(
+            (Comment(content=f'Отличная машина {i}.',
+                     car_id=car_ids[i % len(car_ids)],
+                     author_id=user_ids[i % len(user_ids)])
+             for i in range(comments)),
+            batch_size=batch_size,
+        )
+        refresh_comment_activity(batch_size=batch_size)
+    rebuild_index()
+    rebuild_facets()
+    return {'users': users, 'cars': cars, 'comments': comments}
+
+
+def authenticated_client(username='bench_client'):
+    """Return an API client with a token of a freshly created user."""
+    user = UserModel.objects.create_user(username=username,
+                                         password=SEED_PASSWORD)
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+    return client
+
+
+def measure(func, repeat):
+    """Call `func` `repeat` times and return latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted samples."""
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def summarize(samples):
+    """Reduce latency samples to the percentiles we report."""
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(percentile(ordered, 0.95), 3),
+        'p99_ms': round(percentile(ordered, 0.99), 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def profile_get(client, url, repeat, cold=False):
+    """
+    GET `url` `repeat` times and describe latency, SQL and payload size.
+
+    With `cold` the car cache is cleared before every request, so the
+    numbers describe the uncached path. Otherwise the cache is primed by
+    an unmeasured request first.
+    """
+    samples, queries, sizes = [], [], set()
+    if not cold:
+        client.get(url)
+    for _ in range(repeat):
+        if cold:
+            get_cache().clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {url}: {response.status_code}')
+        queries.append(len(context.captured_queries))
+        sizes.add(len(response.content))
+    return {
+        **summarize(samples),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def bench_pagination(options):
+    """Compare page number and keyset pagination of `/api/cars/`."""
+    seed(users=options['users'], cars=options['cars'])
+    client = APIClient()
+    page_size = CarPagination().page_size
+    ordering = CarPagination.ordering
+    fields = [field.lstrip('-') for field in ordering]
+    total = Car.objects.count()
+    results = []
+    for depth in (0.0, 0.25, 0.5, 0.75, 0.99):
+        offset = int((total - 1) * depth)
+        page = offset // page_size + 1
+        row = (Car.objects.order_by(*ordering)
+               .values_list(*fields)[offset])
+        cursor = encode_cursor(row)
+        for mode, url in (
+            ('page', f'/api/cars/?page={page}'),
+            ('cursor', f'/api/cars/?cursor={cursor}'),
+        ):
+            samples = measure(lambda: client.get(url), options['repeat'])
+            results.append({
+                'name': f'cars {mode} @{int(depth * 100)}%',
+                'offset': offset,
+                **summarize(samples),
+            })
+    return results
+
+
+def bench_validators(options):
+    """Compare per-value `RegexValidator` calls with the batch engine."""
+    samples = ('Toyota Camry', 'Компактный седан, 2021 год.',
+               'Ford Mustang - спорткар!', 'Mod~el^')
+    values = [samples[i % len(samples)] for i in range(options['size'])]
+    plain = RegexValidator(TextValidator.regex)
+    fast = TextValidator()
+    engine = ValidationEngine(Car, ('description', ))
+
+    def call_each(validator):
+        for value in values:
+            try:
+                validator(value)
+            except ValidationError:
+                pass
+
+    cases = (
+        ('RegexValidator.__call__', lambda: call_each(plain)),
+        ('TextValidator.__call__', lambda: call_each(fast)),
+        ('ValidationEngine.validate',
+         lambda: engine.validate({'description': values})),
+    )
+    return [
+        {'name': name, 'values': len(values),
+         **summarize(measure(func, options['repeat']))}
+        for name, func in cases
+    ]
+
+
+def bench_bulk(options):
+    """Compare car throughput of single POSTs and bulk POSTs."""
+    client = authenticated_client()
+    size = options['size']
+    batch = CarViewSet.bulk_max_items
+    cars = [{'make': 'Ford', 'model': f'Mustang {i}', 'year': 1967,
+             'description': 'Спортивный автомобиль.'} for i in range(size)]
+
+    def single():
+        for car in cars:
+            client.post('/api/cars/', car, format='json')
+
+    def bulk():
+        for start in range(0, size, batch):
+            client.post('/api/cars/bulk/', cars[start:start + batch],
+                        format='json')
+
+    results = []
+    for name, func in (('single POST', single), ('bulk POST', bulk)):
+        elapsed_ms = measure(func, 1)[0]
+        results.append({
+            'name': name,
+            'cars': size,
+            'total_ms': round(elapsed_ms, 3),
+            'cars_per_s': round(size / elapsed_ms * 1000),
+        })
+    return results
+
+
+def bench_endpoints(options):
+    """
+    Measure latency, SQL queries and response bytes of the read endpoints,
+    with the car cache cleared before every request and with a warm one.
+    """
+    seed(users=options['users'], cars=options['cars'],
+         comments=options['comments'])
+    car = Car.objects.order_by('-comments_count', 'pk').first()
+    if car is None:
+        raise RuntimeError('Endpoints need at least one car, see --cars.')
+    api_client = APIClient()
+    page_client = Client()
+    endpoints = (
+        ('api cars list', api_client, '/api/cars/'),
+        ('api car comments', api_client, f'/api/cars/{car.pk}/comments/'),
+        ('homepage', page_client, '/'),
+        ('car detail', page_client, f'/cars/{car.pk}/'),
+    )
+    results = []
+    for name, client, url in endpoints:
+        for cache in ('cold', 'warm'):
+            results.append({
+                'name': f'{name} ({cache})',
+                'url': url,
+                **profile_get(client, url, options['repeat'],
+                              cold=cache == 'cold'),
+            })
+    return results
+
+
+def icontains_search(query):
+    """The search as it used to be done: a LIKE scan per word."""
+    queryset = Car.objects.all()
+    for word in query.split():
+        queryset = queryset.filter(
+            Q(make__icontains=word) | Q(model__icontains=word)
+            | Q(description__icontains=word)
+            | Q(comments__content__icontains=word)
+        )
+    return queryset.distinct()
+
+
+def bench_search(options):
+    """Compare `icontains` scans with the full-text index."""
+    seed(users=options['users'], cars=options['cars'],
+         comments=options['comments'])
+    page_size = SearchPagination().page_size
+    results = []
+    for query in ('camry', 'camry 42', 'седан экономией', 'отличная'):
+        for name, search in (('icontains', icontains_search),
+                             ('index', search_cars)):
+            def first_page():
+                queryset = search(query)
+                return queryset.count(), list(queryset[:page_size])
+
+            count, _ = first_page()
+            results.append({
+                'name': f'{name} {query!r}',
+                'found': count,
+                **summarize(measure(first_page, options['repeat'])),
+            })
+    return results
+
+
+def bench_facets(options):
+    """Compare facet counts read from the table with live GROUP BYs."""
+    seed(users=options['users'], cars=options['cars'])
+    limit = CarViewSet.facet_limit
+    cases = (
+        ('table', lambda: table_counts(limit)),
+        ('live', lambda: live_counts(Car.objects.all(), limit)),
+    )
+    return [
+        {'name': name, 'cars': options['cars'],
+         **summarize(measure(func, options['repeat']))}
+        for name, func in cases
+    ]
+
+
+def bench_serializers(options):
+    """
+    Compare the JSON of car pages made by `CarSummarySerializer` and by
+    `values()` rows, rendered by DRF's and by the fast JSON renderer.
+    """
+    seed(users=options['users'], cars=options['cars'])
+    queryset = Car.objects.all()
+    encoder = 'orjson' if renderers.orjson else 'json'
+    results = []
+    for page_size in (10, 100, 1000):
+        page = queryset[:page_size]
+        cases = (
+            ('serializer + json', lambda: JSONRenderer().render(
+                CarSummarySerializer(
+                    page.only(*CarSummarySerializer.Meta.fields),
+                    many=True).data)),
+            ('rows + json', lambda: JSONRenderer().render(
+                car_summary_rows.many(
+                    page.values(*car_summary_rows.columns)))),
+            (f'rows + {encoder}', lambda: renderers.FastJSONRenderer().render(
+                car_summary_rows.many(
+                    page.values(*car_summary_rows.columns)))),
+        )
+        outputs = {func() for _, func in cases}
+        if len(outputs) != 1:
+            raise RuntimeError(f'Pages of {page_size} cars differ.')
+        size = len(outputs.pop())
+        for name, func in cases:
+            results.append({
+                'name': f'{name} @{page_size}',
+                'bytes': size,
+                **summarize(measure(func, options['repeat'])),
+            })
+    return results
+
+
+def bench_templates(options):
+    """
+    Compare renders of a homepage page with `options['cars']` cars and
+    of the page of the most commented car: with fragments rendered and
+    stored anew, with cached car rows only, e.g. after any car changed,
+    and with all fragments cached. The first case is also rendered by an engine
+    without the cached template loader.
+    """
+    seed(users=options['users'], cars=options['cars'],
+         comments=options['comments'])
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    cars = list(Car.objects.select_related('owner'))
+    car = Car.objects.select_related('owner').order_by(
+        '-comments_count').first()
+    comments = list(car.comments.select_related('author')
+                    .order_by('-created_at'))
+    # Both engines are built here, settings cache templates only when
+    # TEMPLATE_CACHE is on.
+    uncached = DjangoTemplates({
+        'NAME': 'uncached',
+        'DIRS': engines['django'].dirs,
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': template_loaders({'TEMPLATE_CACHE': '0'},
+                                                debug=True)},
+    })
+    cached = DjangoTemplates({
+        'NAME': 'cached',
+        'DIRS': engines['django'].dirs,
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': template_loaders({'TEMPLATE_CACHE': '1'},
+                                                debug=True)},
+    })
+    cache = get_cache()
+    versions = itertools.count()
+
+    def homepage(engine, version=0, clear=False):
+        if clear:
+            cache.clear()
+        return engine.get_template('cars/index.html').render(
+            {'object_list': cars, 'list_version': version,
+             **fragment_context()}, request)
+
+    def detail(clear=False):
+        if clear:
+            cache.clear()
+        return cached.get_template('cars/detail.html').render(
+            {'car': car, 'car_id': car.id, 'comments': comments,
+             'form': CommentForm(), **fragment_context()}, request)
+
+    results = []
+    for page, cases in (
+        ('homepage', (
+            ('uncached loader', lambda: homepage(uncached, clear=True)),
+            ('fragments rendered', lambda: homepage(cached, clear=True)),
+            ('rows cached', lambda: homepage(cached, next(versions))),
+            ('all cached', lambda: homepage(cached)),
+        )),
+        ('car page', (
+            ('fragments rendered', lambda: detail(clear=True)),
+            ('all cached', detail),
+        )),
+    ):
+        outputs = {func() for _, func in cases}
+        if len(outputs) != 1:
+            raise RuntimeError(f'Renders of the {page} differ.')
+        size = len(outputs.pop())
+        for name, func in cases:
+            results.append({
+                'name': f'{page}, {name}',
+                'bytes': size,
+                **summarize(measure(func, options['repeat'])),
+            })
+    return results
+
+
+def bench_servers(options):
+    """
+    Compare throughput of concurrent GET requests to the read endpoints
+    served by the ASGI application with those served by the WSGI one.
+    Caches are warmed up first, as on a busy site.
+    """
+    seed(users=options['users'], cars=options['cars'],
+         comments=options['comments'])
+    car = Car.objects.order_by('-comments_count', 'pk').first()
+    if car is None:
+        raise RuntimeError('Servers need at least one car, see --cars.')
+    concurrency, requests = options['concurrency'], options['repeat']
+    endpoints = (
+        ('api cars list', '/api/cars/'),
+        ('api car', f'/api/cars/{car.pk}/'),
+        ('api car comments', f'/api/cars/{car.pk}/comments/'),
+        ('homepage', '/'),
+        ('car detail', f'/cars/{car.pk}/'),
+    )
+    interfaces = (
+        ('asgi', get_asgi_application(), run_asgi),
+        ('wsgi', get_wsgi_application(), run_wsgi),
+    )
+    results = []
+    for name, url in endpoints:
+        for interface, application, run in interfaces:
+            run(application, url, 1, 1)
+            elapsed, samples = run(application, url, concurrency, requests)
+            results.append({
+                'name': f'{name} ({interface})',
+                'url': url,
+                'concurrency': concurrency,
+                'requests': len(samples),
+                'requests_per_s': round(len(samples) / elapsed),
+                **summarize(samples),
+            })
+    return results
+
+
+@contextmanager
+def extra_database(alias, settings_dict):
+    """Make a database available under `alias` for the block."""
+    connections.settings[alias] = connections.configure_settings({
+        'default': connections.settings['default'],
+        alias: settings_dict,
+    })[alias]
+    try:
+        yield
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def comment_writer(alias, car_id, author_id, writes):
+    """
+    Add comments to the car as `CommentViewSet.perform_create` does, one
+    transaction per comment, with the receivers of the comment.
+
+    Returns:
+        tuple: Latencies of committed comments and amount of failures.
+    """
+    samples, errors = [], 0
+    try:
+        for i in range(writes):
+            start = time.perf_counter()
+            try:
+                with transaction.atomic(using=alias):
+                    car = Car.objects.using(alias).only('id').get(
+                        pk=car_id)
+                    Comment.objects.using(alias).create(
+                        content=f'Комментарий {i}.', car=car,
+                        author_id=author_id)
+            except OperationalError:
+                errors += 1
+                continue
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        connections[alias].close()
+    return samples, errors
+
+
+def bench_writes(options):
+    """
+    Add comments from concurrent threads to a SQLite file configured with
+    the development and with the production profile.
+    """
+    concurrency, writes = options['concurrency'], options['repeat']
+    alias = 'bench_writes'
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, 'template.sqlite3')
+        with extra_database(alias, sqlite_settings(template, False)):
+            call_command('migrate', database=alias, verbosity=0)
+            author = UserModel.objects.db_manager(alias).create_user(
+                username='bench_writer', password=SEED_PASSWORD)
+            car = Car.objects.using(alias).bulk_create([Car(
+                make='Toyota', model='Camry', year=2021,
+                description='Компактный седан.', owner=author)])[0]
+        for profile in PROFILES:
+            name = os.path.join(directory, f'{profile}.sqlite3')
+            shutil.copy(template, name)
+            production = profile == 'production'
+            with extra_database(alias, sqlite_settings(name, production)):
+                with ThreadPoolExecutor(concurrency) as executor:
+                    start = time.perf_counter()
+                    futures = [
+                        executor.submit(comment_writer, alias, car.pk,
+                                        author.pk, writes)
+                        for _ in range(concurrency)
+                    ]
+                    outcomes = [future.result() for future in futures]
+                    elapsed = time.perf_counter() - start
+                samples = [sample for done, _ in outcomes for sample in done]
+                counted = Car.objects.using(alias).get(
+                    pk=car.pk).comments_count
+                if counted != len(samples):
+                    raise RuntimeError(
+                        f'{counted} of {len(samples)} comments counted.')
+            results.append({
+                'name': f'comments ({profile})',
+                'writers': concurrency,
+                'writes': len(samples),
+                'errors': sum(errors for _, errors in outcomes),
+                'writes_per_s': round(len(samples) / elapsed),
+                **(summarize(samples) if samples else {}),
+            })
+    return results
+
+
+BENCHMARKS = {
+    'bulk': bench_bulk,
+    'endpoints': bench_endpoints,
+    'facets': bench_facets,
+    'search': bench_search,
+    'pagination': bench_pagination,
+    'serializers': bench_serializers,
+    'servers': bench_servers,
+    'templates': bench_templates,
+    'validators': bench_validators,
+    'writes': bench_writes,
+}
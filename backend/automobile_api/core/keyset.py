@@ -0,0 +1,117 @@
+'''
+Keyset (cursor) pagination shared by the API and the HTML pages.
+
+A page is selected with a "row comes after position" condition over the
+ordering columns instead of OFFSET, so its cost does not depend on its
+depth. Positions travel between requests as opaque url-safe tokens made
+by `encode_cursor`.
+'''
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timezone
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Range of the 64-bit integer columns of the databases.
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+
+def encode_cursor(position, reverse=False):
+    """Pack a keyset position into an opaque url-safe token."""
+    payload = {
+        'p': [value.isoformat() if hasattr(value, 'isoformat') else value
+              for value in position],
+        'r': int(bool(reverse)),
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('ascii')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a token made by `encode_cursor` into (position, reverse)."""
+    padded = token + '=' * (-len(token) % 4)
+    payload = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+    return list(payload['p']), bool(payload['r'])
+
+
+def check_bounds(value):
+    """
+    Return a position value if the database can compare with it.
+
+    Raises:
+        ValueError: Integer out of the 64-bit range or a datetime that
+            overflows when converted to UTC.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not MIN_INT <= value <= MAX_INT:
+            raise ValueError('Integer out of range.')
+    elif isinstance(value, datetime) and value.tzinfo is not None:
+        value.astimezone(timezone.utc)
+    return value
+
+
+def parse_cursor(token, model, ordering):
+    """
+    Decode a token into (position, reverse) with the values converted
+    to the types of the `ordering` fields of `model`.
+
+    Raises:
+        ValueError: The token is malformed, made for another ordering or
+            holds values out of the range of the columns.
+    """
+    try:
+        position, reverse = decode_cursor(token)
+        if len(position) != len(ordering):
+            raise ValueError('Cursor does not match ordering.')
+        opts = model._meta
+        position = [
+            check_bounds(opts.get_field(field.lstrip('-')).to_python(value))
+            for field, value in zip(ordering, position)
+        ]
+    except (TypeError, KeyError, UnicodeError, OverflowError,
+            binascii.Error, FieldDoesNotExist, ValidationError) as error:
+        raise ValueError('Invalid cursor.') from error
+    return position, reverse
+
+
+def position_of(item, ordering):
+    """Keyset position of a model instance or of a `values()` row."""
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(item, dict):
+        return [item[name] for name in names]
+    return [getattr(item, name) for name in names]
+
+
+def invert(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+def after(ordering, position):
+    """
+    Build a lexicographic "row comes after position" condition,
+    e.g. `created_at <= c AND (created_at < c OR id < i)`.
+
+    The leading inclusive bound lets the database seek into the
+    `(created_at, id)` index instead of scanning it from the start.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = '__lt' if field.startswith('-') else '__gt'
+        condition |= Q(**equal, **{name + lookup: value})
+        equal[name] = value
+    first, value = ordering[0], position[0]
+    bound = '__lte' if first.startswith('-') else '__gte'
+    return Q(**{first.lstrip('-') + bound: value}) & condition
+
+
+def page_queryset(queryset, ordering, position=None):
+    """`queryset` in the keyset order, after `position` if given."""
+    queryset = queryset.order_by(*ordering)
+    if position is not None:
+        queryset = queryset.filter(after(ordering, position))
+    return queryset
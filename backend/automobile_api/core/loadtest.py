@@ -0,0 +1,143 @@
+'''
+Concurrent GET requests against the ASGI and the WSGI application of the
+project, in process and without a server.
+
+The ASGI driver speaks the protocol the way uvicorn does: every request
+is a task on one event loop, so requests overlap wherever the views
+await. The WSGI driver calls the application from a pool of threads, as
+a threaded WSGI server does.
+'''
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HOST = 'testserver'
+
+
+def split_url(url):
+    path, _, query_string = url.partition('?')
+    return path, query_string
+
+
+async def asgi_get(application, url):
+    """Return (status, body) of a GET request to an ASGI application."""
+    path, query_string = split_url(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('ascii'),
+        'query_string': query_string.encode('ascii'),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode('ascii'))],
+        'client': ('127.0.0.1', 50000),
+        'server': (HOST, 80),
+    }
+    received = False
+    status, body = None, []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected, Django stops listening for
+        # a disconnect once the response is sent.
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    return status, b''.join(body)
+
+
+def wsgi_get(application, url):
+    """Return (status, body) of a GET request to a WSGI application."""
+    path, query_string = split_url(url)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0], body
+
+
+def check(url, status):
+    if status != 200:
+        raise RuntimeError(f'GET {url}: {status}')
+
+
+def run_asgi(application, url, concurrency, requests):
+    """
+    Send `requests` GET requests from `concurrency` concurrent clients.
+
+    Returns:
+        tuple: Wall time in seconds and latencies in milliseconds.
+    """
+    samples = []
+
+    async def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            status, _ = await asgi_get(application, url)
+            samples.append((time.perf_counter() - start) * 1000)
+            check(url, status)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    return asyncio.run(main()), samples
+
+
+def run_wsgi(application, url, concurrency, requests):
+    """`run_asgi` with a thread per client."""
+    samples = []
+
+    def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            status, _ = wsgi_get(application, url)
+            samples.append((time.perf_counter() - start) * 1000)
+            check(url, status)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+        return time.perf_counter() - start, samples
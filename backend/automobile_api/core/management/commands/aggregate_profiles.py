@@ -0,0 +1,87 @@
+import json
+import os
+import statistics
+from collections import Counter
+
+from core.profiling import (COLLAPSED_SUFFIX, PHASES, PHASES_SUFFIX,
+                            get_config)
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Summarize profiles written by ProfilingMiddleware per view '
+            'and merge their collapsed stacks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            help='Directory of the profiles, REQUEST_PROFILING by default.')
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='URL name of a view to include, e.g. api:cars-list.')
+        parser.add_argument(
+            '--output',
+            help='Write merged collapsed stacks, rooted at view names.')
+        parser.add_argument(
+            '--top', type=int, default=5,
+            help='Functions with the most own time to list per view.')
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or get_config()['DIRECTORY']
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError as error:
+            raise CommandError(f'Cannot read {directory}: {error}')
+        merged = Counter()
+        for name in names:
+            if not name.endswith(PHASES_SUFFIX):
+                continue
+            stem = os.path.join(directory, name[:-len(PHASES_SUFFIX)])
+            records = self.load_records(stem + PHASES_SUFFIX)
+            view = records[0]['view'] if records else None
+            if not records or (options['views']
+                               and view not in options['views']):
+                continue
+            stacks = self.load_stacks(stem + COLLAPSED_SUFFIX)
+            self.report(view, records, stacks, options['top'])
+            for stack, micros in stacks.items():
+                merged[f'{view};{stack}'] += micros
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.writelines(f'{stack} {micros}\n'
+                                for stack, micros in sorted(merged.items()))
+
+    def load_records(self, path):
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def load_stacks(self, path):
+        """Return {stack: μs} of a collapsed stacks file."""
+        stacks = Counter()
+        if not os.path.exists(path):
+            return stacks
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                stack, _, micros = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(micros)
+        return stacks
+
+    def report(self, view, records, stacks, top):
+        totals = sorted(record['total_ms'] for record in records)
+        means = {
+            phase: statistics.mean(
+                record['phases_ms'].get(phase, 0) for record in records)
+            for phase in PHASES
+        }
+        phases = '  '.join(f'{phase}={ms:.3f}' for phase, ms in means.items())
+        self.stdout.write(
+            f'{view}  requests={len(records)}  '
+            f'p50_ms={statistics.median(totals):.3f}  '
+            f'max_ms={totals[-1]:.3f}  mean_phases_ms: {phases}')
+        own = Counter()
+        for stack, micros in stacks.items():
+            own[stack.rpartition(';')[2]] += micros
+        for frame, micros in own.most_common(top):
+            self.stdout.write(f'    {micros / len(records) / 1000:9.3f} ms  '
+                              f'{frame}')
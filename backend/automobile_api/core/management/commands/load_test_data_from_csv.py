@@ -1,58 +1,513 @@
 import csv
+import hashlib
+import multiprocessing
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
 
+import django
+from cars.activity import refresh_comment_activity
+from cars.facets import apply_deltas, car_row, facet_deltas
 from cars.models import Car, Comment
+from cars.search import index_cars, index_comments
+from cars.validators import ValidationEngine
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 UserModel = get_user_model()
 
+DEFAULT_BATCH_SIZE = 1000
+SHARD_SIZE = 1024 * 1024  # Bytes of a CSV file handled by one worker task.
+ROW_ERRORS = (ValueError, IndexError, ValidationError, csv.Error)
 
-def users_import(row):
-    if not UserModel.objects.filter(username=row[0]):
-        UserModel.objects.create_user(
-            username=row[0],
-            first_name=row[1],
-            last_name=row[2],
-            email=row[3],
-            password=row[4]
+
+def row_hash(*values):
+    """Compact fingerprint of a row used for de-duplication."""
+    return hashlib.blake2b(
+        repr(values).encode('utf-8'), digest_size=16
+    ).digest()
+
+
+class ImportState:
+    """Ids of rows that exist in the database, shared between importers."""
+
+    def __init__(self):
+        self.user_ids = set(UserModel.objects.values_list('id', flat=True))
+        self.car_ids = set(Car.objects.values_list('id', flat=True))
+
+
+class BaseImporter:
+    """
+    Turns CSV rows into unsaved model instances.
+
+    `convert` and `clean_many` only look at the rows themselves, so they
+    can run in worker processes. `key` recognises duplicates, `check`
+    resolves foreign keys against the shared state and `created` updates
+    that state after a batch is written; these run in the writer.
+    """
+    model = None
+    # Fields whose validators run over whole chunks, see `clean_many`.
+    batch_fields = ()
+
+    def __init__(self, state):
+        self.state = state
+        self.seen = set(self.existing_keys())
+
+    def existing_keys(self):
+        return ()
+
+    @classmethod
+    def convert(cls, row):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    @classmethod
+    def clean(cls, instance, exclude=()):
+        instance.clean_fields(exclude=exclude)
+        return instance
+
+    @classmethod
+    def clean_many(cls, instances):
+        """
+        Validate a chunk of instances, return a list aligned with it of
+        cleaned instances or `ValidationError`s of the invalid ones.
+
+        Validators of `batch_fields` run over whole columns with
+        `ValidationEngine`, other checks of these fields and the rest of
+        the fields are cleaned one instance at a time.
+        """
+        fields = [cls.model._meta.get_field(name)
+                  for name in cls.batch_fields]
+        vectors = ValidationEngine(cls.model, cls.batch_fields).validate({
+            field.name: [getattr(obj, field.attname) for obj in instances]
+            for field in fields
+        })
+        results = []
+        for i, instance in enumerate(instances):
+            errors = {}
+            for field in fields:
+                value = getattr(instance, field.attname)
+                if field.blank and value in field.empty_values:
+                    continue
+                try:
+                    field.validate(value, instance)
+                except ValidationError as error:
+                    errors[field.name] = error.messages
+                else:
+                    if vectors[field.name][i]:
+                        errors[field.name] = vectors[field.name][i]
+            try:
+                cls.clean(instance, exclude=cls.batch_fields)
+            except ValidationError as error:
+                errors = error.update_error_dict(errors)
+            results.append(ValidationError(errors) if errors else instance)
+        return results
+
+    def key(self, instance):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def check(self, instance):
+        pass
+
+    def created(self, objs):
+        pass
+
+    def admit(self, instance):
+        """Return the instance unless it duplicates an already seen one."""
+        key = self.key(instance)
+        if key in self.seen:
+            return None
+        self.check(instance)
+        self.seen.add(key)
+        return instance
+
+
+class UsersImporter(BaseImporter):
+    model = UserModel
+
+    def existing_keys(self):
+        return UserModel.objects.values_list(
+            'username', flat=True).iterator()
+
+    @classmethod
+    def convert(cls, row):
+        return UserModel(
+            username=row[0].strip(),
+            first_name=row[1].strip(),
+            last_name=row[2].strip(),
+            email=UserModel.objects.normalize_email(row[3].strip()),
+            password=row[4].strip(),
+        )
+
+    @classmethod
+    def clean(cls, instance, exclude=()):
+        instance.clean_fields(exclude=exclude)
+        instance.password = make_password(instance.password)
+        return instance
+
+    def key(self, instance):
+        return instance.username
+
+    def created(self, objs):
+        self.state.user_ids.update(obj.pk for obj in objs)
+
+
+class CarsImporter(BaseImporter):
+    model = Car
+    batch_fields = ('make', 'model', 'year', 'description')
+
+    def existing_keys(self):
+        rows = Car.objects.values_list(
+            'make', 'model', 'year', 'description', 'owner_id'
+        ).iterator()
+        return (row_hash(*row) for row in rows)
+
+    @classmethod
+    def convert(cls, row):
+        year = row[2].strip()
+        return Car(
+            make=row[0].strip(),
+            model=row[1].strip(),
+            year=int(year) if year else None,
+            description=row[3].strip(),
+            owner_id=int(row[4]),
+        )
+
+    @classmethod
+    def clean(cls, instance, exclude=()):
+        instance.clean_fields(exclude=('owner', *exclude))
+        return instance
+
+    def key(self, instance):
+        return row_hash(instance.make, instance.model, instance.year,
+                        instance.description, instance.owner_id)
+
+    def check(self, instance):
+        if instance.owner_id not in self.state.user_ids:
+            raise ValidationError(f'Unknown owner {instance.owner_id}.')
+
+    def created(self, objs):
+        ids = [obj.pk for obj in objs]
+        self.state.car_ids.update(ids)
+        index_cars(ids)
+        apply_deltas(facet_deltas(map(car_row, objs), 1))
+
+
+class CommentsImporter(BaseImporter):
+    model = Comment
+    batch_fields = ('content', )
+
+    def existing_keys(self):
+        rows = Comment.objects.values_list(
+            'content', 'author_id', 'car_id'
+        ).iterator()
+        return (row_hash(*row) for row in rows)
+
+    @classmethod
+    def convert(cls, row):
+        return Comment(
+            content=row[0].strip(),
+            car_id=int(row[1]),
+            author_id=int(row[2]),
         )
 
+    @classmethod
+    def clean(cls, instance, exclude=()):
+        instance.clean_fields(exclude=('car', 'author', *exclude))
+        return instance
 
-def cars_import(row):
-    owner = UserModel.objects.get(id=row[4])
-    Car.objects.get_or_create(
-        make=row[0],
-        model=row[1],
-        year=row[2],
-        description=row[3],
-        owner=owner
-    )
+    def key(self, instance):
+        return row_hash(instance.content, instance.author_id,
+                        instance.car_id)
 
+    def check(self, instance):
+        if instance.car_id not in self.state.car_ids:
+            raise ValidationError(f'Unknown car {instance.car_id}.')
+        if instance.author_id not in self.state.user_ids:
+            raise ValidationError(f'Unknown author {instance.author_id}.')
 
-def comments_import(row):
-    car = Car.objects.get(id=row[1])
-    author = UserModel.objects.get(id=row[2])
-    Comment.objects.get_or_create(
-        content=row[0],
-        author=author,
-        car=car
-    )
+    def created(self, objs):
+        # bulk_create() bypasses the comment counters and the search
+        # index.
+        refresh_comment_activity({obj.car_id for obj in objs})
+        index_comments(objs)
 
 
 action = {
-    'users.csv': users_import,
-    'cars.csv': cars_import,  # Must to be after user_import
-    'comments.csv': comments_import,  # Must to be after user and cars imports
+    'users.csv': UsersImporter,
+    'cars.csv': CarsImporter,  # Must to be after user_import
+    'comments.csv': CommentsImporter,  # Must to be after user and cars imports
 }
 
 
+def get_shards(path, size=SHARD_SIZE):
+    """Split a file into (start, end) byte ranges of about `size` bytes."""
+    total = os.path.getsize(path)
+    return [(start, min(start + size, total))
+            for start in range(0, total, size)]
+
+
+def read_lines(path, start, end):
+    """
+    Yield (offset, line) for lines that start inside [start, end).
+
+    A line crossing the `end` boundary belongs to this shard and is skipped
+    by the next one, so every line is read exactly once.
+    """
+    with open(path, 'rb') as csv_file:
+        if start:
+            csv_file.seek(start - 1)
+            csv_file.readline()
+        while (offset := csv_file.tell()) < end:
+            line = csv_file.readline()
+            if not line:
+                break
+            yield offset, line
+
+
+def spans_lines(path, start, end):
+    """
+    Whether a quoted value of the shard contains a line break. Quotes of
+    a quoted value are doubled, so every line of a file without such
+    values has an even number of them.
+    """
+    return any(line.count(b'"') % 2
+               for _, line in read_lines(path, start, end))
+
+
+def read_shard(path, start, end):
+    """
+    Yield (offset, line) for CSV lines of a shard, see `read_lines`.
+    Lines are parsed one by one by `parse_line`, so quoted values with
+    line breaks are not supported in this mode, see `spans_lines`.
+
+    Raises:
+        csv.Error: A quoted value of the shard spans lines.
+    """
+    for offset, line in read_lines(path, start, end):
+        if line.count(b'"') % 2:
+            raise csv.Error(f'{path}@{offset}: quoted value spans lines.')
+        yield offset, line
+
+
+def parse_line(line):
+    return next(csv.reader([line.decode('utf-8')]), [])
+
+
+def clean_rows(importer, rows):
+    """
+    Convert and validate (position, row) pairs. Yield (position, instance)
+    for valid rows and (position, error) for the others, a row may be
+    given as its parse error already.
+    """
+    converted = []
+    for position, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            converted.append((position, importer.convert(row)))
+        except ROW_ERRORS as error:
+            yield position, error
+    results = importer.clean_many([instance for _, instance in converted])
+    for (position, _), result in zip(converted, results):
+        yield position, result
+
+
+def parse_shard(path, start, end):
+    """Yield (offset, row or parse error) for lines of a shard."""
+    for offset, line in read_shard(path, start, end):
+        try:
+            row = parse_line(line)
+        except ROW_ERRORS as error:
+            row = error
+        yield offset, row
+
+
+def clean_shard(importer_class, path, start, end):
+    """Convert and validate a shard of a file in a worker process."""
+    objs, errors = [], []
+    rows = parse_shard(path, start, end)
+    for offset, result in clean_rows(importer_class, rows):
+        if isinstance(result, Exception):
+            errors.append(f'{path}@{offset}: {result}')
+        else:
+            objs.append(result)
+    return objs, errors
+
+
+def read_rows(csv_file):
+    """
+    Yield (line number, row) of a CSV file. A row that can not be parsed
+    is yielded as its `csv.Error`, the reader goes on with the next one.
+    """
+    reader = csv.reader(csv_file)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            row = error
+        yield reader.line_num, row
+
+
+def imap_bounded(pool, func, tasks, window):
+    """Like `pool.map`, but keeps at most `window` tasks in flight."""
+    pending = deque()
+    for args in tasks:
+        pending.append(pool.submit(func, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class ImportReport:
+    """Counters of a single imported file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.created = self.duplicates = self.invalid = 0
+        self.start = time.perf_counter()
+
+    def __str__(self):
+        elapsed = time.perf_counter() - self.start
+        rows = self.created + self.duplicates + self.invalid
+        return (f'{os.path.basename(self.path)}: {self.created} created, '
+                f'{self.duplicates} duplicates, {self.invalid} invalid, '
+                f'{rows / elapsed if elapsed else 0:.0f} rows/s')
+
+
 class Command(BaseCommand):
+    help = 'Import users, cars and comments from CSV files in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            default=os.path.join(settings.BASE_DIR, 'tests/test_data'),
+            help='Directory with users.csv, cars.csv and comments.csv.')
+        for key in action:
+            name = key.removesuffix('.csv')
+            parser.add_argument(
+                f'--{name}-csv', dest=f'{name}_csv',
+                help=f'Path to {key}, overrides --dir.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Amount of rows written with one INSERT.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Parse, validate and hash rows in this many processes.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Run the import and roll everything back.')
+
     def handle(self, *args, **options):
-        path = os.path.join(settings.BASE_DIR, 'tests/test_data/')
-        for key in action.keys():
-            with open(path + key, 'r', encoding='utf-8') as csv_file:
-                reader = csv.reader(csv_file)
-                for row in reader:
-                    action[key](row)
+        dry_run = options['dry_run']
+        workers = options['workers']
+        # Every batch is committed on its own, a dry run wraps them all
+        # into a single transaction that is rolled back at the end.
+        with transaction.atomic() if dry_run else nullcontext():
+            state = ImportState()
+            jobs = []
+            for key, importer_class in action.items():
+                name = key.removesuffix('.csv')
+                path = (options[f'{name}_csv']
+                        or os.path.join(options['dir'], key))
+                jobs.append((path, importer_class))
+            if workers > 1:
+                self.import_parallel(jobs, state, options['batch_size'],
+                                     workers)
+            else:
+                for path, importer_class in jobs:
+                    self.import_file(path, importer_class(state),
+                                     options['batch_size'])
+            if dry_run:
+                transaction.set_rollback(True)
+                self.stdout.write('Dry run, no changes were saved.')
+
+    def import_file(self, path, importer, batch_size):
+        """Stream the file and write it in chunks of `batch_size` rows."""
+        report = ImportReport(path)
+        with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+            rows = read_rows(csv_file)
+            while chunk := list(islice(rows, batch_size)):
+                objs = []
+                for line, result in clean_rows(importer, chunk):
+                    try:
+                        if isinstance(result, Exception):
+                            raise result
+                        instance = importer.admit(result)
+                    except ROW_ERRORS as error:
+                        report.invalid += 1
+                        self.stderr.write(f'{path}:{line}: {error}')
+                        continue
+                    if instance is None:
+                        report.duplicates += 1
+                    else:
+                        objs.append(instance)
+                self.write(importer, objs, batch_size)
+                report.created += len(objs)
+        self.stdout.write(str(report))
+
+    def import_parallel(self, jobs, state, batch_size, workers):
+        """
+        Validate and hash rows in worker processes, write them here.
+
+        Workers are spawned rather than forked, so they never share the
+        database connection of this process. Files are handled one after
+        another in `action` order, so foreign keys of a file are checked
+        only after the file they point to has been written. A file with
+        quoted values spanning lines can not be split into lines, it is
+        imported by `import_file` instead.
+        """
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            # This module needs the app registry, so the workers are set
+            # up with a plain `django.setup` before any task is unpickled.
+            initializer=django.setup,
+        ) as pool:
+            for path, importer_class in jobs:
+                importer = importer_class(state)
+                shards = [(path, start, end)
+                          for start, end in get_shards(path)]
+                if any(imap_bounded(pool, spans_lines, shards,
+                                    window=workers * 2)):
+                    self.stderr.write(f'{path}: quoted values span lines, '
+                                      f'importing it in one process.')
+                    self.import_file(path, importer, batch_size)
+                    continue
+                report = ImportReport(path)
+                tasks = ((importer_class, *shard) for shard in shards)
+                for cleaned, errors in imap_bounded(pool, clean_shard, tasks,
+                                                    window=workers * 2):
+                    for error in errors:
+                        self.stderr.write(error)
+                    report.invalid += len(errors)
+                    objs = []
+                    for instance in cleaned:
+                        try:
+                            instance = importer.admit(instance)
+                        except ROW_ERRORS as error:
+                            report.invalid += 1
+                            self.stderr.write(f'{path}: {error}')
+                            continue
+                        if instance is None:
+                            report.duplicates += 1
+                        else:
+                            objs.append(instance)
+                    self.write(importer, objs, batch_size)
+                    report.created += len(objs)
+                self.stdout.write(str(report))
+
+    def write(self, importer, objs, batch_size):
+        """Insert a batch of instances in its own transaction."""
+        with transaction.atomic():
+            importer.model.objects.bulk_create(objs, batch_size=batch_size)
+        importer.created(objs)
@@ -0,0 +1,13 @@
+from core.profiling import get_config, sign_header
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Print a header, which makes ProfilingMiddleware profile requests.'
+
+    def handle(self, *args, **options):
+        config = get_config()
+        self.stdout.write(f'{config["HEADER"]}: {sign_header()}')
+        self.stderr.write(
+            f'Valid for {config["HEADER_MAX_AGE"]} seconds, '
+            f'profiling is {"on" if config["ENABLED"] else "off"}.')
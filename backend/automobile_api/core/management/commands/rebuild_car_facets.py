@@ -0,0 +1,27 @@
+from cars.facets import find_inconsistent_facets, rebuild_facets
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Recompute facet counts of cars from the cars table, '
+            'or check them with --check.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report stale counts, fail if any.')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            values = rebuild_facets()
+            self.stdout.write(f'{values} facet values stored.')
+            return
+        inconsistent = 0
+        for facet, value, stored, actual in find_inconsistent_facets():
+            inconsistent += 1
+            self.stderr.write(f'{facet}={value!r}: stored {stored}, '
+                              f'actual {actual}.')
+        if inconsistent:
+            raise CommandError(
+                f'{inconsistent} facet values are inconsistent.')
+        self.stdout.write('Facet counts are consistent.')
@@ -0,0 +1,34 @@
+from cars.activity import (DEFAULT_BATCH_SIZE, find_inconsistent_cars,
+                           refresh_comment_activity)
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Recompute comments_count and last_commented_at of cars from '
+            'the comments table, or check them with --check.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Amount of cars updated with one query.')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report cars with stale values, fail if any.')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            updated = refresh_comment_activity(
+                batch_size=options['batch_size'])
+            self.stdout.write(f'{updated} cars updated.')
+            return
+        inconsistent = 0
+        for pk, stored, actual in find_inconsistent_cars(
+                options['batch_size']):
+            inconsistent += 1
+            self.stderr.write(
+                f'Car {pk}: stored {stored[0]} comments, last at '
+                f'{stored[1]}; actual {actual[0]} comments, last at '
+                f'{actual[1]}.')
+        if inconsistent:
+            raise CommandError(f'{inconsistent} cars are inconsistent.')
+        self.stdout.write('Comment activity of every car is consistent.')
@@ -0,0 +1,12 @@
+from cars.search import get_backend
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of cars and comments.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(
+            f'Search index rebuilt with {type(backend).__name__}.')
@@ -0,0 +1,84 @@
+import json
+import subprocess
+
+from core.benchmarks import BENCHMARKS, benchmark_database
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def git_revision():
+    """Commit of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Run a benchmark against a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS))
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--cars', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=0)
+        parser.add_argument('--size', type=int, default=10000,
+                            help='Amount of values for micro-benchmarks.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Concurrent clients of load tests.')
+        parser.add_argument('--output',
+                            help='Also write the results to a JSON file.')
+        parser.add_argument('--compare',
+                            help='JSON file of a previous run to diff with.')
+
+    def handle(self, *args, **options):
+        baseline = self.load(options['compare']) if options['compare'] else {}
+        with benchmark_database(verbosity=options['verbosity']):
+            results = BENCHMARKS[options['name']](options)
+        for row in results:
+            self.stdout.write('  '.join(
+                f'{key}={value}' for key, value in row.items()
+            ))
+            if row['name'] in baseline:
+                self.stdout.write('  ' + self.diff(baseline[row['name']],
+                                                   row))
+        if options['output']:
+            report = {
+                'benchmark': options['name'],
+                'revision': git_revision(),
+                'options': {key: options[key] for key in (
+                    'users', 'cars', 'comments', 'size', 'repeat',
+                    'concurrency')},
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+                file.write('\n')
+
+    def load(self, path):
+        """Return result rows of a previous run by name."""
+        try:
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        return {row['name']: row for row in report['results']}
+
+    def diff(self, before, after):
+        """Describe changes of numeric values between two rows."""
+        changes = []
+        for key, value in after.items():
+            old = before.get(key)
+            if (key == 'name' or not isinstance(value, (int, float))
+                    or not isinstance(old, (int, float)) or old == value):
+                continue
+            change = f'{key}: {old} -> {value}'
+            if old:
+                change += f' ({(value - old) / old:+.0%})'
+            changes.append(change)
+        return 'diff: ' + ('; '.join(changes) or 'none')
@@ -0,0 +1,369 @@
+'''
+Request metrics exposed in the Prometheus text format.
+
+`core.middleware.MetricsMiddleware` counts requests and observes their
+latency per URL name of the view. While a request runs, SQL queries,
+cache calls and serialization add their time to the request with
+`timed` and `record_query`, and the totals are observed as histograms
+once it is done.
+
+Values are kept in the memory of the process. With a pre-fork server
+every worker has its own values, so with the DIRECTORY setting each
+process writes them to a file of its own at most every FLUSH_INTERVAL
+seconds and on exit, and the `/metrics` endpoint adds up the files of
+all processes. Files of processes that are gone are folded into one
+archive file while collecting, so counters do not go back and the
+directory does not grow with restarted workers.
+
+Configured with the `METRICS` setting:
+    ENABLED (bool): Whether requests are measured and `/metrics` exists.
+    DIRECTORY (str): Directory shared by processes, or None.
+    FLUSH_INTERVAL (int): Seconds between writes of the process file.
+    ALLOWED_IPS (list): Addresses allowed to read `/metrics`, or None
+        for any.
+'''
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULT_METRICS = {
+    'ENABLED': False,
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+FILE_SUFFIX = '.json'
+# Values of processes that are gone, see `Registry.compact`.
+ARCHIVE_FILENAME = 'archive' + FILE_SUFFIX
+
+_timings = ContextVar('timings', default=None)
+
+
+def get_config():
+    return {**DEFAULT_METRICS, **getattr(settings, 'METRICS', {})}
+
+
+class Metric:
+    """Values of a metric by tuples of label values."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (registry or REGISTRY).register(self)
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: self.copy(value)
+                    for labels, value in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def copy(value):
+        return value
+
+    def labels_text(self, labels, extra=()):
+        pairs = [*zip(self.labelnames, labels), *extra]
+        if not pairs:
+            return ''
+        return '{' + ','.join(
+            f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, labels, value):
+        yield f'{self.name}{self.labels_text(labels)} {format_value(value)}'
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets. A value is a list of counts of every
+    bucket, not cumulative, the one of +Inf included, and of the sum.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets,
+                 registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, labels, amount):
+        index = bisect_left(self.buckets, amount)
+        with self._lock:
+            value = self._values.get(labels)
+            if value is None:
+                value = self._values[labels] = [0] * (len(self.buckets)
+                                                      + 1) + [0.0]
+            value[index] += 1
+            value[-1] += amount
+
+    @staticmethod
+    def copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(value, other):
+        return [a + b for a, b in zip(value, other)]
+
+    def samples(self, labels, value):
+        cumulative = 0
+        bounds = [*map(format_value, self.buckets), '+Inf']
+        for bound, count in zip(bounds, value):
+            cumulative += count
+            yield (f'{self.name}_bucket'
+                   f'{self.labels_text(labels, [("le", bound)])} '
+                   f'{cumulative}')
+        yield (f'{self.name}_sum{self.labels_text(labels)} '
+               f'{format_value(value[-1])}')
+        yield f'{self.name}_count{self.labels_text(labels)} {cumulative}'
+
+
+def escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def is_dead(filename):
+    """Whether the process of a `Registry.filename` is gone."""
+    try:
+        pid = int(filename.split('-', 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def write_json(path, data):
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+
+
+class Registry:
+    """Metrics of the process and their files for other processes."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.filename = f'{os.getpid()}-{time.time_ns()}{FILE_SUFFIX}'
+        self.flushed_at = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def after_fork(self):
+        """A forked worker starts without the values of its parent."""
+        for metric in self.metrics.values():
+            metric.clear()
+        self._start()
+
+    def snapshot(self):
+        return {name: metric.snapshot()
+                for name, metric in self.metrics.items()}
+
+    @staticmethod
+    def dump(values):
+        return {
+            name: [[list(labels), value] for labels, value in found.items()]
+            for name, found in values.items()
+        }
+
+    def flush(self, directory):
+        """Write the values of the process to its file in `directory`."""
+        data = self.dump(self.snapshot())
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            write_json(os.path.join(directory, self.filename), data)
+            self.flushed_at = time.monotonic()
+
+    def maybe_flush(self, config):
+        if (config['DIRECTORY'] and time.monotonic() - self.flushed_at
+                >= config['FLUSH_INTERVAL']):
+            self.flush(config['DIRECTORY'])
+
+    def collect(self, directory=None):
+        """Values of every metric added up over the processes."""
+        merged = self.snapshot()
+        if not directory or not os.path.isdir(directory):
+            return merged
+        # Collecting processes take turns, see `compact`.
+        descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+            self.compact(directory)
+            for name in os.listdir(directory):
+                if name.endswith(FILE_SUFFIX) and name != self.filename:
+                    self.merge_file(merged, os.path.join(directory, name))
+        finally:
+            os.close(descriptor)
+        return merged
+
+    def compact(self, directory):
+        """Fold the files of processes that are gone into the archive."""
+        dead = [name for name in os.listdir(directory)
+                if name.endswith(FILE_SUFFIX) and is_dead(name)]
+        if not dead:
+            return
+        archive = os.path.join(directory, ARCHIVE_FILENAME)
+        values = {name: {} for name in self.metrics}
+        for name in [ARCHIVE_FILENAME, *dead]:
+            self.merge_file(values, os.path.join(directory, name))
+        write_json(archive, self.dump(values))
+        for name in dead:
+            os.remove(os.path.join(directory, name))
+
+    def merge_file(self, merged, path):
+        """Add the values of a process file to `merged`."""
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            # Missing or being replaced in the meantime.
+            return
+        for metric_name, values in data.items():
+            metric = self.metrics.get(metric_name)
+            if metric is None:
+                continue
+            target = merged[metric_name]
+            for labels, value in values:
+                labels = tuple(labels)
+                target[labels] = (
+                    metric.merge(target[labels], value)
+                    if labels in target else value)
+
+    def render(self, directory=None):
+        """The text exposition format of `collect()`."""
+        lines = []
+        for name, values in self.collect(directory).items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels in sorted(values):
+                lines.extend(metric.samples(labels, values[labels]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+os.register_at_fork(after_in_child=REGISTRY.after_fork)
+
+
+@atexit.register
+def flush_on_exit():
+    config = get_config()
+    if config['ENABLED'] and config['DIRECTORY']:
+        REGISTRY.flush(config['DIRECTORY'])
+
+
+REQUESTS = Counter(
+    'http_requests_total', 'Requests by view, method and status.',
+    ('view', 'method', 'status'))
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to respond to a request.',
+    ('view', 'method'), REQUEST_BUCKETS)
+DB_QUERIES = Counter(
+    'db_queries_total', 'SQL queries made by requests.', ('view', ))
+DB_DURATION = Histogram(
+    'db_query_duration_seconds', 'Time of the SQL queries of a request.',
+    ('view', ), PHASE_BUCKETS)
+SERIALIZATION_DURATION = Histogram(
+    'serialization_duration_seconds',
+    'Time of serialization and JSON rendering of a request.',
+    ('view', ), PHASE_BUCKETS)
+CACHE_DURATION = Histogram(
+    'cache_duration_seconds', 'Time of the car cache calls of a request.',
+    ('view', ), PHASE_BUCKETS)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by namespace and result.',
+    ('namespace', 'result'))
+
+
+def start_request():
+    """Collect timings of the current request, returns a reset token."""
+    return _timings.set({'db': 0.0, 'queries': 0, 'serialization': 0.0,
+                         'cache': 0.0})
+
+
+def finish_request(token, view, method, status, duration):
+    timings = _timings.get()
+    _timings.reset(token)
+    REQUESTS.inc((view, method, str(status)))
+    REQUEST_DURATION.observe((view, method), duration)
+    DB_QUERIES.inc((view, ), timings['queries'])
+    DB_DURATION.observe((view, ), timings['db'])
+    SERIALIZATION_DURATION.observe((view, ), timings['serialization'])
+    CACHE_DURATION.observe((view, ), timings['cache'])
+
+
+class timed:
+    """Add the time of the block to a phase of the current request."""
+    __slots__ = ('phase', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.phase] += time.perf_counter() - self.start
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper of every connection, see `core.apps`."""
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings['db'] += time.perf_counter() - start
+        timings['queries'] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """`connection_created` receiver adding `record_query`."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,270 @@
+import cProfile
+import logging
+import pstats
+import random
+import time
+
+from asgiref.sync import (async_to_sync, iscoroutinefunction,
+                          markcoroutinefunction, sync_to_async)
+from core import metrics, profiling, replicas
+from core.querycount import QueryBudgetError, QueryRecorder, repeated_shapes
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = {
+    'ENABLED': False,
+    'MODE': 'log',
+    'DEFAULT': 20,
+    'REPEATED': 3,
+    'VIEWS': {},
+}
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts SQL queries of every request and reports requests that exceed
+    the query budget of their view or run one query shape too many times.
+
+    Configured with the `QUERY_BUDGET` setting:
+        ENABLED (bool): Whether the middleware is used at all.
+        MODE (str): 'log' to log a warning, 'raise' to raise
+            `QueryBudgetError`, e.g. in development.
+        DEFAULT (int): Budget of views that are missing in VIEWS.
+        REPEATED (int): How many times a single query shape may run.
+        VIEWS (dict): Budgets by URL name, such as 'api:cars-list'.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = {**DEFAULT_QUERY_BUDGET,
+                  **getattr(settings, 'QUERY_BUDGET', {})}
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.raise_errors = config['MODE'] == 'raise'
+        self.default_budget = config['DEFAULT']
+        self.repeated_limit = config['REPEATED']
+        self.view_budgets = config['VIEWS']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        async with QueryRecorder() as recorder:
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        """Add the query count to a response and check its budget."""
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        response['X-Query-Count'] = str(len(recorder.queries))
+        problems = self.check(view_name, recorder.statements)
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(
+                problems)
+            if self.raise_errors:
+                raise QueryBudgetError(message)
+            logger.warning(message)
+        return response
+
+    def check(self, view_name, statements):
+        """Return descriptions of the budget violations of a request."""
+        problems = []
+        budget = self.view_budgets.get(view_name, self.default_budget)
+        if len(statements) > budget:
+            problems.append(f'{len(statements)} queries made by '
+                            f'{view_name}, the budget is {budget}')
+        for shape, count in repeated_shapes(
+                statements, self.repeated_limit).items():
+            problems.append(f'{count} queries of the same shape: {shape}')
+        return problems
+
+
+class ReplicaMiddleware:
+    """
+    Sends reads of safe requests to the listed views to a random read
+    replica and keeps clients that wrote on the primary for a while,
+    see `core.replicas`.
+
+    Configured with the `DATABASE_REPLICAS` setting:
+        ALIASES (list): Database aliases of the replicas, the middleware
+            is not used without them.
+        VIEWS (list): URL names of views that may read from replicas.
+        STICKY_SECONDS (int): How long a client that wrote reads from
+            the primary.
+        CACHE_ALIAS (str): Cache of the clients that wrote.
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        config = replicas.get_config()
+        if not config['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.aliases = list(config['ALIASES'])
+        self.views = frozenset(config['VIEWS'])
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replicas.request_scope():
+            response = self.get_response(request)
+            if replicas.has_written():
+                replicas.make_sticky(getattr(request, '_replica_client',
+                                             None))
+            self.keep_scope(response)
+        return response
+
+    async def __acall__(self, request):
+        with replicas.request_scope():
+            response = await self.get_response(request)
+            if replicas.has_written():
+                await sync_to_async(replicas.make_sticky)(
+                    getattr(request, '_replica_client', None))
+            self.keep_scope(response)
+        return response
+
+    def keep_scope(self, response):
+        # Content of e.g. 'api:cars-export' is read after the scope ends.
+        if not response.streaming:
+            return
+        scope = replicas.ain_scope if response.is_async else replicas.in_scope
+        response.streaming_content = scope(response.streaming_content)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.safe_methods:
+            # Remembered now, the view may log the user in or out.
+            request._replica_client = replicas.client_key(request)
+            return None
+        if (request.resolver_match.view_name in self.views
+                and not replicas.is_sticky(replicas.client_key(request))):
+            replicas.route_reads_to(random.choice(self.aliases))
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled requests and requests with the signed header with
+    cProfile, see `core.profiling`. Profiled responses get
+    a `Server-Timing` header with the time of the request phases.
+
+    Configured with the `REQUEST_PROFILING` setting:
+        ENABLED (bool): Whether the middleware is used at all.
+        SAMPLE_RATE (float): Part of requests profiled without a header.
+        HEADER (str): Header with the value of `profiling.sign_header`.
+        HEADER_MAX_AGE (int): Seconds a signed header is accepted for.
+        DIRECTORY (str): Directory of the profile files.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = profiling.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.config = config
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+        # cProfile sees a single thread. Sync code of async views, run by
+        # sync_to_async, comes back to this one.
+        return await sync_to_async(self.profile)(
+            request, async_to_sync(self.get_response))
+
+    def should_profile(self, request):
+        return (random.random() < self.config['SAMPLE_RATE']
+                or profiling.has_signed_header(request, self.config))
+
+    def profile(self, request, get_response):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with profiling.StackSampler(profiling.SAMPLE_INTERVAL) as sampler:
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+                total = time.perf_counter() - start
+        phases = profiling.phase_times(pstats.Stats(profiler).stats)
+        name = profiling.view_name(request)
+        profiling.write_profile(
+            self.config['DIRECTORY'], name, sampler.stacks, {
+                'view': name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'time': time.time(),
+                'total_ms': round(total * 1000, 3),
+                'phases_ms': {phase: round(seconds * 1000, 3)
+                              for phase, seconds in phases.items()},
+            })
+        response['Server-Timing'] = ', '.join(
+            f'{phase};dur={seconds * 1000:.3f}'
+            for phase, seconds in (('total', total), *phases.items()))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and observes their latency, SQL, cache and
+    serialization time per URL name of the view, see `core.metrics`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.config = config
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, start = metrics.start_request(), time.perf_counter()
+        response = self.get_response(request)
+        self.finish(request, response, token, start)
+        return response
+
+    async def __acall__(self, request):
+        token, start = metrics.start_request(), time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(request, response, token, start)
+        return response
+
+    def finish(self, request, response, token, start):
+        match = request.resolver_match
+        # Paths of unresolved requests would make too many label values.
+        view = match.view_name if match else 'unresolved'
+        metrics.finish_request(token, view, request.method,
+                               response.status_code,
+                               time.perf_counter() - start)
+        metrics.REGISTRY.maybe_flush(self.config)
@@ -0,0 +1,240 @@
+'''
+Profiling of single requests with cProfile.
+
+`core.middleware.ProfilingMiddleware` profiles a sample of requests and
+requests with a header signed by `sign_header`. Results are appended to
+files named after the URL name of the view, in the profile directory:
+
+    <view>.collapsed: Collapsed stacks, one "frame;frame;frame μs" line
+        per stack, which flamegraph.pl or speedscope can draw.
+    <view>.jsonl: One line per request with the wall-clock time of the
+        request and of its phases, see `PHASES`.
+
+Phases are measured by cProfile. It records calls between pairs of
+functions rather than whole stacks, and the shared functions of Django
+middleware make its call graph cyclic, so stacks are sampled from
+another thread by `StackSampler` while the request is profiled. Files
+are merged by the `aggregate_profiles` command.
+
+Code of async views that runs on the event loop is not seen by
+cProfile, the stacks show the time the request waited for it. Their
+sync parts, e.g. queries run by sync_to_async, are profiled.
+'''
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from importlib import import_module
+
+from django.conf import settings
+from django.core import signing
+
+DEFAULT_REQUEST_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'HEADER': 'X-Profile',
+    'HEADER_MAX_AGE': 3600,
+    'DIRECTORY': 'profiles',
+}
+SIGNING_SALT = 'core.profiling'
+# Functions of the phases, by dotted path, properties by the path of
+# the property. Functions of a phase must not call each other
+# indirectly, or the time of the calls is counted twice.
+PHASES = {
+    'resolve': (
+        'django.urls.resolvers.URLResolver.resolve',
+    ),
+    'auth': (
+        'rest_framework.request.Request._authenticate',
+        'django.contrib.auth.get_user',
+    ),
+    'permissions': (
+        'rest_framework.views.APIView.check_permissions',
+        'rest_framework.views.APIView.check_object_permissions',
+    ),
+    # Iteration of querysets, and count() and other aggregates.
+    'queryset': (
+        'django.db.models.query.QuerySet._fetch_all',
+        'django.db.models.sql.query.Query.get_aggregation',
+    ),
+    'serialization': (
+        'rest_framework.serializers.BaseSerializer.data',
+        'api.rows.RowSerializer.many',
+        'rest_framework.renderers.JSONRenderer.render',
+        'api.renderers.FastJSONRenderer.render',
+    ),
+    'templates': (
+        'django.template.base.Template.render',
+        'django.template.backends.django.Template.render',
+    ),
+}
+# Seconds between samples of the stack. The sampling thread waits for
+# the GIL, so busy requests are sampled less often, see
+# sys.getswitchinterval().
+SAMPLE_INTERVAL = 0.001
+COLLAPSED_SUFFIX = '.collapsed'
+PHASES_SUFFIX = '.jsonl'
+
+
+def get_config():
+    return {**DEFAULT_REQUEST_PROFILING,
+            **getattr(settings, 'REQUEST_PROFILING', {})}
+
+
+def sign_header():
+    """Value of the profile header accepted for HEADER_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def has_signed_header(request, config):
+    value = request.headers.get(config['HEADER'])
+    if not value:
+        return False
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=config['HEADER_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def import_function(path):
+    module, _, name = path.rpartition('.')
+    try:
+        target = import_module(module)
+    except ImportError:
+        # A method, import its class first.
+        module, _, owner = module.rpartition('.')
+        target = getattr(import_module(module), owner)
+    function = getattr(target, name)
+    return getattr(function, 'fget', function)
+
+
+def function_key(function):
+    """Key of the function in the stats of cProfile."""
+    code = function.__code__
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+_phase_keys = None
+
+
+def get_phase_keys():
+    """{stats key: phase name} of the functions of `PHASES`."""
+    global _phase_keys
+    if _phase_keys is None:
+        _phase_keys = {
+            function_key(import_function(path)): phase
+            for phase, paths in PHASES.items() for path in paths
+        }
+    return _phase_keys
+
+
+def frame_label(key):
+    filename, lineno, name = key
+    if filename == '~':
+        # Built-in functions.
+        return name.replace(';', ',')
+    for prefix in ('site-packages' + os.sep, str(settings.BASE_DIR) + os.sep):
+        if prefix in filename:
+            filename = filename.split(prefix, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f'{filename}:{lineno}:{name}'.replace(';', ',')
+
+
+class StackSampler:
+    """
+    Context manager that samples the stack of the current thread from
+    another thread every `interval` seconds.
+
+    Attributes:
+        stacks (Counter): Seconds by tuple of frame labels, outermost
+            first, starting below the frame that entered the sampler.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+        self._labels = {}
+
+    def __enter__(self):
+        frame = sys._getframe(1)
+        self._thread_id = threading.get_ident()
+        self._root = frame.f_code
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.stacks[self._stack(frame)] += now - last
+            last = now
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None and frame.f_code is not self._root:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = frame_label(
+                    (code.co_filename, code.co_firstlineno, code.co_name))
+            labels.append(label)
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+
+def phase_times(stats):
+    """
+    Seconds of every phase from the stats of cProfile. Calls of
+    a function of a phase made directly by another function of the same
+    phase are counted once.
+    """
+    phase_keys = get_phase_keys()
+    times = dict.fromkeys(PHASES, 0.0)
+    for key, (_, _, _, cumulative, callers) in stats.items():
+        phase = phase_keys.get(key)
+        if phase is None:
+            continue
+        nested = sum(edge[3] for caller, edge in callers.items()
+                     if caller != key and phase_keys.get(caller) == phase)
+        times[phase] += cumulative - nested
+    return times
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unresolved'
+
+
+def file_stem(name):
+    # URL names contain ':', which is not allowed in Windows file names.
+    return name.replace(':', '.').replace(os.sep, '_')
+
+
+def write_profile(directory, name, stacks, record):
+    """Append stacks and the record of a request to the files of a view."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, file_stem(name))
+    lines = [
+        ';'.join(stack) + f' {round(seconds * 1e6)}\n'
+        for stack, seconds in stacks.items()
+        if stack and round(seconds * 1e6)
+    ]
+    # Single writes in append mode, so processes do not mix lines.
+    with open(path + COLLAPSED_SUFFIX, 'a', encoding='utf-8') as file:
+        file.write(''.join(lines))
+    with open(path + PHASES_SUFFIX, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(record, ensure_ascii=False) + '\n')
@@ -0,0 +1,81 @@
+'''
+Recording of SQL queries and detection of N+1 patterns.
+
+Queries are grouped by shape: the SQL with literals and parameter
+placeholders replaced by `?`, and `IN` lists collapsed. The same shape
+executed many times within one request is the trace of a per-row query.
+'''
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|\?')
+IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+class QueryBudgetError(Exception):
+    """Raised when a request makes more queries than its budget allows."""
+
+
+def normalize_sql(sql):
+    """Return the shape of an SQL statement."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def repeated_shapes(statements, limit):
+    """Return {shape: count} of shapes executed more than `limit` times."""
+    counts = Counter(normalize_sql(sql) for sql in statements)
+    return {shape: count for shape, count in counts.items()
+            if count > limit}
+
+
+class QueryRecorder:
+    """
+    Context manager that records (sql, duration in ms) of every query of
+    every database connection of the current thread.
+
+    It uses execute wrappers, so unlike `CaptureQueriesContext` it works
+    with DEBUG turned off and keeps no parameters. Used with `async with`,
+    it records the queries of the thread that `sync_to_async` runs the
+    ORM calls of the current request in.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - start) * 1000))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+    async def __aenter__(self):
+        return await sync_to_async(self.__enter__)()
+
+    async def __aexit__(self, *exc_info):
+        return await sync_to_async(self.__exit__)(*exc_info)
+
+    @property
+    def statements(self):
+        return [sql for sql, _ in self.queries]
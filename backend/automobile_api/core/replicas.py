@@ -0,0 +1,174 @@
+'''
+Routing of reads to read replicas of the default database.
+
+Reads go to the primary (default) database unless the current request
+opted in with `route_reads_to`, which `ReplicaMiddleware` does for safe
+requests to the views listed in the `DATABASE_REPLICAS` setting. Once
+the request writes, the rest of it reads from the primary, so it sees
+its own writes. The client that wrote keeps reading from the primary
+for `STICKY_SECONDS`, while the replicas catch up.
+
+The state is kept in context variables, which are local to a thread
+and to an asyncio task and follow `sync_to_async` and `async_to_sync`
+calls. Streaming responses are read by the server after the request,
+`in_scope` and `ain_scope` give their content the state of the
+request.
+
+The clients that wrote are remembered in the `CACHE_ALIAS` cache. With
+a process-local cache, such as the default LocMemCache, a client is kept
+on the primary only by the server process that handled its write, see
+`check_sticky_cache`.
+'''
+import asyncio
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+DEFAULT_DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'VIEWS': [],
+    'STICKY_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+}
+
+_replica = ContextVar('replica', default=None)
+_wrote = ContextVar('wrote', default=False)
+
+
+def get_config():
+    return {**DEFAULT_DATABASE_REPLICAS,
+            **getattr(settings, 'DATABASE_REPLICAS', {})}
+
+
+@contextmanager
+def request_scope():
+    """Start with reads from the primary and forget the state afterwards."""
+    replica_token, wrote_token = _replica.set(None), _wrote.set(False)
+    try:
+        yield
+    finally:
+        _replica.reset(replica_token)
+        _wrote.reset(wrote_token)
+
+
+def in_scope(content):
+    """
+    Iterate `content` of a streaming response with the routing state of
+    the current request, which is reset before the server reads it.
+    """
+    # Copied now, the body of a generator would only run once iterated.
+    context = copy_context()
+    iterator = iter(content)
+
+    def chunks():
+        while True:
+            try:
+                chunk = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield chunk
+
+    return chunks()
+
+
+def ain_scope(content):
+    """`in_scope` of the async content of a streaming response."""
+    context = copy_context()
+    iterator = aiter(content)
+
+    end = object()
+
+    async def step():
+        return await anext(iterator, end)
+
+    async def chunks():
+        # Every step runs in a task of its own with the copied state.
+        while (chunk := await asyncio.create_task(
+                step(), context=context)) is not end:
+            yield chunk
+
+    return chunks()
+
+
+def route_reads_to(alias):
+    _replica.set(alias)
+
+
+def has_written():
+    return _wrote.get()
+
+
+class ReplicaRouter:
+    """Sends reads of opted in requests to a replica, writes to primary."""
+
+    def db_for_read(self, model, **hints):
+        # select_for_update() is routed as a write.
+        alias = _replica.get()
+        if alias is None or _wrote.get():
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary.
+        if db in get_config()['ALIASES']:
+            return False
+        return None
+
+
+def client_key(request):
+    """
+    Identify the client for the sticky window: by the Authorization
+    header of API requests, otherwise by the user of the session.
+    """
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        digest = hashlib.md5(authorization.encode('utf-8')).hexdigest()
+        return f'db:sticky:auth:{digest}'
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'db:sticky:user:{user.pk}'
+    return None
+
+
+def is_sticky(key):
+    config = get_config()
+    return bool(key) and caches[config['CACHE_ALIAS']].get(key, False)
+
+
+def make_sticky(key):
+    """Keep the client on the primary while replicas catch up."""
+    config = get_config()
+    if key and config['STICKY_SECONDS']:
+        caches[config['CACHE_ALIAS']].set(key, True,
+                                          config['STICKY_SECONDS'])
+
+
+def check_sticky_cache(app_configs, **kwargs):
+    """Warn when clients that wrote are remembered per process."""
+    config = get_config()
+    if not config['ALIASES']:
+        return []
+    if not isinstance(caches[config['CACHE_ALIAS']], LocMemCache):
+        return []
+    return [checks.Warning(
+        f'DATABASE_REPLICAS uses the process-local cache '
+        f'"{config["CACHE_ALIAS"]}" for clients that wrote.',
+        hint='With several server processes other processes keep sending '
+             'their reads to replicas, set CACHE_ALIAS to a shared cache '
+             'such as Redis or Memcached.',
+        id='core.W001',
+    )]
@@ -0,0 +1,15 @@
+from core import metrics
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+
+def metrics_view(request):
+    """Metrics of every process in the Prometheus text format."""
+    config = metrics.get_config()
+    if not config['ENABLED']:
+        raise Http404
+    allowed = config['ALLOWED_IPS']
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        raise PermissionDenied
+    return HttpResponse(metrics.REGISTRY.render(config['DIRECTORY']),
+                        content_type=metrics.CONTENT_TYPE)
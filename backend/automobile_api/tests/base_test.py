@@ -1,6 +1,11 @@
+from contextlib import contextmanager
+
+from core.querycount import repeated_shapes
 from django.contrib.auth import get_user_model
+from django.db import connections
 from django.http import HttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
@@ -60,3 +65,34 @@ class CommonTestCase(TestCase):
         self.assertEqual(response.headers['Content-Type'],
                          'application/json',
                          'Response format must be a JSON.')
+
+
+class QueryCountMixin:
+    """Assertions on SQL queries made inside a `with` block."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using='default'):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{len(queries)} queries executed, at most {budget} expected:\n'
+            + '\n'.join(queries))
+
+    @contextmanager
+    def assertNoRepeatedQueries(self, limit=1, using='default'):
+        '''
+        limit is how many times a single query shape may be executed,
+        the default one catches every N+1 pattern.
+        '''
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        repeated = repeated_shapes(
+            [query['sql'] for query in context.captured_queries], limit)
+        details = '\n'.join(f'{count}x {shape}'
+                            for shape, count in repeated.items())
+        self.assertFalse(
+            repeated,
+            f'Same query shape executed more than {limit} times '
+            f'(N+1 pattern):\n{details}')
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from cars.models import Car, Comment
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to denormalized comment activity of cars'''
+
+
+class CommentActivityTestCase(BaseTestCase):
+    '''Test suite related to comments_count and last_commented_at.'''
+    BASE_URL = '/api/cars/'
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user
+        )
+
+    def run_command(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('rebuild_comment_activity', *args,
+                     stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_api_comment_updates_activity(self):
+        '''Comment made with the API must be counted on its car.'''
+        # Arrange
+        url = f'{self.BASE_URL}{self.car.id}/comments/'
+        # Act
+        for content in ('Первый!', 'Второй!'):
+            self.auth_client.post(url, {'content': content})
+        response = self.client.get(f'{self.BASE_URL}{self.car.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        last_comment = Comment.objects.latest('created_at')
+        self.assertEqual(response.data['comments_count'], 2)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.last_commented_at, last_comment.created_at)
+
+    def test_page_comment_updates_activity(self):
+        '''Comment made on the car page must be counted on its car.'''
+        # Arrange
+        self.client.force_login(self.auth_user)
+        # Act
+        self.client.post(f'/cars/{self.car.id}/comment/',
+                         {'content': 'Очень шустрая!'})
+        # Assert
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.comments_count, 1)
+        self.assertIsNotNone(self.car.last_commented_at)
+
+    def test_orm_comment_updates_activity(self):
+        '''Comment made outside of the views must be counted as well.'''
+        # Act
+        comment = Comment.objects.create(
+            content='Из админки.', car=self.car, author=self.auth_user)
+        # Assert
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.comments_count, 1)
+        self.assertEqual(self.car.last_commented_at, comment.created_at)
+
+    def test_activity_is_read_only(self):
+        '''Activity fields must not be writable with the API.'''
+        # Act
+        self.auth_client.put(f'{self.BASE_URL}{self.car.id}/', {
+            'make': 'Toyota', 'model': 'Camry', 'year': 2021,
+            'description': 'Компактный седан.', 'comments_count': 100,
+        })
+        # Assert
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.comments_count, 0)
+
+    def test_deleted_comment_is_not_counted(self):
+        '''Deleted comment must be subtracted from its car.'''
+        # Arrange
+        url = f'{self.BASE_URL}{self.car.id}/comments/'
+        self.auth_client.post(url, {'content': 'Первый!'})
+        first = Comment.objects.get()
+        self.auth_client.post(url, {'content': 'Второй!'})
+        # Act
+        Comment.objects.exclude(pk=first.pk).get().delete()
+        # Assert
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.comments_count, 1)
+        self.assertEqual(self.car.last_commented_at, first.created_at)
+
+    def test_check_and_rebuild_bulk_created_comments(self):
+        '''Command must find and fix activity stale after a bulk insert.'''
+        # Arrange
+        Comment.objects.bulk_create(
+            Comment(content=f'Комментарий {i}', car=self.car,
+                    author=self.auth_user)
+            for i in range(3)
+        )
+        # Act
+        with self.assertRaises(CommandError):
+            self.run_command('--check')
+        stdout, _ = self.run_command('--batch-size', '1')
+        check_stdout, _ = self.run_command('--check')
+        # Assert
+        self.assertIn('1 cars updated', stdout)
+        self.assertIn('consistent', check_stdout)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.comments_count, 3)
@@ -0,0 +1,88 @@
+from cars.models import Car, Comment
+from django.contrib.auth import get_user_model
+from tests.base_test import BaseTestCase, CommonTestCase, QueryCountMixin
+
+UserModel = get_user_model()
+'''Tests related to the amount of SQL queries made by the API'''
+
+
+class APIQueriesTestCase(QueryCountMixin, BaseTestCase):
+    '''Test suite related to queries of the cars and comments API.'''
+    BASE_URL = '/api/cars/'
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user
+        )
+        authors = [
+            UserModel.objects.create_user(username=f'author_{i}')
+            for i in range(3)
+        ]
+        for i in range(6):
+            Comment.objects.create(content=f'Комментарий {i}', car=self.car,
+                                   author=authors[i % len(authors)])
+        self.comments_url = f'{self.BASE_URL}{self.car.id}/comments/'
+
+    def test_cars_list(self):
+        '''Cars list is a count and a page, without descriptions.'''
+        # Act
+        with self.assertNumQueries(2):
+            response = self.client.get(self.BASE_URL)
+        with self.assertNumQueries(1):
+            cursor = self.client.get(f'{self.BASE_URL}?pagination=cursor')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertEqual(response.data['results'], cursor.data['results'])
+
+    def test_car_detail(self):
+        '''Car detail has a description after an ETag lookup.'''
+        # Act
+        with self.assertNumQueries(2):
+            response = self.client.get(f'{self.BASE_URL}{self.car.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['description'], 'Компактный седан.')
+
+    def test_comments_list(self):
+        '''Comments list loads authors with the comments.'''
+        # Act
+        with self.assertNumQueries(2), self.assertNoRepeatedQueries():
+            response = self.client.get(self.comments_url)
+        with self.assertNumQueries(1):
+            self.client.get(f'{self.comments_url}?pagination=cursor')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(
+            {comment['author'] for comment in response.data['results']},
+            {'author_0', 'author_1', 'author_2'})
+
+    def test_comments_of_car_without_comments(self):
+        '''Empty list is returned for a car, 404 for a missing car.'''
+        # Arrange
+        car = Car.objects.create(make='Ford', model='Focus', year=2010,
+                                 description='Хэтчбек.',
+                                 owner=self.auth_user)
+        # Act
+        empty = self.client.get(f'{self.BASE_URL}{car.id}/comments/')
+        missing = self.client.get(f'{self.BASE_URL}9999/comments/')
+        # Assert
+        CommonTestCase.assert200Response(self, empty)
+        self.assertEqual(empty.data['results'], [])
+        self.assertEqual(missing.status_code, 404)
+
+    def test_comment_detail(self):
+        '''Comment is loaded with its author in a single query.'''
+        # Arrange
+        comment = Comment.objects.first()
+        # Act
+        with self.assertNumQueries(1):
+            response = self.client.get(f'{self.comments_url}{comment.id}/')
+        other = self.client.get(
+            f'{self.BASE_URL}9999/comments/{comment.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['author'], comment.author.username)
+        self.assertEqual(other.status_code, 404)
@@ -0,0 +1,176 @@
+from api.async_views import JSONResponse
+from cars.cache import get_cache
+from cars.models import Car, Comment
+from core.loadtest import run_asgi, run_wsgi
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.test import TransactionTestCase, override_settings
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the async read path'''
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cars': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cars-async-tests',
+    },
+}
+CAR_INFO = {
+    'make': 'Toyota',
+    'model': 'Camry',
+    'year': 2021,
+    'description': 'Компактный седан.',
+}
+
+
+@override_settings(CACHES=CACHES)
+class AsyncReadTestCase(BaseTestCase):
+    '''Test suite related to the async views of cars and comments.'''
+
+    def setUp(self):
+        get_cache().clear()
+        self.car = Car.objects.create(owner=self.auth_user, **CAR_INFO)
+
+    def test_api_car_is_served_async(self):
+        '''Car must be served without DRF on a miss and on a hit.'''
+        # Arrange
+        url = f'/api/cars/{self.car.id}/'
+        # Act
+        miss = self.client.get(url)
+        hit = self.client.get(url)
+        get_cache().clear()
+        drf = self.auth_client.get(url)
+        # Assert
+        self.assertNotIsInstance(drf, JSONResponse)
+        for response in (miss, hit):
+            CommonTestCase.assert200Response(self, response)
+            self.assertIsInstance(response, JSONResponse)
+            self.assertEqual(response.content, drf.content)
+            for header in ('Content-Type', 'ETag', 'Last-Modified',
+                           'Allow'):
+                self.assertEqual(response[header], drf[header], header)
+
+    async def test_api_car_not_modified(self):
+        '''Matching ETag must get 304 response from the async view.'''
+        # Arrange
+        url = f'/api/cars/{self.car.id}/'
+        etag = (await self.async_client.get(url))['ETag']
+        # Act
+        response = await self.async_client.get(url, headers={
+            'If-None-Match': etag})
+        # Assert
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_list_is_served_async(self):
+        '''Pages of cars must be served without DRF, as DRF does.'''
+        # Arrange
+        Car.objects.bulk_create(
+            Car(owner=self.auth_user, **{**CAR_INFO, 'model': f'Supra {i}'})
+            for i in range(15)
+        )
+        for query in ('', '?page=2', '?make=Toyota&year_min=2000',
+                      '?make=Lada', f'?owner={self.auth_user.id}',
+                      '?pagination=cursor', '?pagination=cursor&with_count=1',
+                      '?page_size=3&page=2'):
+            url = f'/api/cars/{query}'
+            # Act
+            miss = self.client.get(url)
+            hit = self.client.get(url)
+            get_cache().clear()
+            drf = self.auth_client.get(url)
+            get_cache().clear()
+            # Assert
+            for response in (miss, hit):
+                self.assertIsInstance(response, JSONResponse)
+                self.assertEqual(response.content, drf.content, url)
+
+    def test_api_list_errors_use_drf(self):
+        '''Bad filters, cursors and missing pages must reach DRF.'''
+        for query, status_code in (('?owner=me', 400), ('?page=3', 404),
+                                   ('?page=0', 404), ('?cursor=bad', 404)):
+            # Act
+            response = self.client.get(f'/api/cars/{query}')
+            # Assert
+            self.assertNotIsInstance(response, JSONResponse)
+            self.assertEqual(response.status_code, status_code, query)
+
+    def test_api_comments_match_drf(self):
+        '''Comments page must be the same as the one rendered by DRF.'''
+        # Arrange
+        Comment.objects.bulk_create(
+            Comment(content=f'Комментарий {i}', car=self.car,
+                    author=self.auth_user)
+            for i in range(25)
+        )
+        for query in ('', '?page=2', '?page=3', '?ordering=-created_at',
+                      '?ordering=-created_at&page=2', '?pagination=cursor'):
+            url = f'/api/cars/{self.car.id}/comments/{query}'
+            # Act
+            response = self.client.get(url)
+            drf = self.auth_client.get(url)
+            # Assert
+            self.assertIsInstance(response, JSONResponse)
+            self.assertEqual(response.content, drf.content, url)
+
+    def test_api_comments_edge_cases(self):
+        '''Empty pages must be served, missing ones answered by DRF.'''
+        # Act
+        empty = self.client.get(f'/api/cars/{self.car.id}/comments/')
+        missing = self.client.get('/api/cars/0/comments/')
+        out_of_range = self.client.get(
+            f'/api/cars/{self.car.id}/comments/?page=2')
+        # Assert
+        self.assertIsInstance(empty, JSONResponse)
+        self.assertEqual(empty.data['results'], [])
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(out_of_range.status_code, 404)
+
+    def test_writes_pass_through(self):
+        '''Writes must reach DRF through the async view.'''
+        # Act
+        response = self.auth_client.post('/api/cars/', CAR_INFO)
+        # Assert
+        self.assertEqual(response.status_code, 201)
+
+    async def test_car_page_is_rendered_for_the_user(self):
+        '''Async detail page must know the logged in user.'''
+        # Arrange
+        await self.async_client.aforce_login(self.auth_user)
+        # Act
+        response = await self.async_client.get(f'/cars/{self.car.id}/')
+        # Assert
+        self.assertContains(response, 'Camry')
+        self.assertContains(response, 'Выйти')
+
+    async def test_missing_car_page(self):
+        '''Async detail page of a missing car must respond with 404.'''
+        # Act
+        response = await self.async_client.get('/cars/0/')
+        # Assert
+        self.assertEqual(response.status_code, 404)
+
+    async def test_homepage(self):
+        '''Async homepage must list the cars.'''
+        # Act
+        response = await self.async_client.get('/')
+        # Assert
+        self.assertContains(response, 'Camry')
+
+
+class LoadTestTestCase(TransactionTestCase):
+    '''Test suite related to the ASGI and WSGI load drivers.'''
+
+    def test_drivers_complete_every_request(self):
+        '''Both drivers must get every response with status 200.'''
+        # Arrange
+        url = '/api/cars/'
+        # Act
+        asgi = run_asgi(get_asgi_application(), url, 2, 2)
+        wsgi = run_wsgi(get_wsgi_application(), url, 2, 2)
+        # Assert
+        for elapsed, samples in (asgi, wsgi):
+            self.assertGreater(elapsed, 0)
+            self.assertEqual(len(samples), 4)
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from core.benchmarks import (bench_endpoints, bench_serializers,
+                             bench_templates, bench_writes, summarize)
+from django.test import TestCase
+
+'''Tests related to the benchmark suite'''
+
+
+class BenchmarksTestCase(TestCase):
+    '''Test suite related to benchmark helpers.'''
+
+    def test_percentiles_use_nearest_rank(self):
+        '''Percentiles must never be below the median.'''
+        # Act
+        summary = summarize([1.0, 3.0])
+        # Assert
+        self.assertEqual(summary['p50_ms'], 2.0)
+        self.assertEqual(summary['p95_ms'], 3.0)
+        self.assertEqual(summary['max_ms'], 3.0)
+
+    def test_endpoints_report(self):
+        '''Every endpoint must be reported with queries and bytes.'''
+        # Act
+        results = bench_endpoints({'users': 2, 'cars': 3, 'comments': 4,
+                                   'repeat': 2})
+        # Assert
+        self.assertEqual(len(results), 8)
+        for row in results:
+            self.assertGreater(row['bytes'], 0, row['name'])
+            self.assertGreaterEqual(row['queries'], 1, row['name'])
+
+    def test_serializers_report(self):
+        '''Every serialization path must produce the same page.'''
+        # Act
+        results = bench_serializers({'users': 2, 'cars': 3, 'repeat': 2})
+        # Assert
+        self.assertEqual(len(results), 9)
+        self.assertEqual(len({row['bytes'] for row in results[-3:]}), 1)
+
+    def test_templates_report(self):
+        '''Pages must render the same with and without cached fragments.'''
+        # Act
+        results = bench_templates({'users': 2, 'cars': 3, 'comments': 4,
+                                   'repeat': 2})
+        # Assert
+        self.assertEqual(len(results), 6)
+        self.assertEqual(len({row['bytes'] for row in results[:4]}), 1)
+
+    def test_writes_report(self):
+        '''Production profile must commit every concurrent comment.'''
+        # Act
+        # The benchmark connects to a database alias of its own.
+        with mock.patch.object(type(self), 'databases',
+                               {'default', 'bench_writes'}):
+            results = bench_writes({'concurrency': 4, 'repeat': 5})
+        # Assert
+        production = results[-1]
+        self.assertEqual(production['name'], 'comments (production)')
+        self.assertEqual(production['writes'], 20)
+        self.assertEqual(production['errors'], 0)
@@ -0,0 +1,165 @@
+import json
+
+from cars.models import Car
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from tests.base_test import BaseTestCase, CommonTestCase
+
+UserModel = get_user_model()
+'''Tests related to bulk create and update of cars'''
+
+
+class CarsBulkAPITestCase(BaseTestCase):
+    '''Test suite related to /api/cars/bulk/ endpoint.'''
+    URL = '/api/cars/bulk/'
+    CAR_INFO = {
+        'make': 'Ford',
+        'model': 'Mustang',
+        'year': 1967,
+        'description': 'Спортивный автомобиль с мощным двигателем.',
+    }
+
+    def setUp(self):
+        self.car = Car.objects.create(owner=self.auth_user, **self.CAR_INFO)
+        self.another_user = UserModel.objects.create_user(
+            username='aux_user', password='Strong_password1')
+        self.another_client = APIClient()
+        token = Token.objects.create(user=self.another_user)
+        self.another_client.credentials(
+            HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_bulk_create_from_json_array(self):
+        '''Test that list of cars is created in one request.'''
+        # Arrange
+        cars = [{**self.CAR_INFO, 'model': f'Mustang {i}'} for i in range(5)]
+        # Act
+        response = self.auth_client.post(self.URL, cars, format='json')
+        # Assert
+        CommonTestCase.assert201Response(self, response)
+        self.assertEqual(len(response.data), 5)
+        self.assertTrue(all(item['id'] for item in response.data))
+        self.assertEqual(
+            Car.objects.filter(owner=self.auth_user,
+                               model__startswith='Mustang ').count(),
+            5)
+
+    def test_bulk_create_from_ndjson(self):
+        '''Test that NDJSON body is accepted.'''
+        # Arrange
+        body = '\n'.join(
+            json.dumps({**self.CAR_INFO, 'model': f'Focus {i}'})
+            for i in range(3)
+        )
+        # Act
+        response = self.auth_client.post(
+            self.URL, body, content_type='application/x-ndjson')
+        # Assert
+        CommonTestCase.assert201Response(self, response)
+        self.assertEqual(Car.objects.filter(model__startswith='Focus').count(),
+                         3)
+
+    def test_bulk_create_with_invalid_item(self):
+        '''Test that one invalid item rolls back the whole request.'''
+        # Arrange
+        cars = [self.CAR_INFO, {**self.CAR_INFO, 'model': '&2>Mod~el^'}]
+        # Act
+        response = self.auth_client.post(self.URL, cars, format='json')
+        # Assert
+        CommonTestCase.assert400Response(self, response)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('model', response.data[1])
+        self.assertEqual(Car.objects.count(), 1)
+
+    def test_bulk_create_reports_every_invalid_field(self):
+        '''Test that column validation keeps errors of every field.'''
+        # Arrange
+        cars = [
+            {**self.CAR_INFO, 'make': '&Ford'},
+            {**self.CAR_INFO, 'model': 'Mod~el', 'year': 'year'},
+            self.CAR_INFO,
+        ]
+        # Act
+        response = self.auth_client.post(self.URL, cars, format='json')
+        # Assert
+        CommonTestCase.assert400Response(self, response)
+        self.assertEqual(list(response.data[0]), ['make'])
+        self.assertEqual(sorted(response.data[1]), ['model', 'year'])
+        self.assertEqual(response.data[2], {})
+
+    def test_bulk_create_limit(self):
+        '''Test that amount of items per request is limited.'''
+        # Arrange
+        cars = [self.CAR_INFO] * 1001
+        # Act
+        response = self.auth_client.post(self.URL, cars, format='json')
+        # Assert
+        CommonTestCase.assert400Response(self, response)
+        self.assertEqual(Car.objects.count(), 1)
+
+    def test_ndjson_limit_is_checked_while_parsing(self):
+        '''Test that NDJSON body is rejected at the first extra item.'''
+        # Arrange
+        line = json.dumps(self.CAR_INFO)
+        body = '\n'.join([line] * 1001 + ['not json'])
+        # Act
+        response = self.auth_client.post(
+            self.URL, body, content_type='application/x-ndjson')
+        # Assert
+        CommonTestCase.assert400Response(self, response)
+        self.assertIn('no more than 1000 items', response.data['detail'])
+        self.assertEqual(Car.objects.count(), 1)
+
+    def test_unauthenticated_user_cannot_bulk_create(self):
+        response = self.client.post(self.URL, json.dumps([self.CAR_INFO]),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_bulk_update(self):
+        '''Test that owner updates many cars at once.'''
+        # Arrange
+        second_car = Car.objects.create(owner=self.auth_user,
+                                        **self.CAR_INFO)
+        updated_at = self.car.updated_at
+        data = [
+            {'id': self.car.id, **self.CAR_INFO, 'model': 'Shelby'},
+            {'id': second_car.id, **self.CAR_INFO, 'model': 'Bullitt'},
+        ]
+        # Act
+        response = self.auth_client.put(self.URL, data, format='json')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.car.refresh_from_db()
+        second_car.refresh_from_db()
+        self.assertEqual(self.car.model, 'Shelby')
+        self.assertEqual(second_car.model, 'Bullitt')
+        self.assertNotEqual(self.car.updated_at, updated_at)
+
+    def test_bulk_update_of_another_user_car(self):
+        '''Test that user cannot update cars of another user.'''
+        # Arrange
+        data = [{'id': self.car.id, **self.CAR_INFO, 'model': 'Shelby'}]
+        # Act
+        response = self.another_client.put(self.URL, data, format='json')
+        # Assert
+        self.assertEqual(response.status_code, 403)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.model, self.CAR_INFO['model'])
+
+    def test_bulk_update_requires_existing_ids(self):
+        '''Test scenarios with missing or unknown car ids.'''
+        test_cases = [
+            ([self.CAR_INFO], 400, 'Item without id must be rejected'),
+            ([{'id': 9999, **self.CAR_INFO}], 404,
+             'Non-existing car must lead to 404 response'),
+            ([{'id': True, **self.CAR_INFO}], 400,
+             'Boolean id must be rejected'),
+            ([{'id': self.car.id, **self.CAR_INFO}] * 2, 400,
+             'Repeated id must be rejected'),
+        ]
+        for data, expected_status_code, err_msg in test_cases:
+            with self.subTest(err_msg=err_msg):
+                response = self.auth_client.put(self.URL, data,
+                                                format='json')
+                self.assertEqual(response.status_code, expected_status_code,
+                                 err_msg)
@@ -0,0 +1,163 @@
+from cars.cache import counters, get_cache
+from cars.models import Car, Comment
+from django.core.cache.utils import make_template_fragment_key
+from django.test import override_settings
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the car cache and its invalidation'''
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cars': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cars-tests',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class CarsCacheTestCase(BaseTestCase):
+    '''Test suite related to cached car lists and payloads.'''
+    BASE_URL = '/api/cars/'
+    CAR_INFO = {
+        'make': 'Toyota',
+        'model': 'Camry',
+        'year': 2021,
+        'description': 'Компактный седан.',
+    }
+
+    def setUp(self):
+        get_cache().clear()
+        counters.reset()
+        self.car = Car.objects.create(owner=self.auth_user, **self.CAR_INFO)
+
+    def test_api_list_is_served_from_cache(self):
+        '''Repeated list request must not touch the database.'''
+        # Arrange
+        self.client.get(self.BASE_URL)
+        # Act
+        with self.assertNumQueries(0):
+            response = self.client.get(self.BASE_URL)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(counters.snapshot()['api-list'],
+                         {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_api_list_is_keyed_by_query_params(self):
+        '''Different pages must be cached separately.'''
+        # Act
+        first = self.client.get(self.BASE_URL)
+        cursor = self.client.get(f'{self.BASE_URL}?pagination=cursor')
+        # Assert
+        self.assertIn('count', first.data)
+        self.assertNotIn('count', cursor.data)
+
+    def test_api_list_is_invalidated_on_create(self):
+        '''Created car must appear in a previously cached list.'''
+        # Arrange
+        self.client.get(self.BASE_URL)
+        # Act
+        self.auth_client.post(self.BASE_URL, self.CAR_INFO)
+        response = self.client.get(self.BASE_URL)
+        # Assert
+        self.assertEqual(response.data['count'], 2)
+
+    def test_api_list_is_invalidated_on_bulk_create(self):
+        '''Bulk created cars must appear in a previously cached list.'''
+        # Arrange
+        self.client.get(self.BASE_URL)
+        # Act
+        self.auth_client.post(f'{self.BASE_URL}bulk/', [self.CAR_INFO] * 2,
+                              format='json')
+        response = self.client.get(self.BASE_URL)
+        # Assert
+        self.assertEqual(response.data['count'], 3)
+
+    def test_api_detail_is_invalidated_on_update_and_delete(self):
+        '''Updated or deleted car must not be served from the cache.'''
+        # Arrange
+        url = f'{self.BASE_URL}{self.car.id}/'
+        self.client.get(url)
+        # Act
+        self.auth_client.put(url, {**self.CAR_INFO, 'model': 'Corolla'})
+        updated = self.client.get(url)
+        self.auth_client.delete(url)
+        deleted = self.client.get(url)
+        # Assert
+        self.assertEqual(updated.data['model'], 'Corolla')
+        self.assertEqual(deleted.status_code, 404)
+
+    def test_html_detail_is_invalidated_on_new_comment(self):
+        '''New comment must appear on a previously cached detail page.'''
+        # Arrange
+        url = f'/cars/{self.car.id}/'
+        self.client.get(url)
+        # Act
+        Comment.objects.create(content='Очень шустрая!', car=self.car,
+                               author=self.auth_user)
+        # ETag lookup, then a cache miss: car and comments.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        # Assert
+        self.assertContains(response, 'Очень шустрая!')
+
+    def test_homepage_is_invalidated_on_car_change(self):
+        '''Homepage must show a car created after it was cached.'''
+        # Arrange
+        self.client.get('/')
+        # Act
+        Car.objects.create(owner=self.auth_user,
+                           **{**self.CAR_INFO, 'model': 'Supra'})
+        response = self.client.get('/')
+        # Assert
+        self.assertContains(response, 'Supra')
+
+    def test_homepage_rows_are_cached_fragments(self):
+        '''Rows must be cached by car and shown updated after a change.'''
+        # Arrange
+        self.client.get('/')
+        key = make_template_fragment_key(
+            'car-row', [self.car.id, self.car.updated_at])
+        # Act
+        self.car.model = 'Corolla'
+        self.car.save()
+        response = self.client.get('/')
+        # Assert
+        self.assertIn(key, get_cache())
+        self.assertContains(response, 'Corolla')
+        self.assertNotContains(response, 'Camry')
+
+    def test_comment_fragment_follows_deleted_comments(self):
+        '''Deleted comment must disappear from a cached comment list.'''
+        # Arrange
+        url = f'/cars/{self.car.id}/'
+        comments = [
+            Comment.objects.create(content=content, car=self.car,
+                                   author=self.auth_user)
+            for content in ('Первый отзыв', 'Второй отзыв')
+        ]
+        self.client.get(url)
+        # Act
+        comments[0].delete()
+        response = self.client.get(url)
+        # Assert
+        self.assertContains(response, 'Второй отзыв')
+        self.assertNotContains(response, 'Первый отзыв')
+
+    def test_cache_stats_are_available_to_staff_only(self):
+        '''Cache counters must be exposed to staff users only.'''
+        # Arrange
+        url = '/api/cache/stats/'
+        # Act
+        anonymous = self.client.get(url)
+        user = self.auth_client.get(url)
+        self.auth_user.is_staff = True
+        self.auth_user.save()
+        staff = self.auth_client.get(url)
+        # Assert
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(user.status_code, 403)
+        CommonTestCase.assert200Response(self, staff)
@@ -0,0 +1,80 @@
+from cars.models import Car
+from tests.base_test import BaseTestCase
+
+'''Tests related to ETag and Last-Modified headers of car pages'''
+
+
+class CarConditionalGetTestCase(BaseTestCase):
+    '''Test suite related to conditional GET of a car.'''
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user
+        )
+        self.api_url = f'/api/cars/{self.car.id}/'
+        self.page_url = f'/cars/{self.car.id}/'
+
+    def test_api_returns_304_for_matching_etag(self):
+        '''Matching ETag must lead to 304 after a single lookup.'''
+        # Arrange
+        etag = self.client.get(self.api_url)['ETag']
+        # Act
+        with self.assertNumQueries(1):
+            response = self.client.get(self.api_url,
+                                       HTTP_IF_NONE_MATCH=etag)
+        # Assert
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_returns_304_for_if_modified_since(self):
+        # Arrange
+        last_modified = self.client.get(self.api_url)['Last-Modified']
+        # Act
+        response = self.client.get(self.api_url,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        # Assert
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_etag_changes_after_update(self):
+        '''Updated car must be sent again with a new ETag.'''
+        # Arrange
+        etag = self.client.get(self.api_url)['ETag']
+        self.car.model = 'Corolla'
+        self.car.save()
+        # Act
+        response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=etag)
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['model'], 'Corolla')
+
+    def test_api_missing_car(self):
+        response = self.client.get('/api/cars/9999/',
+                                   HTTP_IF_NONE_MATCH='"whatever"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_returns_304_until_new_comment(self):
+        '''Detail page ETag must follow the latest comment.'''
+        # Arrange
+        self.client.force_login(self.auth_user)
+        etag = self.client.get(self.page_url)['ETag']
+        # Act
+        not_modified = self.client.get(self.page_url,
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.client.post(f'{self.page_url}comment/',
+                         {'content': 'Очень шустрая!'})
+        modified = self.client.get(self.page_url, HTTP_IF_NONE_MATCH=etag)
+        # Assert
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(modified.status_code, 200)
+        self.assertContains(modified, 'Очень шустрая!')
+
+    def test_page_etag_differs_per_user(self):
+        '''Page rendered for another user must not be reused.'''
+        # Arrange
+        etag = self.client.get(self.page_url)['ETag']
+        self.client.force_login(self.auth_user)
+        # Act
+        response = self.client.get(self.page_url, HTTP_IF_NONE_MATCH=etag)
+        # Assert
+        self.assertEqual(response.status_code, 200)
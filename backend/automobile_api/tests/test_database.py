@@ -0,0 +1,105 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from automobile_api.database import (SQLITE_PRODUCTION_PRAGMAS,
+                                     database_settings, replica_settings,
+                                     sqlite_settings)
+from core.benchmarks import extra_database
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase
+
+'''Tests related to the database profiles'''
+
+BASE_DIR = Path('/srv/automobile_api')
+
+
+class DatabaseSettingsTestCase(SimpleTestCase):
+    '''Test suite related to database settings from the environment.'''
+
+    def test_development_is_default(self):
+        '''Without variables the plain SQLite file must be used.'''
+        # Act
+        database = database_settings({}, BASE_DIR)
+        # Assert
+        self.assertEqual(database['NAME'], str(BASE_DIR / 'db.sqlite3'))
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertNotIn('PRAGMAS', database)
+
+    def test_sqlite_production_profile(self):
+        '''Production SQLite must reuse connections and wait for locks.'''
+        # Act
+        database = database_settings(
+            {'DB_PROFILE': 'production', 'DB_NAME': '/data/cars.sqlite3'},
+            BASE_DIR)
+        # Assert
+        self.assertEqual(database['NAME'], '/data/cars.sqlite3')
+        self.assertGreater(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertEqual(database['OPTIONS']['transaction_mode'],
+                         'IMMEDIATE')
+        self.assertEqual(database['PRAGMAS']['journal_mode'], 'WAL')
+
+    def test_postgresql_pool(self):
+        '''Pooled PostgreSQL must not use persistent connections.'''
+        # Act
+        pooled = database_settings(
+            {'DB_ENGINE': 'postgresql', 'DB_PROFILE': 'production',
+             'DB_HOST': 'db', 'DB_POOL_MAX_SIZE': '20'}, BASE_DIR)
+        persistent = database_settings(
+            {'DB_ENGINE': 'postgresql', 'DB_PROFILE': 'production',
+             'DB_POOL_MAX_SIZE': '0'}, BASE_DIR)
+        # Assert
+        self.assertEqual(pooled['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(pooled['HOST'], 'db')
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 20)
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertNotIn('OPTIONS', persistent)
+        self.assertGreater(persistent['CONN_MAX_AGE'], 0)
+
+    def test_replicas(self):
+        '''Replicas must be connected like the primary.'''
+        # Arrange
+        sqlite = database_settings({'DB_PROFILE': 'production'}, BASE_DIR)
+        postgresql = database_settings({'DB_ENGINE': 'postgresql'},
+                                       BASE_DIR)
+        # Act
+        files = replica_settings(
+            {'DB_REPLICAS': 'replica.sqlite3, backup.sqlite3'}, sqlite)
+        hosts = replica_settings({'DB_REPLICAS': 'db-2:6432'}, postgresql)
+        # Assert
+        self.assertEqual(list(files), ['replica_1', 'replica_2'])
+        self.assertEqual(files['replica_2']['NAME'], 'backup.sqlite3')
+        self.assertEqual(files['replica_1']['PRAGMAS'], sqlite['PRAGMAS'])
+        self.assertEqual((hosts['replica_1']['HOST'],
+                          hosts['replica_1']['PORT']), ('db-2', '6432'))
+        self.assertEqual(replica_settings({}, sqlite), {})
+
+    def test_invalid_values(self):
+        '''Unknown profile or a non-integer must be reported.'''
+        for environ in ({'DB_PROFILE': 'staging'},
+                        {'DB_ENGINE': 'mysql'},
+                        {'DB_CONN_MAX_AGE': 'forever'}):
+            with self.subTest(environ=environ):
+                with self.assertRaises(ImproperlyConfigured):
+                    database_settings(environ, BASE_DIR)
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        '''Every connection of the production profile must use WAL.'''
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'cars.sqlite3')
+            with extra_database('pragmas', sqlite_settings(name, True)), \
+                    mock.patch.object(type(self), 'databases', {'pragmas'}):
+                # Act
+                with connections['pragmas'].cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                    cursor.execute('PRAGMA cache_size')
+                    cache_size = cursor.fetchone()[0]
+        # Assert
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(cache_size,
+                         SQLITE_PRODUCTION_PRAGMAS['cache_size'])
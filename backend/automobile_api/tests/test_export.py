@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+from api.serializers import CarSerializer
+from cars.models import Car
+from django.contrib.auth import get_user_model
+from tests.base_test import BaseTestCase
+
+UserModel = get_user_model()
+'''Tests related to streaming export of cars'''
+
+
+class CarsExportTestCase(BaseTestCase):
+    '''Test suite related to /api/cars/export/ endpoint.'''
+    URL = '/api/cars/export/'
+
+    def setUp(self):
+        self.another_user = UserModel.objects.create_user(
+            username='aux_user', password='Strong_password1')
+        for make, owner in (('Toyota', self.auth_user),
+                            ('Ford', self.auth_user),
+                            ('Ford', self.another_user)):
+            Car.objects.create(make=make, model='Модель', year=2020,
+                               description='Описание, с запятой.',
+                               owner=owner)
+
+    def get_ndjson(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_ndjson_export_matches_api_representation(self):
+        '''Exported rows must be equal to serialized cars.'''
+        # Arrange
+        expected = [
+            dict(CarSerializer(car).data)
+            for car in Car.objects.order_by('updated_at', 'id')
+        ]
+        # Act
+        rows = self.get_ndjson(self.URL)
+        # Assert
+        self.assertEqual(rows, expected)
+
+    def test_csv_export(self):
+        '''CSV export must contain a header and a line per car.'''
+        # Act
+        response = self.client.get(f'{self.URL}?output=csv')
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['description'], 'Описание, с запятой.')
+
+    def test_export_filters(self):
+        '''Export must be narrowed by owner, make and updated_since.'''
+        # Arrange
+        last_car = Car.objects.latest('updated_at')
+        since = last_car.updated_at.isoformat()
+        test_cases = [
+            (f'?owner={self.another_user.id}', 1),
+            ('?make=Ford', 2),
+            (f'?make=Ford&owner={self.auth_user.id}', 1),
+            (f'?updated_since={since.replace("+", "%2B")}', 1),
+        ]
+        for query, expected_amount in test_cases:
+            with self.subTest(query=query):
+                # Act
+                rows = self.get_ndjson(self.URL + query)
+                # Assert
+                self.assertEqual(len(rows), expected_amount)
+
+    async def test_asgi_export_is_async(self):
+        '''Export under ASGI must stream an async iterator.'''
+        # Arrange
+        expected = [car.id async for car
+                    in Car.objects.order_by('updated_at', 'id')]
+        # Act
+        response = await self.async_client.get(self.URL)
+        body = b''.join([chunk async for chunk
+                         in response.streaming_content])
+        csv_response = await self.async_client.get(f'{self.URL}?output=csv')
+        csv_body = b''.join([chunk async for chunk
+                             in csv_response.streaming_content])
+        # Assert
+        self.assertTrue(response.is_async)
+        self.assertEqual([json.loads(line)['id']
+                          for line in body.splitlines()], expected)
+        self.assertEqual(len(csv_body.decode('utf-8').splitlines()), 4)
+
+    def test_invalid_parameters(self):
+        '''Malformed parameters must lead to 400 response.'''
+        for query in ('?output=xml', '?owner=me',
+                      '?updated_since=yesterday',
+                      '?updated_since=2024-13-01T00:00:00'):
+            with self.subTest(query=query):
+                response = self.client.get(self.URL + query)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,141 @@
+from io import StringIO
+
+from cars.models import Car, CarFacet
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to filtering of cars and facet counts'''
+
+
+class CarFacetsTestCase(BaseTestCase):
+    '''Test suite related to car filters and /api/cars/facets/.'''
+    BASE_URL = '/api/cars/'
+    URL = '/api/cars/facets/'
+
+    def setUp(self):
+        for make, model, year in (('Toyota', 'Camry', 2021),
+                                  ('Toyota', 'Supra', 1998),
+                                  ('Ford', 'Focus', 2010),
+                                  ('Ford', 'Focus', None)):
+            Car.objects.create(make=make, model=model, year=year,
+                               description='Автомобиль.',
+                               owner=self.auth_user)
+
+    def counts(self, response, facet):
+        return {item['value']: item['count']
+                for item in response.data[facet]}
+
+    def assertConsistent(self):
+        stdout = StringIO()
+        call_command('rebuild_car_facets', '--check', stdout=stdout)
+        self.assertIn('consistent', stdout.getvalue())
+
+    def test_list_filters(self):
+        '''Filters must narrow the cars list.'''
+        # Act
+        fords = self.client.get(self.BASE_URL, {'make': 'Ford'})
+        toyotas = self.client.get(
+            f'{self.BASE_URL}?make=Toyota&make=Lada&year_min=2000')
+        invalid = self.client.get(self.BASE_URL, {'year_max': 'old'})
+        # Assert
+        CommonTestCase.assert200Response(self, fords)
+        self.assertEqual(fords.data['count'], 2)
+        self.assertEqual([car['model'] for car in toyotas.data['results']],
+                         ['Camry'])
+        CommonTestCase.assert400Response(self, invalid)
+
+    def test_facet_counts(self):
+        '''Counts of all cars must be read from the facet table.'''
+        # Act
+        with self.assertNumQueries(5):  # One per facet and usernames.
+            response = self.client.get(self.URL)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(self.counts(response, 'make'),
+                         {'Toyota': 2, 'Ford': 2})
+        self.assertEqual(self.counts(response, 'year'),
+                         {2021: 1, 1998: 1, 2010: 1, None: 1})
+        self.assertEqual(response.data['owner'], [{
+            'value': self.auth_user.id, 'count': 4,
+            'label': self.auth_user.username,
+        }])
+
+    def test_filtered_facet_counts(self):
+        '''Counts of a filtered list must be aggregated on request.'''
+        # Act
+        response = self.client.get(self.URL, {'make': 'Ford'})
+        # Assert
+        self.assertEqual(self.counts(response, 'model'), {'Focus': 2})
+
+    @override_settings(CARS_FACET_COUNTS='live')
+    def test_live_counts_match_table(self):
+        '''Live aggregation must give the same counts as the table.'''
+        # Arrange
+        CarFacet.objects.all().delete()
+        # Act
+        response = self.client.get(self.URL)
+        # Assert
+        self.assertEqual(self.counts(response, 'make'),
+                         {'Toyota': 2, 'Ford': 2})
+
+    def test_counts_follow_changes(self):
+        '''Saved, deleted and bulk written cars must be counted.'''
+        # Arrange
+        camry = Car.objects.get(model='Camry')
+        supra = Car.objects.get(model='Supra')
+        # Act
+        camry.make = 'Lexus'
+        camry.save()
+        supra.delete()
+        created = self.auth_client.post(f'{self.BASE_URL}bulk/', [{
+            'make': 'Lada', 'model': 'Niva', 'year': 1977,
+            'description': 'Внедорожник.',
+        }] * 2, format='json')
+        self.auth_client.put(f'{self.BASE_URL}bulk/', [{
+            'id': created.data[0]['id'], 'make': 'Lada', 'model': 'Vesta',
+            'year': 2020, 'description': 'Седан.',
+        }], format='json')
+        response = self.client.get(self.URL)
+        # Assert
+        self.assertEqual(self.counts(response, 'make'),
+                         {'Ford': 2, 'Lada': 2, 'Lexus': 1})
+        self.assertEqual(self.counts(response, 'model'),
+                         {'Focus': 2, 'Camry': 1, 'Niva': 1, 'Vesta': 1})
+        self.assertConsistent()
+
+    def test_bulk_create_facet_queries_do_not_grow(self):
+        '''Facets of a bulk create must be counted in a few queries.'''
+        # Arrange
+        def facet_queries(amount):
+            cars = [{'make': 'Lada', 'model': f'Niva {i}', 'year': 1977,
+                     'description': 'Внедорожник.'} for i in range(amount)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.auth_client.post(
+                    f'{self.BASE_URL}bulk/', cars, format='json')
+            CommonTestCase.assert201Response(self, response)
+            return [query['sql'] for query in context.captured_queries
+                    if '"cars_carfacet"' in query['sql']]
+        # Act
+        few, many = facet_queries(10), facet_queries(200)
+        # Assert
+        self.assertEqual(len(few), len(many))
+        updates = [sql for sql in many if sql.startswith('UPDATE')]
+        self.assertEqual(len(updates), 2,
+                         'Expected one UPDATE per distinct delta.')
+        self.assertConsistent()
+
+    def test_rebuild_fixes_drift(self):
+        '''Command must report and then fix stale counts.'''
+        # Arrange
+        CarFacet.objects.filter(facet='make').update(count=0)
+        # Act
+        with self.assertRaises(CommandError):
+            call_command('rebuild_car_facets', '--check',
+                         stderr=StringIO())
+        call_command('rebuild_car_facets', stdout=StringIO())
+        # Assert
+        self.assertConsistent()
@@ -0,0 +1,118 @@
+import re
+from unittest import mock
+
+from cars.models import Car, Comment
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to pages and "load more" chunks of the HTML site'''
+
+CAR_LINK = re.compile(r'href="/cars/(\d+)/"')
+
+
+@mock.patch('cars.views.CARS_PAGE_SIZE', 10)
+class HomepagePaginationTestCase(BaseTestCase):
+    '''Test suite related to pages of the homepage.'''
+    CARS_AMOUNT = 25
+
+    def setUp(self):
+        Car.objects.bulk_create(
+            Car(make='Toyota', model=f'Camry {i}', year=2021,
+                description='Компактный седан.', owner=self.auth_user)
+            for i in range(self.CARS_AMOUNT)
+        )
+        # Identical timestamps make the id tie-breaker meaningful.
+        Car.objects.update(created_at=Car.objects.first().created_at)
+        self.expected_ids = list(
+            Car.objects.order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def car_ids(self, html):
+        return [int(car_id) for car_id in CAR_LINK.findall(html)]
+
+    def test_homepage_shows_first_page(self):
+        '''Homepage must render one page of cars and a "load more" link.'''
+        # Act
+        response = self.client.get('/')
+        # Assert
+        self.assertEqual(self.car_ids(response.content.decode()),
+                         self.expected_ids[:10])
+        self.assertContains(response, 'hx-get="/cars/rows/?cursor=')
+
+    def test_chunks_visit_every_car_once(self):
+        '''JSON chunks must follow each other through all the cars.'''
+        # Arrange
+        url, ids = '/cars/rows/', []
+        # Act
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            ids.extend(self.car_ids(response.json()['html']))
+            url = response.json()['next']
+        # Assert
+        self.assertEqual(ids, self.expected_ids)
+        self.assertNotIn('cars-more', response.json()['html'])
+
+    def test_invalid_cursor(self):
+        '''Malformed cursor must lead to 404 response.'''
+        # Act
+        page = self.client.get('/', {'cursor': 'not-a-cursor'})
+        chunk = self.client.get('/cars/rows/', {'cursor': 'bm90LWpzb24'})
+        # Assert
+        self.assertEqual(page.status_code, 404)
+        self.assertEqual(chunk.status_code, 404)
+
+
+@mock.patch('cars.views.COMMENTS_PAGE_SIZE', 3)
+class CommentsPaginationTestCase(BaseTestCase):
+    '''Test suite related to pages of comments of the car detail page.'''
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user)
+        Comment.objects.bulk_create(
+            Comment(content=f'Отзыв номер {i}.', car=self.car,
+                    author=self.auth_user)
+            for i in range(5)
+        )
+        self.url = f'/cars/{self.car.id}/'
+
+    def test_detail_shows_first_page_of_comments(self):
+        '''Detail page must show the newest comments and a link.'''
+        # Act
+        response = self.client.get(self.url)
+        # Assert
+        self.assertContains(response, 'Отзыв номер 4.')
+        self.assertContains(response, 'Отзыв номер 2.')
+        self.assertNotContains(response, 'Отзыв номер 1.')
+        self.assertContains(
+            response, f'hx-get="/cars/{self.car.id}/comments/?cursor=')
+
+    def test_chunk_and_page_show_next_comments(self):
+        '''Chunk and page of a cursor must show the older comments.'''
+        # Arrange
+        first = self.client.get(self.url).content.decode()
+        cursor = re.search(r'\?cursor=([\w-]+)', first).group(1)
+        # Act
+        chunk = self.client.get(f'/cars/{self.car.id}/comments/',
+                                {'cursor': cursor}, HTTP_HX_REQUEST='true')
+        page = self.client.get(self.url, {'cursor': cursor})
+        # Assert
+        for response in (chunk, page):
+            self.assertContains(response, 'Отзыв номер 1.')
+            self.assertContains(response, 'Отзыв номер 0.')
+            self.assertNotContains(response, 'Отзыв номер 2.')
+            self.assertNotContains(response, 'comments-more')
+        self.assertNotContains(chunk, '<html')
+
+    def test_chunk_of_missing_car(self):
+        '''Comments of a missing car must lead to 404 response.'''
+        # Arrange
+        Comment.objects.all().delete()
+        # Act
+        empty = self.client.get(f'/cars/{self.car.id}/comments/')
+        missing = self.client.get('/cars/0/comments/')
+        # Assert
+        CommonTestCase.assert200Response(self, empty, verbose=False)
+        self.assertEqual(missing.status_code, 404)
@@ -0,0 +1,163 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from cars.models import Car, Comment
+from core.management.commands.load_test_data_from_csv import (CarsImporter,
+                                                              get_shards,
+                                                              parse_line,
+                                                              read_shard)
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+
+UserModel = get_user_model()
+'''Tests related to the CSV import management command'''
+
+
+class LoadTestDataFromCSVTestCase(TestCase):
+    '''Test suite related to load_test_data_from_csv command.'''
+    COMMAND = 'load_test_data_from_csv'
+
+    def run_command(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(self.COMMAND, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_of_test_data(self):
+        '''Test that every row of the bundled data is imported.'''
+        # Act
+        self.run_command('--batch-size', '2')
+        # Assert
+        self.assertEqual(UserModel.objects.count(), 3)
+        self.assertEqual(Car.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 10)
+        user = UserModel.objects.get(username='bilbo')
+        self.assertTrue(user.check_password('88005553535pozvonimne'),
+                        'Password must be stored hashed and usable.')
+        self.assertEqual(Car.objects.filter(make='Toyota').get().model,
+                         'Camry')
+        self.assertEqual(
+            sum(Car.objects.values_list('comments_count', flat=True)), 10,
+            'Imported comments must be counted on their cars.')
+
+    def test_import_is_idempotent(self):
+        '''Test that repeated import does not create duplicates.'''
+        # Arrange
+        self.run_command()
+        # Act
+        stdout, _ = self.run_command()
+        # Assert
+        self.assertEqual(Car.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertIn('cars.csv: 0 created, 6 duplicates', stdout)
+
+    def test_dry_run_saves_nothing(self):
+        '''Test that dry run rolls back every written batch.'''
+        # Act
+        stdout, _ = self.run_command('--dry-run')
+        # Assert
+        self.assertIn('comments.csv: 10 created', stdout)
+        self.assertEqual(UserModel.objects.count(), 0)
+        self.assertEqual(Car.objects.count(), 0)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_invalid_rows_are_skipped(self):
+        '''Test that rows with bad data or unknown owners are reported.'''
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cars.csv')
+            with open(path, 'w', encoding='utf-8') as csv_file:
+                csv_file.write('Toyota,Camry,2021,Седан,1\n'
+                               'Toyota,&2>Mod~el^,2021,Седан,1\n'
+                               'Toyota,Corolla,2021,Седан,9999\n'
+                               'Toyota,Corolla,year,Седан,1\n')
+            # Act
+            stdout, stderr = self.run_command('--cars-csv', path)
+        # Assert
+        self.assertIn('cars.csv: 1 created, 0 duplicates, 3 invalid', stdout)
+        self.assertEqual(stderr.count('cars.csv:'), 3)
+
+    def test_parallel_import_matches_sequential_import(self):
+        '''Test that --workers mode imports the same rows.'''
+        # Act
+        stdout, _ = self.run_command('--workers', '2')
+        # Assert
+        self.assertEqual(UserModel.objects.count(), 3)
+        self.assertEqual(Car.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertTrue(UserModel.objects.get(username='fedor')
+                        .check_password('very_str0ng'))
+        self.assertIn('comments.csv: 10 created', stdout)
+
+    def test_multiline_values_are_imported_whole(self):
+        '''Test that quoted values with line breaks stay in their rows.'''
+        # Arrange
+        description = 'Компактный седан.\nЭкономичный, надежный.'
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cars.csv')
+            with open(path, 'w', encoding='utf-8') as csv_file:
+                csv_file.write(f'Toyota,Camry,2021,"{description}",1\n'
+                               'Toyota,Corolla,2020,Седан,1\n')
+            for workers in ('1', '2'):
+                with self.subTest(workers=workers):
+                    Car.objects.all().delete()
+                    # Act
+                    stdout, _ = self.run_command(
+                        '--cars-csv', path, '--comments-csv', os.devnull,
+                        '--workers', workers)
+                    # Assert
+                    self.assertIn('cars.csv: 2 created, 0 duplicates, '
+                                  '0 invalid', stdout)
+                    self.assertEqual(
+                        Car.objects.get(model='Camry').description,
+                        description)
+
+    def test_chunk_errors_are_aligned_with_rows(self):
+        '''Test that batch validation reports the errors of each row.'''
+        # Arrange
+        rows = [['Toyota', 'Camry', '2021', 'Седан', '1'],
+                ['Toyota', 'Mod~el', '1800', 'Седан', '1'],
+                ['', 'Corolla', '2021', 'Седан', '1']]
+        instances = [CarsImporter.convert(row) for row in rows]
+        # Act
+        results = CarsImporter.clean_many(instances)
+        # Assert
+        self.assertIs(results[0], instances[0])
+        self.assertIsInstance(results[1], ValidationError)
+        self.assertEqual(sorted(results[1].message_dict), ['model', 'year'])
+        self.assertEqual(list(results[2].message_dict), ['make'])
+
+
+class CSVShardsTestCase(TestCase):
+    '''Test suite related to splitting CSV files by byte ranges.'''
+
+    def test_every_line_is_read_exactly_once(self):
+        '''Test that shards of any size cover every line once.'''
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cars.csv')
+            lines = [f'Toyota,Camry {i},2021,Седан,1' for i in range(50)]
+            with open(path, 'w', encoding='utf-8') as csv_file:
+                csv_file.write('\n'.join(lines))
+            for size in (1, 7, 64, 10 ** 6):
+                with self.subTest(size=size):
+                    # Act
+                    rows = [parse_line(line)
+                            for start, end in get_shards(path, size)
+                            for _, line in read_shard(path, start, end)]
+                    # Assert
+                    self.assertEqual([','.join(row) for row in rows], lines)
+
+    def test_quoted_line_breaks_are_detected(self):
+        '''Test that a shard refuses values spanning lines.'''
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cars.csv')
+            with open(path, 'w', encoding='utf-8') as csv_file:
+                csv_file.write('Toyota,Camry,2021,"Седан,\n""2021""",1\n')
+            # Act
+            with self.assertRaises(csv.Error):
+                list(read_shard(path, 0, os.path.getsize(path)))
@@ -0,0 +1,81 @@
+from unittest import skipUnless
+
+from api.pagination import CarPagination, CommentPagination
+from cars.models import Car, Comment
+from core.keyset import after
+from django.db import connection
+from django.utils import timezone
+from tests.base_test import BaseTestCase
+
+'''Tests that hot queries are served by indexes instead of a filesort'''
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plans are checked for SQLite.')
+class QueryPlanTestCase(BaseTestCase):
+    '''Test suite that inspects EXPLAIN output of hot queries.'''
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan,
+                      f'Query must use {index_name} index.\n{plan}')
+        self.assertNotIn('TEMP B-TREE', plan,
+                         f'Query must not sort rows in memory.\n{plan}')
+
+    def test_homepage_cars_list(self):
+        '''Homepage list is ordered by the created_at index.'''
+        queryset = Car.objects.all().select_related('owner')
+        self.assertUsesIndex(queryset, 'car_created_at_id_idx')
+
+    def test_api_cars_list(self):
+        '''API cars list is ordered by the created_at index.'''
+        queryset = Car.objects.order_by(*CarPagination.ordering)
+        self.assertUsesIndex(queryset, 'car_created_at_id_idx')
+
+    def test_api_cars_cursor_page(self):
+        '''Cursor page seeks into the created_at index.'''
+        ordering = CarPagination.ordering
+        queryset = (Car.objects.order_by(*ordering)
+                    .filter(after(ordering, [timezone.now(), 1])))
+        self.assertUsesIndex(queryset, 'car_created_at_id_idx')
+        self.assertIn('SEARCH', queryset.explain(),
+                      'Cursor page must not scan the index from the start.')
+
+    def test_incremental_cars_export(self):
+        '''Incremental export is read in order from the updated_at index.'''
+        queryset = (Car.objects.filter(updated_at__gte=timezone.now())
+                    .order_by('updated_at', 'id'))
+        self.assertUsesIndex(queryset, 'car_updated_at_id_idx')
+
+    def test_car_detail_comments(self):
+        '''Comments of a car are read in order from the car index.'''
+        queryset = (Comment.objects.filter(car_id=1)
+                    .select_related('author')
+                    .order_by('-created_at'))
+        self.assertUsesIndex(queryset, 'comment_car_created_at_idx')
+
+    def test_api_car_comments(self):
+        '''API comments list is read in order from the car index.'''
+        queryset = (Comment.objects.filter(car_id=1)
+                    .order_by(*CommentPagination.ordering))
+        self.assertUsesIndex(queryset, 'comment_car_created_at_idx')
+
+    def test_cars_of_owner(self):
+        '''Cars of a user are read in order from the owner index.'''
+        queryset = Car.objects.filter(owner_id=1)
+        self.assertUsesIndex(queryset, 'car_owner_created_at_idx')
+
+    def test_comments_of_author(self):
+        '''Comments of a user are read in order from the author index.'''
+        queryset = Comment.objects.filter(author_id=1)
+        self.assertUsesIndex(queryset, 'comment_author_created_at_idx')
+
+    def test_admin_make_filter_values(self):
+        '''Admin list_filter choices are read from the make index.'''
+        queryset = (Car.objects.values_list('make', flat=True)
+                    .distinct().order_by('make'))
+        self.assertUsesIndex(queryset, 'car_make_model_year_idx')
+
+    def test_admin_make_model_filter(self):
+        '''Admin filtering by make and model uses the make index.'''
+        plan = Car.objects.filter(make='Toyota', model='Camry').explain()
+        self.assertIn('car_make_model_year_idx', plan)
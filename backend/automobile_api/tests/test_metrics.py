@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from cars.models import Car
+from core import metrics
+from django.test import override_settings
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the request metrics'''
+
+CAR_INFO = {
+    'make': 'Toyota',
+    'model': 'Camry',
+    'year': 2021,
+    'description': 'Компактный седан.',
+}
+
+
+class MetricsTestCase(BaseTestCase):
+    '''Test suite related to the metrics middleware and endpoint.'''
+
+    def setUp(self):
+        for metric in metrics.REGISTRY.metrics.values():
+            metric.clear()
+        self.car = Car.objects.create(owner=self.auth_user, **CAR_INFO)
+
+    def test_requests_are_counted_by_view(self):
+        '''Requests must be counted and timed by the name of the view.'''
+        # Act
+        response = self.auth_client.get(f'/api/cars/{self.car.id}/')
+        self.auth_client.get('/api/cars/0/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        requests = metrics.REQUESTS.snapshot()
+        self.assertEqual(requests[('api:cars-detail', 'GET', '200')], 1)
+        self.assertEqual(requests[('api:cars-detail', 'GET', '404')], 1)
+        duration = metrics.REQUEST_DURATION.snapshot()
+        self.assertEqual(sum(duration[('api:cars-detail', 'GET')][:-1]), 2)
+
+    def test_queries_and_serialization_are_observed(self):
+        '''SQL queries and serialization of a request must be measured.'''
+        # Act
+        self.auth_client.get('/api/cars/', {'ordering': 'year'})
+        # Assert
+        labels = ('api:cars-list', )
+        self.assertGreater(metrics.DB_QUERIES.snapshot()[labels], 0)
+        self.assertGreater(metrics.DB_DURATION.snapshot()[labels][-1], 0)
+        self.assertGreater(
+            metrics.SERIALIZATION_DURATION.snapshot()[labels][-1], 0)
+
+    async def test_async_requests_are_counted(self):
+        '''Requests of the async read path must be counted as well.'''
+        # Act
+        response = await self.async_client.get(f'/api/cars/{self.car.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(
+            metrics.REQUESTS.snapshot()[('api:cars-detail', 'GET', '200')],
+            1)
+
+    def test_endpoint_renders_text_format(self):
+        '''/metrics must expose the metrics in the text format.'''
+        # Arrange
+        self.auth_client.get(f'/api/cars/{self.car.id}/')
+        # Act
+        response = self.client.get('/metrics')
+        # Assert
+        CommonTestCase.assert200Response(self, response, verbose=False)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{view="api:cars-detail",'
+                      'method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{'
+                      'view="api:cars-detail",method="GET",le="+Inf"} 1',
+                      text)
+
+    def test_endpoint_merges_process_files(self):
+        '''Values written by other processes must be added up.'''
+        # Arrange
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        metrics.CACHE_REQUESTS.inc(('cars', 'hit'), 2)
+        other = {'cache_requests_total': [[['cars', 'hit'], 3],
+                                          [['cars', 'miss'], 1]]}
+        with open(os.path.join(directory, '1-1.json'), 'w') as file:
+            json.dump(other, file)
+        # Act
+        with override_settings(METRICS={'ENABLED': True,
+                                        'DIRECTORY': directory}):
+            text = self.client.get('/metrics').content.decode()
+        # Assert
+        self.assertIn(
+            'cache_requests_total{namespace="cars",result="hit"} 5', text)
+        self.assertIn(
+            'cache_requests_total{namespace="cars",result="miss"} 1', text)
+
+    def test_flush_writes_process_file(self):
+        '''Flushed values of a process must be read back by collect().'''
+        # Arrange
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        metrics.REQUESTS.inc(('cars:index', 'GET', '200'))
+        metrics.REGISTRY.flush(directory)
+        other = metrics.Registry()
+        other.metrics = metrics.REGISTRY.metrics
+        # Act
+        values = other.collect(directory)
+        # Assert
+        self.assertEqual(os.listdir(directory),
+                         [metrics.REGISTRY.filename])
+        self.assertEqual(
+            values['http_requests_total'][('cars:index', 'GET', '200')], 2)
+
+    def test_files_of_dead_processes_are_archived(self):
+        '''Files of processes that are gone must be folded into one.'''
+        # Arrange
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        for name, hits in [(f'{process.pid}-1.json', 3),
+                           (f'{process.pid}-2.json', 4),
+                           ('1-1.json', 5)]:
+            with open(os.path.join(directory, name), 'w') as file:
+                json.dump({'cache_requests_total': [[['cars', 'hit'],
+                                                     hits]]}, file)
+        # Act
+        values = metrics.REGISTRY.collect(directory)
+        again = metrics.REGISTRY.collect(directory)
+        # Assert
+        self.assertEqual(sorted(os.listdir(directory)),
+                         ['1-1.json', metrics.ARCHIVE_FILENAME])
+        for found in (values, again):
+            self.assertEqual(
+                found['cache_requests_total'][('cars', 'hit')], 12)
+
+    def test_endpoint_is_local_by_default(self):
+        '''Only loopback addresses must read /metrics by default.'''
+        # Act
+        local = self.client.get('/metrics')
+        remote = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        # Assert
+        CommonTestCase.assert200Response(self, local, verbose=False)
+        self.assertEqual(remote.status_code, 403)
+
+    @override_settings(METRICS={'ENABLED': True, 'ALLOWED_IPS': ['10.0.0.1']})
+    def test_endpoint_checks_allowed_ips(self):
+        '''Only allowed addresses must read /metrics.'''
+        # Act
+        denied = self.client.get('/metrics')
+        allowed = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        # Assert
+        self.assertEqual(denied.status_code, 403)
+        CommonTestCase.assert200Response(self, allowed, verbose=False)
+
+    @override_settings(METRICS={'ENABLED': False})
+    def test_endpoint_is_missing_when_disabled(self):
+        '''/metrics must not exist when metrics are disabled.'''
+        # Act
+        response = self.client.get('/metrics')
+        # Assert
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,143 @@
+from cars.models import Car, Comment
+from core.keyset import encode_cursor
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to keyset (cursor) pagination of API endpoints'''
+
+
+class CarsCursorPaginationTestCase(BaseTestCase):
+    '''Test suite related to cursor pagination of cars list.'''
+    BASE_URL = '/api/cars/'
+    CARS_AMOUNT = 25
+
+    def setUp(self):
+        Car.objects.bulk_create(
+            Car(make='Toyota', model=f'Camry {i}', year=2021,
+                description='Компактный седан.', owner=self.auth_user)
+            for i in range(self.CARS_AMOUNT)
+        )
+        # Identical timestamps make the id tie-breaker meaningful.
+        created_at = Car.objects.first().created_at
+        Car.objects.update(created_at=created_at)
+        self.expected_ids = list(
+            Car.objects.order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def walk(self, url, link='next'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            CommonTestCase.assert200Response(self, response)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data[link]
+        return ids, response
+
+    def test_page_number_pagination_is_default(self):
+        '''Test that page number pagination stays the default mode.'''
+        # Act
+        response = self.client.get(self.BASE_URL)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['count'], self.CARS_AMOUNT)
+
+    def test_walk_through_all_pages_forward(self):
+        '''Test that next links visit every car exactly once in order.'''
+        # Act
+        ids, last_response = self.walk(f'{self.BASE_URL}?pagination=cursor')
+        # Assert
+        self.assertEqual(ids, self.expected_ids)
+        self.assertNotIn('count', last_response.data,
+                         'Total count must not be computed by default.')
+
+    def test_walk_through_all_pages_backward(self):
+        '''Test that previous links lead back to the first page.'''
+        # Arrange
+        url = f'{self.BASE_URL}?pagination=cursor'
+        while True:
+            response = self.client.get(url)
+            if not response.data['next']:
+                break
+            url = response.data['next']
+        last_page_ids = [item['id'] for item in response.data['results']]
+        # Act
+        ids, _ = self.walk(response.data['previous'], link='previous')
+        # Assert
+        self.assertEqual(
+            sorted(ids + last_page_ids, key=self.expected_ids.index),
+            self.expected_ids
+        )
+        self.assertEqual(len(set(ids)), len(ids),
+                         'Cars must not repeat when paging backward.')
+
+    def test_count_is_included_on_request(self):
+        '''Test that total count is returned only when asked for.'''
+        # Act
+        response = self.client.get(
+            f'{self.BASE_URL}?pagination=cursor&with_count=true')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['count'], self.CARS_AMOUNT)
+
+    def test_invalid_cursor(self):
+        '''Test that malformed cursor leads to 404 response.'''
+        # Act
+        for cursor in ('garbage', 'eyJwIjpbIngiLDFdLCJyIjowfQ'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'{self.BASE_URL}?cursor={cursor}')
+                # Assert
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_out_of_range(self):
+        '''Values the database cannot compare with must lead to 404.'''
+        # Arrange
+        created_at = '2026-01-01T00:00:00+00:00'
+        positions = (
+            [created_at, 2 ** 63],
+            [created_at, -2 ** 63 - 1],
+            [created_at, float('inf')],
+            ['9999-12-31T23:59:59-05:00', 1],
+            ['99999-01-01T00:00:00+00:00', 1],
+        )
+        for position in positions:
+            with self.subTest(position=position):
+                # Act
+                response = self.client.get(
+                    f'{self.BASE_URL}?cursor={encode_cursor(position)}')
+                # Assert
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(str(response.data['detail']),
+                                 'Invalid cursor')
+
+
+class CommentsCursorPaginationTestCase(BaseTestCase):
+    '''Test suite related to cursor pagination of car comments list.'''
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user
+        )
+        Comment.objects.bulk_create(
+            Comment(content=f'Комментарий {i}', car=self.car,
+                    author=self.auth_user)
+            for i in range(15)
+        )
+
+    def test_comments_are_listed_oldest_first(self):
+        '''Test that comments cursor pages keep chronological order.'''
+        # Arrange
+        url = f'/api/cars/{self.car.id}/comments/?pagination=cursor'
+        expected_ids = list(
+            self.car.comments.order_by('created_at', 'id')
+            .values_list('id', flat=True)
+        )
+        ids = []
+        # Act
+        while url:
+            response = self.client.get(url)
+            CommonTestCase.assert200Response(self, response)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        # Assert
+        self.assertEqual(ids, expected_ids)
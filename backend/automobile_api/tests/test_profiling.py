@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from cars.models import Car
+from core import profiling
+from django.core.management import call_command
+from django.test import override_settings
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the profiling of requests'''
+
+CAR_INFO = {
+    'make': 'Toyota',
+    'model': 'Camry',
+    'year': 2021,
+    'description': 'Компактный седан.',
+}
+
+
+class ProfilingTestCase(BaseTestCase):
+    '''Test suite related to the profiling middleware and its files.'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(REQUEST_PROFILING={
+            'ENABLED': True,
+            'SAMPLE_RATE': 0,
+            'HEADER': 'X-Profile',
+            'HEADER_MAX_AGE': 60,
+            'DIRECTORY': self.directory,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.car = Car.objects.create(owner=self.auth_user, **CAR_INFO)
+        self.headers = {'X-Profile': profiling.sign_header()}
+
+    def read_records(self, view):
+        path = os.path.join(self.directory, profiling.file_stem(view))
+        with open(path + profiling.PHASES_SUFFIX, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_signed_requests_are_profiled(self):
+        '''Request with the signed header must be profiled by phases.'''
+        # Act
+        response = self.auth_client.get(f'/api/cars/{self.car.id}/',
+                                        headers=self.headers)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertTrue(response['Server-Timing'].startswith('total;dur='))
+        record, = self.read_records('api:cars-detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(set(record['phases_ms']), set(profiling.PHASES))
+        for phase in ('resolve', 'auth', 'permissions', 'queryset',
+                      'serialization'):
+            self.assertGreater(record['phases_ms'][phase], 0, phase)
+        self.assertLessEqual(record['phases_ms']['queryset'],
+                             record['total_ms'])
+
+    async def test_async_requests_are_profiled(self):
+        '''Requests served by the async handler must be profiled.'''
+        # Act
+        response = await self.async_client.get(
+            f'/api/cars/{self.car.id}/comments/', headers=self.headers)
+        # Assert
+        self.assertIn('Server-Timing', response)
+        record, = self.read_records('api:comments-list')
+        self.assertGreater(record['phases_ms']['queryset'], 0)
+
+    def test_other_requests_are_not_profiled(self):
+        '''Requests without a valid header must not be profiled.'''
+        # Act
+        plain = self.client.get('/api/cars/')
+        forged = self.client.get('/api/cars/',
+                                 headers={'X-Profile': 'profile:forged'})
+        # Assert
+        self.assertNotIn('Server-Timing', plain)
+        self.assertNotIn('Server-Timing', forged)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_sampled_requests_are_profiled(self):
+        '''SAMPLE_RATE of 1 must profile every request.'''
+        # Arrange
+        config = {**profiling.get_config(), 'SAMPLE_RATE': 1}
+        # Act
+        with override_settings(REQUEST_PROFILING=config):
+            response = self.client.get('/')
+        # Assert
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(len(self.read_records('cars:index')), 1)
+
+    def test_stack_sampler(self):
+        '''Sampled stacks must start below the caller of the sampler.'''
+        # Act
+        with profiling.StackSampler(0.001) as sampler:
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        # Assert
+        self.assertTrue(sampler.stacks)
+        self.assertGreater(sum(sampler.stacks.values()), 0.02)
+        for stack in sampler.stacks:
+            self.assertNotIn('test_stack_sampler', ';'.join(stack))
+
+    def test_aggregate_profiles(self):
+        '''Command must summarize the views and merge their stacks.'''
+        # Arrange
+        for url in ('/api/cars/', f'/api/cars/{self.car.id}/'):
+            self.client.get(url, headers=self.headers)
+        profiling.write_profile(self.directory, 'api:cars-list',
+                                {('a.py:1:view', 'b.py:2:query'): 0.002},
+                                self.read_records('api:cars-list')[0])
+        output = os.path.join(self.directory, 'merged.txt')
+        stdout = StringIO()
+        # Act
+        call_command('aggregate_profiles', directory=self.directory,
+                     views=['api:cars-list'], output=output, stdout=stdout)
+        # Assert
+        report = stdout.getvalue()
+        self.assertIn('api:cars-list  requests=2', report)
+        self.assertNotIn('api:cars-detail', report)
+        with open(output, encoding='utf-8') as file:
+            merged = file.read()
+        self.assertIn('api:cars-list;a.py:1:view;b.py:2:query 2000\n',
+                      merged)
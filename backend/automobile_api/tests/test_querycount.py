@@ -0,0 +1,93 @@
+from cars.models import Car, Comment
+from core.querycount import QueryBudgetError, normalize_sql
+from django.test import override_settings
+from tests.base_test import BaseTestCase, QueryCountMixin
+
+'''Tests related to query counting and N+1 detection'''
+
+
+def query_budget(**config):
+    return override_settings(QUERY_BUDGET={'ENABLED': True, **config})
+
+
+class QueryCountTestCase(QueryCountMixin, BaseTestCase):
+    '''Test suite related to the query budget middleware and mixin.'''
+
+    def setUp(self):
+        self.car = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан.', owner=self.auth_user
+        )
+        for i in range(3):
+            Comment.objects.create(content=f'Комментарий {i}',
+                                   car=self.car, author=self.auth_user)
+
+    def test_shapes_ignore_literals(self):
+        '''Queries that differ only in values must have one shape.'''
+        # Act
+        first = normalize_sql(
+            "SELECT * FROM car WHERE id = 1 AND make = 'Ford' "
+            "AND owner_id IN (1, 2)")
+        second = normalize_sql(
+            "SELECT * FROM car WHERE id = %s AND make = %s "
+            "AND owner_id IN (%s, %s, %s)")
+        # Assert
+        self.assertEqual(first, second)
+
+    def test_repeated_queries_are_detected(self):
+        '''Mixin must catch a query per row.'''
+        # Act / Assert
+        with self.assertRaises(AssertionError):
+            with self.assertNoRepeatedQueries():
+                [str(comment) for comment in Comment.objects.all()]
+        with self.assertNoRepeatedQueries():
+            [str(comment) for comment in
+             Comment.objects.select_related('car', 'author')]
+
+    def test_query_budget_is_asserted(self):
+        # Act / Assert
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                list(Car.objects.all())
+                list(Comment.objects.all())
+
+    @query_budget(MODE='raise', VIEWS={'cars:index': 0})
+    def test_middleware_raises_over_budget(self):
+        '''Request over the budget of its view must fail in raise mode.'''
+        # Act / Assert
+        with self.assertRaises(QueryBudgetError):
+            self.client.get('/')
+
+    @query_budget(MODE='log', VIEWS={'cars:index': 0})
+    def test_middleware_logs_over_budget(self):
+        '''Request over the budget of its view must be logged.'''
+        # Act
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = self.client.get('/')
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget is 0', logs.output[0])
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    @query_budget(MODE='log')
+    async def test_middleware_counts_async_requests(self):
+        '''Queries of async views must be counted by the middleware.'''
+        # Act
+        response = await self.async_client.get('/')
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    @query_budget(MODE='raise')
+    def test_admin_changelists_have_no_repeated_queries(self):
+        '''Admin lists must not query related rows one by one.'''
+        # Arrange
+        self.auth_user.is_staff = self.auth_user.is_superuser = True
+        self.auth_user.save()
+        self.client.force_login(self.auth_user)
+        # Act / Assert
+        for url in ('/admin/cars/comment/', '/admin/cars/car/'):
+            # The admin counts filtered and all rows with the same query.
+            with self.subTest(url=url), self.assertNoRepeatedQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import tempfile
+
+from cars.models import Car
+from core import replicas
+from core.benchmarks import extra_database
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import router
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to routing of reads to read replicas'''
+
+REPLICA = 'replica'
+CAR_INFO = {
+    'make': 'Toyota',
+    'model': 'Camry',
+    'year': 2021,
+    'description': 'Компактный седан.',
+}
+
+
+@override_settings(DATABASE_REPLICAS={
+    'ALIASES': [REPLICA],
+    'VIEWS': ['cars:car-detail', 'api:cars-detail', 'api:cars-export'],
+    'STICKY_SECONDS': 60,
+})
+class ReplicaRoutingTestCase(BaseTestCase):
+    '''
+    Test suite related to the replica router and middleware. The replica
+    is a SQLite file, which holds a copy of the users and a car that is
+    missing in the primary.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.replica = extra_database(REPLICA, {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        })
+        cls.replica.__enter__()
+        call_command('migrate', database=REPLICA, verbosity=0)
+        # Declared once the alias exists, the test runner checks it early.
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replica.__exit__(None, None, None)
+        shutil.rmtree(cls.directory)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # What replication would have copied.
+        cls.auth_user.save(using=REPLICA)
+        Token.objects.get(user=cls.auth_user).save(using=REPLICA)
+        cls.replica_car = Car(id=1000, owner=cls.auth_user, **CAR_INFO)
+        Car.objects.using(REPLICA).bulk_create([cls.replica_car])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listed_views_read_from_replica(self):
+        '''Car that is in the replica only must be found.'''
+        # Act
+        api = self.client.get(f'/api/cars/{self.replica_car.id}/')
+        page = self.client.get(f'/cars/{self.replica_car.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, api)
+        self.assertContains(page, 'Camry')
+
+    async def test_async_requests_read_from_replica(self):
+        '''Requests served by the async handler must be routed as well.'''
+        # Act
+        response = await self.async_client.get(
+            f'/api/cars/{self.replica_car.id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+
+    def test_streamed_export_reads_from_replica(self):
+        '''Rows of a streaming response must be read from the replica.'''
+        # Act
+        response = self.client.get('/api/cars/export/')
+        lines = b''.join(response.streaming_content).splitlines()
+        # Assert
+        CommonTestCase.assert200Response(self, response, verbose=False)
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [self.replica_car.id])
+
+    async def test_async_export_reads_from_replica(self):
+        '''Rows of an async streaming response must be read from it too.'''
+        # Act
+        response = await self.async_client.get('/api/cars/export/')
+        lines = b''.join([chunk async for chunk
+                          in response.streaming_content]).splitlines()
+        # Assert
+        CommonTestCase.assert200Response(self, response, verbose=False)
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [self.replica_car.id])
+
+    def test_process_local_sticky_cache_is_reported(self):
+        '''Check must warn that LocMemCache is not shared by processes.'''
+        # Act
+        warnings = replicas.check_sticky_cache(None)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            shared = replicas.check_sticky_cache(None)
+        # Assert
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+        self.assertEqual(shared, [])
+
+    def test_other_views_read_from_primary(self):
+        '''Views missing in VIEWS must not read from the replica.'''
+        # Act
+        response = self.client.get('/api/cars/')
+        # Assert
+        self.assertEqual(response.data['count'], 0)
+
+    def test_writes_go_to_primary(self):
+        '''Created car must be stored in the primary only.'''
+        # Act
+        response = self.auth_client.post('/api/cars/', CAR_INFO)
+        # Assert
+        self.assertEqual(response.status_code, 201)
+        car_id = response.data['id']
+        self.assertTrue(Car.objects.filter(id=car_id).exists())
+        self.assertFalse(
+            Car.objects.using(REPLICA).filter(id=car_id).exists())
+
+    def test_client_that_wrote_reads_from_primary(self):
+        '''Author of a write must see it while replicas lag behind.'''
+        # Arrange
+        car_id = self.auth_client.post('/api/cars/', CAR_INFO).data['id']
+        # Act
+        author = self.auth_client.get(f'/api/cars/{car_id}/')
+        anonymous = self.client.get(f'/api/cars/{car_id}/')
+        # Assert
+        CommonTestCase.assert200Response(self, author)
+        self.assertEqual(anonymous.status_code, 404)
+
+    def test_reads_after_write_in_request_use_primary(self):
+        '''Once a request writes, it must read from the primary.'''
+        with replicas.request_scope():
+            replicas.route_reads_to(REPLICA)
+            before = router.db_for_read(Car)
+            # Act
+            router.db_for_write(Car)
+            after = router.db_for_read(Car)
+        # Assert
+        self.assertEqual(before, REPLICA)
+        self.assertEqual(after, 'default')
+        self.assertEqual(router.db_for_read(Car), 'default')
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from unittest import mock
+
+from api.renderers import FastJSONRenderer
+from api.rows import RowSerializer
+from api.serializers import (CarSummarySerializer, CommentSerializer,
+                             car_summary_rows, comment_rows)
+from cars.models import Car, Comment
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the serialization of values() rows'''
+
+CAR_INFO = {
+    'make': 'Lada',
+    'model': 'Нива\u2028"4x4"',
+    'year': 2021,
+    'description': 'Внедорожник.',
+}
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class RowSerializerTestCase(BaseTestCase):
+    '''Test suite related to the output of the row serializers.'''
+
+    def setUp(self):
+        now = timezone.now().replace(microsecond=123456)
+        self.cars = [
+            Car.objects.create(owner=self.auth_user, **CAR_INFO),
+            Car.objects.create(owner=self.auth_user, **CAR_INFO),
+        ]
+        Car.objects.filter(pk=self.cars[0].pk).update(
+            created_at=now, last_commented_at=now + timedelta(hours=1))
+        Car.objects.filter(pk=self.cars[1].pk).update(
+            created_at=now.replace(microsecond=0))
+        for car in self.cars:
+            Comment.objects.create(car=car, author=self.auth_user,
+                                   content='Комментарий')
+
+    def test_cars_match_serializer(self):
+        '''Rows must be rendered to the bytes of the serializer.'''
+        # Arrange
+        cars = Car.objects.order_by('id')
+        for zone in ('UTC', 'Europe/Moscow'):
+            with timezone.override(zone):
+                # Act
+                rows = car_summary_rows.many(
+                    cars.values(*car_summary_rows.columns))
+                expected = CarSummarySerializer(cars, many=True).data
+                # Assert
+                self.assertEqual(FastJSONRenderer().render(rows),
+                                 render(expected), zone)
+
+    def test_comments_match_serializer(self):
+        '''Comment rows must be rendered to the bytes of the serializer.'''
+        # Arrange
+        comments = Comment.objects.order_by('id')
+        # Act
+        rows = comment_rows.many(comments.values(*comment_rows.columns))
+        expected = CommentSerializer(comments, many=True).data
+        # Assert
+        self.assertEqual(FastJSONRenderer().render(rows), render(expected))
+
+    def test_list_endpoints_match_serializer(self):
+        '''Pages of the list endpoints must match the serializers.'''
+        # Arrange
+        cars = Car.objects.in_bulk()
+        comments = Comment.objects.in_bulk()
+        for url, objects, serializer in (
+            ('/api/cars/', cars, CarSummarySerializer),
+            ('/api/cars/?pagination=cursor', cars, CarSummarySerializer),
+            (f'/api/cars/{self.cars[0].pk}/comments/', comments,
+             CommentSerializer),
+        ):
+            # Act
+            response = self.auth_client.get(url)
+            data = response.data
+            instances = [objects[row['id']] for row in data['results']]
+            data['results'] = serializer(instances, many=True).data
+            # Assert
+            CommonTestCase.assert200Response(self, response)
+            self.assertEqual(response.content, render(data), url)
+
+    def test_unknown_fields_need_sources(self):
+        '''Fields other than model columns must be configured.'''
+        # Arrange
+        rows = RowSerializer(CommentSerializer)
+        # Act & Assert
+        with self.assertRaises(ImproperlyConfigured):
+            rows.columns
+
+
+class FastJSONRendererTestCase(BaseTestCase):
+    '''Test suite related to the fast JSON renderer.'''
+
+    DATA = {
+        'text': 'Нива\u2028\u2029"4x4" </script>',
+        'created_at': timezone.now(),
+        'items': [1, None, True, 2.5, ('a', 'b')],
+        'lazy': serializers.CharField().error_messages['blank'],
+    }
+
+    def test_output_matches_json_renderer(self):
+        '''Output must be the same as the one of JSONRenderer.'''
+        # Act
+        fast = FastJSONRenderer().render(self.DATA)
+        # Assert
+        self.assertEqual(fast, render(self.DATA))
+
+    def test_fallbacks(self):
+        '''Indented output and unsupported data must still render.'''
+        # Arrange
+        data = {1: 2, 'big': 2 ** 70}
+        indent = 'application/json; indent=2'
+        # Act
+        with mock.patch('api.renderers.orjson', None):
+            without_orjson = FastJSONRenderer().render(self.DATA)
+        # Assert
+        self.assertEqual(FastJSONRenderer().render(data), render(data))
+        self.assertEqual(FastJSONRenderer().render(self.DATA, indent),
+                         JSONRenderer().render(self.DATA, indent))
+        self.assertEqual(without_orjson, render(self.DATA))
@@ -0,0 +1,135 @@
+from cars.models import Car, Comment, SearchTerm
+from cars.search import get_backend, search_cars
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to full-text search of cars'''
+
+
+class CarsSearchTestCase(BaseTestCase):
+    '''Test suite related to the search index and /api/cars/search/.'''
+    URL = '/api/cars/search/'
+
+    def setUp(self):
+        self.camry = Car.objects.create(
+            make='Toyota', model='Camry', year=2021,
+            description='Компактный седан с экономичным двигателем.',
+            owner=self.auth_user
+        )
+        self.supra = Car.objects.create(
+            make='Toyota', model='Supra', year=1998,
+            description='Легендарное спортивное купе.',
+            owner=self.auth_user
+        )
+        self.focus = Car.objects.create(
+            make='Ford', model='Focus', year=2010,
+            description='Надёжный хэтчбек, похож на Camry по цене.',
+            owner=self.auth_user
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(self.URL, {'q': query, **params})
+        CommonTestCase.assert200Response(self, response)
+        return [car['id'] for car in response.data['results']]
+
+    def test_results_are_ranked(self):
+        '''Match in the model must rank above a match in description.'''
+        # Act
+        ids = self.search('camry')
+        # Assert
+        self.assertEqual(ids, [self.camry.id, self.focus.id])
+
+    def test_every_word_must_match_a_prefix(self):
+        # Act / Assert
+        self.assertEqual(self.search('toyota седан'), [self.camry.id])
+        self.assertEqual(self.search('СПОРТ'), [self.supra.id])
+        self.assertEqual(self.search('toyota хэтчбек'), [])
+
+    def test_comments_are_searchable(self):
+        '''Comments of a car must be found until they are deleted.'''
+        # Arrange
+        comment = Comment.objects.create(
+            content='Отличная подвеска.', car=self.supra,
+            author=self.auth_user)
+        # Act
+        found = self.search('подвеска')
+        comment.delete()
+        # Assert
+        self.assertEqual(found, [self.supra.id])
+        self.assertEqual(self.search('подвеска'), [])
+
+    def test_comment_is_indexed_alone(self):
+        '''New comment must not reindex other comments of its car.'''
+        # Arrange
+        Comment.objects.create(content='Мягкая подвеска.', car=self.supra,
+                               author=self.auth_user)
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(content='Быстрый разгон.',
+                                   car=self.supra, author=self.auth_user)
+        # Assert
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'FROM "cars_comment"' in query['sql']])
+        self.assertEqual(self.search('подвеска разгон'), [self.supra.id])
+        self.assertEqual(self.search('toyota разгон'), [self.supra.id])
+
+    def test_index_follows_changes(self):
+        '''Updated, bulk created and deleted cars must be reindexed.'''
+        # Act
+        self.camry.model = 'Corolla'
+        self.camry.save()
+        self.supra.delete()
+        self.auth_client.post('/api/cars/bulk/', [{
+            'make': 'Lada', 'model': 'Niva', 'year': 1977,
+            'description': 'Внедорожник.',
+        }], format='json')
+        # Assert
+        self.assertEqual(self.search('corolla'), [self.camry.id])
+        self.assertEqual(self.search('supra'), [])
+        self.assertEqual(len(self.search('внедорожник')), 1)
+
+    def test_results_are_paginated(self):
+        # Arrange
+        self.auth_client.post('/api/cars/bulk/', [{
+            'make': 'Toyota', 'model': f'Corolla {i}', 'year': 2000,
+            'description': 'Седан.',
+        } for i in range(10)], format='json')
+        # Act
+        first = self.client.get(self.URL, {'q': 'toyota'})
+        second = self.client.get(self.URL, {'q': 'toyota', 'page': 2})
+        # Assert
+        self.assertEqual(first.data['count'], 12)
+        self.assertNotIn('description', first.data['results'][0])
+        self.assertEqual(len(second.data['results']), 2)
+
+    def test_query_is_required(self):
+        # Act
+        response = self.client.get(self.URL, {'q': '  '})
+        punctuation = self.client.get(self.URL, {'q': '"*'})
+        # Assert
+        CommonTestCase.assert400Response(self, response)
+        self.assertEqual(punctuation.data['results'], [])
+
+    def test_admin_search_uses_index(self):
+        # Arrange
+        self.auth_user.is_staff = self.auth_user.is_superuser = True
+        self.auth_user.save()
+        self.client.force_login(self.auth_user)
+        # Act
+        response = self.client.get('/admin/cars/car/', {'q': 'хэтчбек'})
+        # Assert
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.focus])
+
+
+@override_settings(CARS_SEARCH_BACKEND='python')
+class CarsPythonSearchTestCase(CarsSearchTestCase):
+    '''The same suite run against the pure Python index.'''
+
+    def test_python_backend_is_used(self):
+        self.assertEqual(type(get_backend()).__name__, 'PythonBackend')
+        self.assertTrue(SearchTerm.objects.filter(term='camry').exists())
+        self.assertEqual(list(search_cars('cam')),
+                         [self.camry, self.focus])
@@ -0,0 +1,201 @@
+from api.authentication import (ClaimsUser, RevocationList,
+                                StatelessJWTAuthentication, revocations)
+from api.models import Revocation
+from cars.models import Car
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from tests.base_test import BaseTestCase, CommonTestCase, UserModel
+
+'''Tests related to the stateless JSON web token authentication'''
+
+STATS_URL = '/api/cache/stats/'
+CAR_INFO = {
+    'make': 'Toyota',
+    'model': 'Camry',
+    'year': 2021,
+    'description': 'Компактный седан.',
+}
+STATELESS = {**settings.STATELESS_JWT, 'ENABLED': True}
+
+
+@override_settings(STATELESS_JWT=STATELESS)
+class StatelessJWTTestCase(BaseTestCase):
+    '''Test suite related to permissions checked by token claims.'''
+
+    def setUp(self):
+        self.auth_user.is_staff = True
+        self.auth_user.save()
+        # Tokens issued within the second of a change are revoked.
+        revocations.clear()
+        self.jwt_client = self.login()
+
+    def login(self, username='username'):
+        response = self.client.post('/api/auth/jwt/create/', {
+            'username': username,
+            'password': 'Strong_password1',
+        })
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+        self.access = AccessToken(response.data['access'])
+        self.refresh = response.data['refresh']
+        return client
+
+    def test_token_has_claims(self):
+        '''Access token must carry the claims of the user.'''
+        # Assert
+        self.assertEqual(self.access['user_id'], self.auth_user.pk)
+        self.assertIs(self.access['is_staff'], True)
+        self.assertIs(self.access['is_active'], True)
+
+    def test_permissions_make_no_queries(self):
+        '''Staff permission must be checked without loading the user.'''
+        # Arrange
+        self.jwt_client.get(STATS_URL)
+        # Act
+        with self.assertNumQueries(0):
+            response = self.jwt_client.get(STATS_URL)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+
+    def test_owner_permissions(self):
+        '''Owner and staff must edit the car, other users must not.'''
+        # Arrange
+        car = Car.objects.create(owner=self.auth_user, **CAR_INFO)
+        UserModel.objects.create_user(username='other',
+                                      password='Strong_password1')
+        other_client = self.login('other')
+        url = f'/api/cars/{car.id}/'
+        # Act
+        owner = self.jwt_client.put(url, CAR_INFO)
+        other = other_client.put(url, CAR_INFO)
+        # Assert
+        CommonTestCase.assert200Response(self, owner)
+        self.assertEqual(other.status_code, 403)
+
+    def test_user_is_loaded_when_needed(self):
+        '''Created car must be owned by the loaded user.'''
+        # Act
+        response = self.jwt_client.post('/api/cars/', CAR_INFO)
+        # Assert
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['owner'], self.auth_user.pk)
+
+    def test_claims_user(self):
+        '''Fields missing in the claims must be loaded once.'''
+        # Arrange
+        user = ClaimsUser(self.access)
+        # Act
+        with self.assertNumQueries(0):
+            self.assertEqual(user, self.auth_user)
+            self.assertTrue(user.is_staff)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'username')
+            self.assertEqual(user.email, 'mailmail@gmail.com')
+
+    def test_changed_claims_revoke_tokens(self):
+        '''Tokens of a demoted user must be revoked.'''
+        # Act
+        self.auth_user.first_name = 'name'
+        self.auth_user.save()
+        renamed = self.jwt_client.get(STATS_URL)
+        self.auth_user.is_staff = False
+        self.auth_user.save()
+        demoted = self.jwt_client.get(STATS_URL)
+        # Assert
+        CommonTestCase.assert200Response(self, renamed)
+        self.assertEqual(demoted.status_code, 401)
+
+    def test_revoke(self):
+        '''Revoked tokens must neither authenticate nor be refreshed.'''
+        # Act
+        response = self.jwt_client.post('/api/auth/jwt/revoke/',
+                                        {'refresh': self.refresh})
+        revoked = self.jwt_client.get(STATS_URL)
+        refreshed = self.client.post('/api/auth/jwt/refresh/',
+                                     {'refresh': self.refresh})
+        # Assert
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(revoked.status_code, 401)
+        self.assertEqual(refreshed.status_code, 401)
+
+    def test_revoke_requires_own_refresh_token(self):
+        '''Logout must blacklist a valid refresh token of the user.'''
+        other = UserModel.objects.create_user(username='other',
+                                              password='Strong_password1')
+        test_cases = [
+            ({}, 'Missing refresh token must be rejected'),
+            ({'refresh': 'token'}, 'Invalid refresh token must be rejected'),
+            ({'refresh': str(RefreshToken.for_user(other))},
+             'Refresh token of another user must be rejected'),
+        ]
+        for data, err_msg in test_cases:
+            with self.subTest(err_msg=err_msg):
+                # Act
+                response = self.jwt_client.post('/api/auth/jwt/revoke/',
+                                                data)
+                # Assert
+                self.assertEqual(response.status_code, 400, err_msg)
+        CommonTestCase.assert200Response(
+            self, self.jwt_client.get(STATS_URL))
+
+    def test_revocations_are_shared(self):
+        '''Revocations must be seen by the lists of other processes.'''
+        # Arrange
+        self.auth_user.is_active = False
+        self.auth_user.save()
+        # Act
+        revoked = RevocationList().is_revoked(self.access)
+        # Assert
+        self.assertTrue(revoked)
+
+    def test_tokens_without_claims_load_the_user(self):
+        '''Tokens issued before the claims were added must still work.'''
+        # Arrange
+        token = AccessToken.for_user(self.auth_user)
+        # Act
+        user = StatelessJWTAuthentication().get_user(token)
+        # Assert
+        self.assertIs(type(user), UserModel)
+
+    @override_settings(STATELESS_JWT={'ENABLED': False})
+    def test_disabled(self):
+        '''Disabled mode must load the user of the token.'''
+        # Act
+        user = StatelessJWTAuthentication().get_user(self.access)
+        # Assert
+        self.assertIs(type(user), UserModel)
+
+
+class JWTDefaultsTestCase(BaseTestCase):
+    '''Test suite related to JSON web tokens in the default mode.'''
+
+    def test_revocations_are_not_used(self):
+        '''Default mode must neither store nor look up revocations.'''
+        # Arrange
+        refresh = RefreshToken.for_user(self.auth_user)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        # Act
+        response = client.post('/api/auth/jwt/revoke/',
+                               {'refresh': str(refresh)})
+        self.auth_user.delete()
+        # Assert
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Revocation.objects.exists())
+
+    def test_deactivated_user_is_rejected(self):
+        '''Token of a deactivated user must not authenticate.'''
+        # Arrange
+        access = AccessToken.for_user(self.auth_user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.auth_user.is_active = False
+        self.auth_user.save()
+        # Act
+        response = client.get(STATS_URL)
+        # Assert
+        self.assertEqual(response.status_code, 401)
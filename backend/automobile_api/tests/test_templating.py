@@ -0,0 +1,42 @@
+from automobile_api.templating import LOADERS, template_loaders
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase
+
+'''Tests related to the template loader settings'''
+
+CACHED = 'django.template.loaders.cached.Loader'
+
+
+class TemplateLoadersTestCase(SimpleTestCase):
+    '''Test suite related to template loaders from the environment.'''
+
+    def test_development_reads_templates_from_disk(self):
+        '''In DEBUG templates must not be cached by default.'''
+        # Act
+        loaders = template_loaders({}, debug=True)
+        # Assert
+        self.assertEqual(loaders, LOADERS)
+
+    def test_production_caches_templates(self):
+        '''Without DEBUG compiled templates must be cached by default.'''
+        # Act
+        loaders = template_loaders({}, debug=False)
+        # Assert
+        self.assertEqual(loaders, [(CACHED, LOADERS)])
+
+    def test_template_cache_overrides_debug(self):
+        '''TEMPLATE_CACHE must turn the cache on and off in any mode.'''
+        # Act
+        cached = template_loaders({'TEMPLATE_CACHE': '1'}, debug=True)
+        uncached = template_loaders({'TEMPLATE_CACHE': '0'}, debug=False)
+        # Assert
+        self.assertEqual(cached, [(CACHED, LOADERS)])
+        self.assertEqual(uncached, LOADERS)
+
+    def test_engine_uses_configured_loaders(self):
+        '''The template engine must be built from TEMPLATE_LOADERS.'''
+        # Act
+        engine = engines['django'].engine
+        # Assert
+        self.assertEqual(engine.loaders, settings.TEMPLATE_LOADERS)
@@ -0,0 +1,121 @@
+from api.authentication import TokenCache, get_token_cache, to_entry
+from cars.cache import counters
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from tests.base_test import BaseTestCase, CommonTestCase
+
+'''Tests related to the cached token authentication'''
+
+STATS_URL = '/api/cache/stats/'
+
+
+@override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 100, 'TIMEOUT': 60,
+                                     'CACHE_ALIAS': None})
+class CachedTokenAuthenticationTestCase(BaseTestCase):
+    '''Test suite related to tokens served from the token cache.'''
+
+    def setUp(self):
+        counters.reset()
+        self.auth_user.is_staff = True
+        self.auth_user.save()
+        get_token_cache().clear()
+
+    def test_steady_state_makes_no_queries(self):
+        '''Cached token must authenticate without queries.'''
+        # Arrange
+        self.auth_client.get(STATS_URL)
+        # Act
+        with self.assertNumQueries(0):
+            response = self.auth_client.get(STATS_URL)
+        # Assert
+        CommonTestCase.assert200Response(self, response)
+        self.assertEqual(response.data['auth-token'],
+                         {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_cached_user_can_write(self):
+        '''User rebuilt from the cache must be usable as an owner.'''
+        # Arrange
+        self.auth_client.get(STATS_URL)
+        # Act
+        response = self.auth_client.post('/api/cars/', {
+            'make': 'Toyota', 'model': 'Camry', 'year': 2021,
+            'description': 'Компактный седан.'})
+        # Assert
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['owner'], self.auth_user.pk)
+
+    def test_deleted_token_is_forgotten(self):
+        '''Deleted token must not authenticate from the cache.'''
+        # Arrange
+        self.auth_client.get(STATS_URL)
+        # Act
+        Token.objects.filter(user=self.auth_user).delete()
+        response = self.auth_client.get(STATS_URL)
+        # Assert
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_changes_are_applied(self):
+        '''Deactivated or demoted user must not keep cached rights.'''
+        # Arrange
+        self.auth_client.get(STATS_URL)
+        # Act
+        self.auth_user.is_staff = False
+        self.auth_user.save()
+        demoted = self.auth_client.get(STATS_URL)
+        self.auth_user.is_active = False
+        self.auth_user.save()
+        deactivated = self.auth_client.get(STATS_URL)
+        # Assert
+        self.assertEqual(demoted.status_code, 403)
+        self.assertEqual(deactivated.status_code, 401)
+
+    def test_entries_contain_no_password(self):
+        '''Password hash must not be cached.'''
+        # Arrange
+        token = Token.objects.get(user=self.auth_user)
+        # Act
+        entry = to_entry(token)
+        # Assert
+        self.assertNotIn('password', entry['user'])
+        self.assertEqual(entry['user']['id'], self.auth_user.pk)
+
+
+class TokenCacheTestCase(BaseTestCase):
+    '''Test suite related to the bounds of the token cache.'''
+
+    def test_least_recently_used_entry_is_evicted(self):
+        '''Cache must keep at most MAX_SIZE entries.'''
+        # Arrange
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        # Act
+        cache.set('c', 3)
+        # Assert
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_entries_expire(self):
+        '''Expired entry must not be returned.'''
+        # Arrange
+        cache = TokenCache(max_size=2, timeout=0)
+        # Act
+        cache.set('a', 1)
+        # Assert
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_cache(self):
+        '''Entry must be found by other processes in the shared cache.'''
+        # Arrange
+        cache = TokenCache(max_size=2, timeout=60, cache_alias='default')
+        other_process = TokenCache(max_size=2, timeout=60,
+                                   cache_alias='default')
+        # Act
+        cache.set('key', {'user': 1})
+        found = other_process.get('key')
+        cache.delete('key')
+        # Assert
+        self.assertEqual(found, {'user': 1})
+        self.assertIsNone(TokenCache(2, 60, 'default').get('key'))
@@ -0,0 +1,62 @@
+from cars.models import Car
+from cars.validators import (CarYearValidator, TextValidator, TitleValidator,
+                             ValidationEngine)
+from django.core.exceptions import ValidationError
+from django.core.validators import RegexValidator
+from django.test import SimpleTestCase
+
+'''Tests related to cars field validators'''
+
+
+class FastRegexValidatorTestCase(SimpleTestCase):
+    '''Test suite related to compiled and ASCII fast path validators.'''
+    VALUES = (
+        'Toyota', 'Камри 2021', 'Ford-Mustang', 'Mod~el^', '',
+        'abc\n', '\n', 'Ёлка', 'Седан, 2021 год!', 'a_b[c]', '1999',
+        '199', 'Tab\tseparated', 'Trailing newline\n\n',
+    )
+
+    def test_same_result_as_regex_validator(self):
+        '''Fast path must agree with the plain RegexValidator.'''
+        for validator_class in (TitleValidator, TextValidator,
+                                CarYearValidator):
+            fast = validator_class()
+            plain = RegexValidator(validator_class.regex)
+            for value in self.VALUES:
+                with self.subTest(validator=validator_class.__name__,
+                                  value=value):
+                    self.assertEqual(fast.is_valid(value),
+                                     bool(plain.regex.search(value)))
+
+    def test_invalid_value_raises_validation_error(self):
+        '''Invalid value must raise ValidationError with the message.'''
+        with self.assertRaisesMessage(ValidationError,
+                                      TitleValidator.message):
+            TitleValidator()('&2>Mod~el^')
+
+    def test_pattern_is_compiled_once(self):
+        '''Validator instances must share a compiled pattern.'''
+        self.assertIs(TitleValidator().regex, TitleValidator().regex)
+
+
+class ValidationEngineTestCase(SimpleTestCase):
+    '''Test suite related to batch validation of columns.'''
+
+    def test_error_vectors_are_aligned_with_values(self):
+        # Arrange
+        engine = ValidationEngine(Car, ('make', 'year'))
+        columns = {
+            'make': ['Toyota', '&', None, 'Ford'],
+            'year': [2021, 21, None, 1800],
+        }
+        # Act
+        errors = engine.validate(columns)
+        # Assert
+        self.assertEqual(errors['make'],
+                         [None, [TitleValidator.message], None, None])
+        self.assertIsNone(errors['year'][0])
+        self.assertIn(CarYearValidator.message, errors['year'][1])
+        self.assertIsNone(errors['year'][2])
+        self.assertEqual(errors['year'][3],
+                         ['Год не может быть меньше 1885.'])
+        self.assertFalse(engine.is_valid(columns))